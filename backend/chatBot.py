@@ -1,8 +1,15 @@
 #!/usr/bin/env python
+import time
+
+_PROCESS_T0 = time.perf_counter()
+
 import sys
 import json
 import os
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 # --- PATH setup (backend + libs) ---
 
@@ -10,27 +17,128 @@ BASE_DIR = os.path.dirname(__file__)
 sys.path.insert(0, BASE_DIR)
 sys.path.insert(0, os.path.join(BASE_DIR, "libs"))
 
-from groq import Groq
-# dacă fișierul tău se numește altfel, schimbă linia de mai jos
-from Chat_Bot_Groq_final_v2 import (
-    load_config,
-    load_places,
-    answer_message,
-    generate_vibe_for_place,
-)
+# ----------------- startup timings (--startup-report) -----------------
+
+# (faza, nume, ms) în ordinea în care s-au întâmplat
+STARTUP_TIMINGS: List[Dict[str, Any]] = []
+
+
+@contextmanager
+def _timed(phase: str, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS.append(
+            {"phase": phase, "name": name, "ms": round((time.perf_counter() - t0) * 1000, 2)}
+        )
+
+
+with _timed("import", "Chat_Bot_Groq_final_v2"):
+    # dacă fișierul tău se numește altfel, schimbă linia de mai jos
+    from Chat_Bot_Groq_final_v2 import (
+        load_config,
+        answer_message,
+        answer_message_stream,
+        find_place,
+        generate_vibe_for_place,
+        lookup_cached_vibe,
+        parse_location,
+        REPLY_CACHE,
+        TURN_STATS,
+    )
+
+# ----------------- Global init (lazy) -----------------
+
+# Se inițializează la prima folosire (get_config / get_client / get_places), ca
+# --ping și request-urile invalide să nu plătească importul groq + JSON-ul de locații.
+CONFIG: Optional[Dict[str, Any]] = None
+CLIENT = None
+# PlacesReloader: dataset-ul curent (în --serve, reîncărcat când se schimbă LOCATIONS_PATH)
+PLACES_RELOADER = None
+MODEL: Optional[str] = None
+VIBE_CACHE = None
+_vibe_cache_ready = False
+
+_init_lock = threading.RLock()
+
+
+def get_config() -> Dict[str, Any]:
+    global CONFIG, MODEL
+    if CONFIG is None:
+        with _init_lock:
+            if CONFIG is None:
+                with _timed("init", "load_config"):
+                    config = load_config()
+                MODEL = config["model"]
+                CONFIG = config
+    return CONFIG
+
+
+def get_model() -> str:
+    return get_config()["model"]
+
+
+def get_client():
+    global CLIENT
+    if CLIENT is None:
+        with _init_lock:
+            if CLIENT is None:
+                config = get_config()
+                with _timed("import", "groq"):
+                    from groq import Groq
+                with _timed("init", "Groq client"):
+                    CLIENT = Groq(api_key=config["api_key"])
+    return CLIENT
+
+
+def get_places_reloader():
+    global PLACES_RELOADER
+    if PLACES_RELOADER is None:
+        with _init_lock:
+            if PLACES_RELOADER is None:
+                config = get_config()
+                with _timed("init", "load_places"):
+                    from places_reload import PlacesReloader
+
+                    PLACES_RELOADER = PlacesReloader(
+                        config["locations_path"], interval=config["places_reload_interval"]
+                    )
+    return PLACES_RELOADER
+
+
+def get_places() -> List[Dict[str, Any]]:
+    """Dataset-ul curent – un request îl ia o dată și lucrează pe el până la final."""
+    return get_places_reloader().current
 
-# ----------------- Global init -----------------
 
-CONFIG = load_config()
-CLIENT = Groq(api_key=CONFIG["api_key"])
-PLACES = load_places(CONFIG["locations_path"])
-MODEL = CONFIG["model"]
+def get_vibe_cache():
+    """VibeCache pe disc (sau None dacă VIBE_CACHE_PATH e gol)."""
+    global VIBE_CACHE, _vibe_cache_ready
+    if not _vibe_cache_ready:
+        with _init_lock:
+            if not _vibe_cache_ready:
+                from vibe_cache import open_vibe_cache
+
+                VIBE_CACHE = open_vibe_cache(get_config())
+                _vibe_cache_ready = True
+    return VIBE_CACHE
+
+
+def warm_up() -> None:
+    """Inițializează tot ce e lazy (folosit de --serve, ca primul request să nu plătească)."""
+    get_places()
+    with _timed("init", "indexes"):
+        # BM25, vectori, nume, ... – construite acum, nu în primul request
+        get_places_reloader().warm()
+    get_client()
+    get_vibe_cache()
 
 
 # ----------------- helper: chat -----------------
 
 
-def chat_single_turn(message: str, history: List[Dict[str, str]]) -> Dict[str, Any]:
+def _clean_history(history: Any) -> List[Dict[str, str]]:
     if not isinstance(history, list):
         history = []
 
@@ -42,13 +150,23 @@ def chat_single_turn(message: str, history: List[Dict[str, str]]) -> Dict[str, A
         content = item.get("content")
         if role in {"user", "assistant"} and isinstance(content, str):
             cleaned_history.append({"role": role, "content": content})
+    return cleaned_history
+
+
+def chat_single_turn(
+    message: str,
+    history: List[Dict[str, str]],
+    location: Optional[Tuple[float, float]] = None,
+) -> Dict[str, Any]:
+    cleaned_history = _clean_history(history)
 
     result = answer_message(
-        client=CLIENT,
-        model=MODEL,
-        places=PLACES,
+        client=get_client(),
+        model=get_model(),
+        places=get_places(),
         history=cleaned_history,
         user_input=message,
+        location=location,
     )
 
     return {
@@ -57,6 +175,33 @@ def chat_single_turn(message: str, history: List[Dict[str, str]]) -> Dict[str, A
     }
 
 
+def chat_single_turn_stream(
+    message: str,
+    history: List[Dict[str, str]],
+    emit_event: Callable[[Dict[str, Any]], None],
+    location: Optional[Tuple[float, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Ca chat_single_turn, dar trimite fiecare delta prin emit_event
+    ({"event": "delta", "delta": "..."}) și întoarce evenimentul final "done".
+    """
+    cleaned_history = _clean_history(history)
+
+    for event in answer_message_stream(
+        client=get_client(),
+        model=get_model(),
+        places=get_places(),
+        history=cleaned_history,
+        user_input=message,
+        location=location,
+    ):
+        if event["event"] == "done":
+            return event
+        emit_event(event)
+
+    raise RuntimeError("stream ended without a 'done' event")
+
+
 # ----------------- helper: vibe -----------------
 
 
@@ -64,21 +209,199 @@ def vibe_for_place_index(place_index: int) -> Dict[str, Any]:
     """
     Generează vibe pentru o locație, după index 1-based (ca în meniul din consolă).
     """
-    if not (1 <= place_index <= len(PLACES)):
+    places = get_places()
+    if not (1 <= place_index <= len(places)):
         raise ValueError(
-            f"place_index out of range: {place_index} (1..{len(PLACES)})"
+            f"place_index out of range: {place_index} (1..{len(places)})"
         )
 
-    place = PLACES[place_index - 1]  # 1-based -> 0-based
-    vibe_text = generate_vibe_for_place(CLIENT, MODEL, place)
+    place = places[place_index - 1]  # 1-based -> 0-based
+
+    # cache hit -> fără import groq / client (important pentru procesele one-shot)
+    cache = get_vibe_cache()
+    vibe_text = lookup_cached_vibe(cache, get_model(), place) if cache is not None else None
+    if vibe_text is None:
+        vibe_text = generate_vibe_for_place(get_client(), get_model(), place, cache=cache)
 
+    place_id = place.get("id")
     return {
         "place_index": place_index,
+        "place_id": place_id if isinstance(place_id, int) else None,
         "place_name": place.get("name", ""),
         "vibe": vibe_text,
     }
 
 
+# ----------------- request dispatch -----------------
+
+
+def handle_request(
+    data: Any,
+    emit_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Procesează un singur request deja parsat (dict) și întoarce răspunsul ca dict.
+
+    Erorile de validare / execuție sunt întoarse tot ca dict ({"error": ...}),
+    la fel ca în modul one-shot, ca Node să le poată trimite direct mai departe.
+
+    Pentru {"mode": "chat", "stream": true} evenimentele intermediare
+    ({"event": "delta", ...}) merg prin emit_event, iar valoarea întoarsă
+    e evenimentul final ({"event": "done", ...} sau {"error": ...}).
+    """
+    if not isinstance(data, dict):
+        return {"error": "invalid_json", "details": "expected a JSON object"}
+
+    mode = data.get("mode", "chat")
+
+    try:
+        if mode == "chat":
+            message = data.get("message", "")
+            history = data.get("history", [])
+
+            if not isinstance(message, str) or not message.strip():
+                return {"error": "message_required"}
+
+            try:
+                location = parse_location(data.get("location"))
+            except ValueError as e:
+                return {"error": "invalid_location", "details": str(e)}
+
+            if data.get("stream") and emit_event is not None:
+                return chat_single_turn_stream(
+                    message=message, history=history, emit_event=emit_event, location=location
+                )
+
+            return chat_single_turn(message=message, history=history, location=location)
+
+        elif mode == "vibe":
+            place_index = data.get("place_index", None)
+            place_id = data.get("place_id", None)
+            name = data.get("name", None)
+            if isinstance(place_index, int):
+                return vibe_for_place_index(place_index)
+
+            # sau după id-ul din dataset / nume (fuzzy: "old inn", "citadel")
+            if not isinstance(place_id, int) and not (isinstance(name, str) and name.strip()):
+                return {
+                    "error": "place_index_required",
+                    "details": (
+                        "For mode='vibe' you must send an integer 'place_index' (1-based), "
+                        "an integer 'place_id' or a 'name'."
+                    ),
+                }
+            pos = find_place(
+                get_places(),
+                place_id=place_id if isinstance(place_id, int) else None,
+                name=name.strip() if isinstance(name, str) and name.strip() else None,
+            )
+            if pos is None:
+                return {"error": "place_not_found", "details": f"place_id={place_id!r}, name={name!r}"}
+            return vibe_for_place_index(pos + 1)
+
+        elif mode == "ping":
+            return ping_payload()
+
+        else:
+            return {"error": "unknown_mode", "details": f"mode='{mode}'"}
+
+    except Exception as e:
+        return {"error": "internal_error", "details": str(e)}
+
+
+def ping_payload() -> Dict[str, Any]:
+    payload = {
+        "status": "ok",
+        "version": "chatBot.py v2",
+        "reply_cache": REPLY_CACHE.stats(),
+        # câte mesaje au primit răspuns local / din cache, fără Groq
+        "turns": TURN_STATS.stats(),
+    }
+    if PLACES_RELOADER is not None:
+        payload["places"] = PLACES_RELOADER.stats()
+    return payload
+
+
+def startup_report() -> Dict[str, Any]:
+    """
+    Timpi de import + init (ms) pentru un cold start complet: python chatBot.py --startup-report
+
+    Dependențele grele ale lui groq (pydantic, httpx) sunt importate separat,
+    înaintea lui groq, ca să apară fiecare cu costul propriu.
+    """
+    for module_name in ("dotenv", "pydantic", "httpx"):
+        if module_name not in sys.modules:
+            with _timed("import", module_name):
+                __import__(module_name)
+
+    warm_up()
+
+    return {
+        "timings": STARTUP_TIMINGS,
+        "total_ms": round((time.perf_counter() - _PROCESS_T0) * 1000, 2),
+        "places": len(get_places()),
+    }
+
+
+# ----------------- serve mode (worker persistent) -----------------
+
+
+def serve(stdin=None, stdout=None, max_workers: Optional[int] = None) -> None:
+    """
+    Worker persistent: citește request-uri JSON, câte unul pe linie, și scrie
+    răspunsurile tot ca JSON-lines, etichetate cu același "id".
+
+      stdin:  {"id": "42", "mode": "chat", "message": "...", "history": [...], "location": {"lat": .., "lon": ..}?}
+      stdout: {"id": "42", "reply": "...", "history": [...]}
+
+    Cu "stream": true, pentru același id vin mai multe linii
+    {"id": "42", "event": "delta", ...} și la final {"id": "42", "event": "done", ...}.
+
+    Request-urile rulează în paralel (thread pool), deci răspunsurile pot veni
+    în altă ordine decât cererile – Node le potrivește după "id".
+    Clientul Groq și PLACES sunt încărcate o singură dată, la pornire; LOCATIONS_PATH
+    e apoi urmărit în fundal și reîncărcat la schimbare (PLACES_RELOAD_INTERVAL).
+    """
+    warm_up()
+    get_places_reloader().start()
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    if max_workers is None:
+        max_workers = int(os.getenv("CHATBOT_SERVE_THREADS", "8"))
+
+    write_lock = threading.Lock()
+
+    def emit(payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, ensure_ascii=False)
+        with write_lock:
+            stdout.write(line + "\n")
+            stdout.flush()
+
+    def run(request_id: Any, data: Dict[str, Any]) -> None:
+        result = handle_request(data, emit_event=lambda event: emit({"id": request_id, **event}))
+        emit({"id": request_id, **result})
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for raw_line in stdin:
+            if not raw_line.strip():
+                continue
+
+            try:
+                data = json.loads(raw_line)
+            except json.JSONDecodeError as e:
+                emit({"id": None, "error": "invalid_json", "details": str(e)})
+                continue
+
+            request_id = data.get("id") if isinstance(data, dict) else None
+            # ping-ul (health check-ul din chatPool.py) nu stă la coadă după request-urile lente
+            if isinstance(data, dict) and data.get("mode") == "ping":
+                emit({"id": request_id, **ping_payload()})
+                continue
+            executor.submit(run, request_id, data)
+    # la EOF, executor-ul așteaptă request-urile încă în lucru înainte să ieșim
+
+
 # ----------------- CLI interface (Node / curl) -----------------
 
 
@@ -96,7 +419,7 @@ def main() -> None:
 
       {
         "mode": "vibe",
-        "place_index": 3
+        "place_index": 3            # sau "place_id": 16, sau "name": "old inn"
       }
 
     Output (JSON) pentru mode=chat:
@@ -110,14 +433,31 @@ def main() -> None:
 
       {
         "place_index": 3,
+        "place_id": 3,
         "place_name": "...",
         "vibe": "text vibe..."
       }
+
+    Cu "stream": true la mode=chat, output-ul e JSON-lines: câte o linie
+    {"event": "delta", "delta": "..."} pe măsură ce vine textul, iar ultima
+    linie e {"event": "done", "reply": "...", "history": [...]}.
+
+    Worker persistent (JSON-lines, vezi serve()):
+
+      python chatBot.py --serve
     """
 
     # health check: python chatBot.py --ping
     if len(sys.argv) > 1 and sys.argv[1] == "--ping":
-        print(json.dumps({"status": "ok", "version": "chatBot.py v2"}, ensure_ascii=False))
+        print(json.dumps(ping_payload(), ensure_ascii=False))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve()
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--startup-report":
+        print(json.dumps(startup_report(), ensure_ascii=False, indent=2))
         return
 
     raw = sys.stdin.read()
@@ -137,55 +477,10 @@ def main() -> None:
         )
         return
 
-    mode = data.get("mode", "chat")
-
-    try:
-        if mode == "chat":
-            message = data.get("message", "")
-            history = data.get("history", [])
-
-            if not isinstance(message, str) or not message.strip():
-                print(json.dumps({"error": "message_required"}, ensure_ascii=False))
-                return
-
-            result = chat_single_turn(message=message, history=history)
-            print(json.dumps(result, ensure_ascii=False))
-            return
+    def print_event(event: Dict[str, Any]) -> None:
+        print(json.dumps(event, ensure_ascii=False), flush=True)
 
-        elif mode == "vibe":
-            place_index = data.get("place_index", None)
-            if not isinstance(place_index, int):
-                print(
-                    json.dumps(
-                        {
-                            "error": "place_index_required",
-                            "details": "For mode='vibe' you must send an integer 'place_index' (1-based).",
-                        },
-                        ensure_ascii=False,
-                    )
-                )
-                return
-
-            result = vibe_for_place_index(place_index)
-            print(json.dumps(result, ensure_ascii=False))
-            return
-
-        else:
-            print(
-                json.dumps(
-                    {"error": "unknown_mode", "details": f"mode='{mode}'"},
-                    ensure_ascii=False,
-                )
-            )
-            return
-
-    except Exception as e:
-        print(
-            json.dumps(
-                {"error": "internal_error", "details": str(e)},
-                ensure_ascii=False,
-            )
-        )
+    print(json.dumps(handle_request(data, emit_event=print_event), ensure_ascii=False))
 
 
 if __name__ == "__main__":
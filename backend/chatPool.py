@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+"""
+Supervisor pentru un pool de workeri `chatBot.py --serve`.
+
+Vorbește același protocol JSON-lines ca un singur worker (un request pe linie,
+cu "id"), deci Node îl poate porni în locul lui `chatBot.py --serve`:
+
+  python chatPool.py --workers 4
+
+- pornește N workeri la start (fiecare încarcă o dată CLIENT / PLACES);
+- trimite fiecare request la workerul cel mai puțin ocupat;
+- dacă toți workerii sunt plini, request-ul așteaptă la coadă (cel mult
+  --queue-timeout secunde de la sosirea lui) în loc să fie respins imediat;
+  citirea de pe stdin nu se oprește cât timp coada așteaptă;
+- verifică periodic workerii cu un request "ping" (același răspuns ca --ping,
+  dat de worker direct din thread-ul de citire) și îi repornește pe cei care nu
+  mai răspund sau nu devin gata în --startup-timeout secunde;
+- reciclează un worker după --max-requests request-uri sau peste --max-rss-mb.
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHATBOT_PATH = os.path.join(BASE_DIR, "chatBot.py")
+
+
+# ----------------- helpers -----------------
+
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    """RSS-ul procesului în MB (Linux: /proc, macOS: ps). None dacă nu se poate citi."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+
+    try:
+        out = subprocess.run(
+            ["ps", "-o", "rss=", "-p", str(pid)],
+            capture_output=True,
+            text=True,
+            timeout=2,
+        ).stdout.strip()
+        return int(out) / 1024.0 if out else None
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+# ----------------- worker -----------------
+
+
+class Worker:
+    """Un proces `chatBot.py --serve` plus request-urile aflate în lucru pe el."""
+
+    def __init__(self, pool: "WorkerPool", worker_id: int):
+        self.pool = pool
+        self.worker_id = worker_id
+        self.proc = subprocess.Popen(
+            [sys.executable, CHATBOT_PATH, "--serve"],
+            cwd=BASE_DIR,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # stderr-ul workerului ajunge direct în log-ul părintelui
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        # id intern -> id-ul primit de la client (None pentru ping-urile pool-ului)
+        self.inflight: Dict[str, Any] = {}
+        self.served = 0
+        self.ready = False
+        self.draining = False
+        self.dead = False
+        self.started = time.monotonic()
+        self.last_pong = self.started
+        self.write_lock = threading.Lock()
+
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    @property
+    def load(self) -> int:
+        return len(self.inflight)
+
+    def send(self, internal_id: str, data: Dict[str, Any]) -> bool:
+        line = json.dumps({**data, "id": internal_id}, ensure_ascii=False)
+        try:
+            with self.write_lock:
+                self.proc.stdin.write(line + "\n")
+                self.proc.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def close(self) -> None:
+        """Închide stdin – workerul termină ce are în lucru și iese."""
+        try:
+            with self.write_lock:
+                self.proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+    def kill(self) -> None:
+        try:
+            self.proc.kill()
+        except OSError:
+            pass
+
+    def _read_loop(self) -> None:
+        for raw_line in self.proc.stdout:
+            if not raw_line.strip():
+                continue
+            try:
+                data = json.loads(raw_line)
+            except json.JSONDecodeError:
+                print(f"[chatPool] invalid JSON from worker {self.worker_id}: {raw_line!r}", file=sys.stderr)
+                continue
+            self.pool.on_response(self, data)
+        self.proc.wait()
+        self.pool.on_exit(self)
+
+
+# ----------------- pool -----------------
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        workers: int,
+        max_inflight: int,
+        max_requests: int,
+        max_rss_mb: float,
+        queue_timeout: float,
+        ping_interval: float,
+        ping_timeout: float,
+        startup_timeout: float,
+        stdout=None,
+    ):
+        self.size = workers
+        self.max_inflight = max_inflight
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.queue_timeout = queue_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.startup_timeout = startup_timeout
+        self.stdout = stdout or sys.stdout
+
+        self.workers: List[Worker] = []
+        # request-uri care așteaptă un worker liber: (id client, request, termen)
+        self.queue: Deque[Tuple[Any, Dict[str, Any], float]] = deque()
+        self.cond = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.closing = False
+        self._ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._failed_starts = 0
+
+    # ---- output către client ----
+
+    def emit(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, ensure_ascii=False)
+        with self.write_lock:
+            self.stdout.write(line + "\n")
+            self.stdout.flush()
+
+    # ---- lifecycle workeri ----
+
+    def _spawn(self) -> Worker:
+        """Pornește un worker și îi trimite un ping; devine 'ready' la primul pong."""
+        worker = Worker(self, next(self._worker_ids))
+        with self.cond:
+            self.workers.append(worker)
+        self._ping(worker)
+        return worker
+
+    def _ping(self, worker: Worker) -> None:
+        internal_id = f"ping-{next(self._ids)}"
+        with self.cond:
+            worker.inflight[internal_id] = None
+        if not worker.send(internal_id, {"mode": "ping"}):
+            with self.cond:
+                worker.inflight.pop(internal_id, None)
+
+    def start(self) -> None:
+        for _ in range(self.size):
+            self._spawn()
+
+        deadline = time.monotonic() + self.startup_timeout
+        with self.cond:
+            while not all(w.ready for w in self.workers):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+
+        threading.Thread(target=self._health_loop, daemon=True).start()
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+
+    def _retire(self, worker: Worker, replace: bool) -> None:
+        """Scoate workerul din rotație; fără request-uri în lucru îl închidem imediat."""
+        with self.cond:
+            if worker.draining:
+                return
+            worker.draining = True
+            idle = worker.load == 0
+        if replace and not self.closing:
+            self._spawn()
+        if idle:
+            worker.close()
+
+    def on_exit(self, worker: Worker) -> None:
+        with self.cond:
+            worker.dead = True
+            if worker in self.workers:
+                self.workers.remove(worker)
+            orphaned = [cid for cid in worker.inflight.values() if cid is not None]
+            worker.inflight.clear()
+            was_draining = worker.draining
+            self._failed_starts = 0 if worker.ready else self._failed_starts + 1
+            failed_starts = self._failed_starts
+            self.cond.notify_all()
+
+        for client_id in orphaned:
+            self.emit({"id": client_id, "error": "chatbot_failed", "details": "worker exited"})
+
+        if not was_draining and not self.closing:
+            # worker care moare la pornire (ex: lipsește GROQ_API_KEY) -> backoff, nu buclă de restart
+            delay = min(30.0, 0.5 * (2 ** failed_starts)) if failed_starts else 0.0
+            print(
+                f"[chatPool] worker {worker.worker_id} exited (code {worker.proc.returncode}), restarting in {delay:.1f}s",
+                file=sys.stderr,
+            )
+            timer = threading.Timer(delay, self._respawn)
+            timer.daemon = True
+            timer.start()
+
+    def _respawn(self) -> None:
+        if not self.closing:
+            self._spawn()
+
+    def on_response(self, worker: Worker, data: Dict[str, Any]) -> None:
+        internal_id = data.pop("id", None)
+
+        # delta-urile unui request cu "stream": true nu închid request-ul
+        if data.get("event") == "delta":
+            with self.cond:
+                client_id = worker.inflight.get(internal_id)
+            if client_id is not None:
+                self.emit({"id": client_id, **data})
+            return
+
+        with self.cond:
+            if internal_id not in worker.inflight:
+                return
+            client_id = worker.inflight.pop(internal_id)
+            is_ping = client_id is None
+            if is_ping:
+                worker.ready = True
+                worker.last_pong = time.monotonic()
+            else:
+                worker.served += 1
+            finished_draining = worker.draining and worker.load == 0
+            self.cond.notify_all()
+
+        if not is_ping:
+            self.emit({"id": client_id, **data})
+
+        if finished_draining:
+            worker.close()
+        elif not is_ping and worker.served >= self.max_requests:
+            self._retire(worker, replace=True)
+
+    # ---- dispatch ----
+
+    def _pick_worker(self) -> Optional[Worker]:
+        candidates = [
+            w
+            for w in self.workers
+            if w.ready and not w.draining and not w.dead and w.load < self.max_inflight
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: w.load)
+
+    def dispatch(self, client_id: Any, data: Dict[str, Any]) -> None:
+        """Pune request-ul la coadă; termenul (--queue-timeout) curge de la sosirea lui."""
+        with self.cond:
+            self.queue.append((client_id, data, time.monotonic() + self.queue_timeout))
+            self.cond.notify_all()
+
+    def _next_request(self) -> Optional[Tuple[Any, Dict[str, Any], Optional[Worker], str]]:
+        """
+        Primul request din coadă, cu workerul ales pentru el (None = termenul a
+        expirat) și id-ul intern; None când pool-ul se închide și coada e goală.
+        """
+        with self.cond:
+            while True:
+                if not self.queue:
+                    if self.closing:
+                        return None
+                    self.cond.wait()
+                    continue
+                client_id, data, deadline = self.queue[0]
+                worker = self._pick_worker()
+                remaining = deadline - time.monotonic()
+                if worker is None and remaining > 0:
+                    self.cond.wait(remaining)
+                    continue
+                self.queue.popleft()
+                internal_id = f"req-{next(self._ids)}"
+                if worker is not None:
+                    worker.inflight[internal_id] = client_id
+                self.cond.notify_all()
+                return client_id, data, worker, internal_id
+
+    def _dispatch_loop(self) -> None:
+        # coada e FIFO și termenele cresc odată cu ea, deci primul request expiră primul
+        while True:
+            item = self._next_request()
+            if item is None:
+                return
+            client_id, data, worker, internal_id = item
+            if worker is None:
+                self.emit({"id": client_id, "error": "pool_busy", "details": "no free worker within queue timeout"})
+                continue
+            if not worker.send(internal_id, data):
+                with self.cond:
+                    worker.inflight.pop(internal_id, None)
+                self.emit({"id": client_id, "error": "chatbot_failed", "details": "worker stdin closed"})
+
+    # ---- health checks ----
+
+    def _health_loop(self) -> None:
+        while not self.closing:
+            time.sleep(self.ping_interval)
+            now = time.monotonic()
+
+            with self.cond:
+                workers = [w for w in self.workers if not w.draining]
+
+            for worker in workers:
+                if worker.proc.poll() is not None:
+                    continue  # on_exit se ocupă de restart
+
+                if worker.ready and now - worker.last_pong > self.ping_interval + self.ping_timeout:
+                    print(f"[chatPool] worker {worker.worker_id} missed ping, killing", file=sys.stderr)
+                    worker.kill()
+                    continue
+
+                # blocat la pornire (import / încărcarea locațiilor) -> on_exit îl repornește cu backoff
+                if not worker.ready and now - worker.started > self.startup_timeout:
+                    print(f"[chatPool] worker {worker.worker_id} not ready after startup timeout, killing", file=sys.stderr)
+                    worker.kill()
+                    continue
+
+                rss = read_rss_mb(worker.proc.pid)
+                if rss is not None and rss > self.max_rss_mb:
+                    print(
+                        f"[chatPool] worker {worker.worker_id} RSS {rss:.0f}MB > {self.max_rss_mb:.0f}MB, recycling",
+                        file=sys.stderr,
+                    )
+                    self._retire(worker, replace=True)
+                    continue
+
+                self._ping(worker)
+
+    # ---- main loop ----
+
+    def serve(self, stdin=None) -> None:
+        stdin = stdin or sys.stdin
+        for raw_line in stdin:
+            if not raw_line.strip():
+                continue
+            try:
+                data = json.loads(raw_line)
+            except json.JSONDecodeError as e:
+                self.emit({"id": None, "error": "invalid_json", "details": str(e)})
+                continue
+            if not isinstance(data, dict):
+                self.emit({"id": None, "error": "invalid_json", "details": "expected a JSON object"})
+                continue
+
+            client_id = data.pop("id", None)
+            self.dispatch(client_id, data)
+
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """La EOF: coada se golește, workerii termină request-urile în lucru, apoi ies."""
+        with self.cond:
+            while self.queue:
+                self.cond.wait()
+            self.closing = True
+            self.cond.notify_all()
+            workers = list(self.workers)
+        for worker in workers:
+            self._retire(worker, replace=False)
+        for worker in workers:
+            worker.reader.join()
+
+
+# ----------------- CLI -----------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pool de workeri chatBot.py --serve")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("CHATBOT_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=int(os.getenv("CHATBOT_WORKER_MAX_INFLIGHT", "8")),
+        help="request-uri simultane per worker înainte să-l considerăm ocupat",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=int(os.getenv("CHATBOT_WORKER_MAX_REQUESTS", "1000")),
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        default=float(os.getenv("CHATBOT_WORKER_MAX_RSS_MB", "512")),
+    )
+    parser.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=float(os.getenv("CHATBOT_QUEUE_TIMEOUT", "30")),
+        help="secunde de așteptare când toți workerii sunt ocupați",
+    )
+    parser.add_argument("--ping-interval", type=float, default=15.0)
+    parser.add_argument("--ping-timeout", type=float, default=10.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    pool = WorkerPool(
+        workers=max(1, args.workers),
+        max_inflight=max(1, args.max_inflight),
+        max_requests=max(1, args.max_requests),
+        max_rss_mb=args.max_rss_mb,
+        queue_timeout=args.queue_timeout,
+        ping_interval=args.ping_interval,
+        ping_timeout=args.ping_timeout,
+        startup_timeout=args.startup_timeout,
+    )
+    pool.start()
+    pool.serve()
+
+
+if __name__ == "__main__":
+    main()
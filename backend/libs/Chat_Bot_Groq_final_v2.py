@@ -1,10 +1,30 @@
+import asyncio
 import os
-import json
+import heapq
 import re
-from typing import List, Dict, Any
-
-from groq import Groq
-from dotenv import load_dotenv
+import sys
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from place_search import BM25Index
+from prompt_fragments import PlaceParts, PromptFragments, compose_block, compose_place_prompt
+from reply_cache import ReplyCache
+from vibe_cache import vibe_cache_key
+
+# groq (+ httpx / pydantic) e importat doar când chiar avem nevoie de client,
+# ca procesele care nu ajung la LLM (--ping, erori de input) să pornească repede
+if TYPE_CHECKING:
+    from groq import AsyncGroq, Groq
+
+    from city_index import CityIndex
+    from geo_index import GeoIndex
+    from mention_matcher import MentionMatcher
+    from place_names import PlaceNameIndex
+    from place_store import PlaceStore
+    from query_analysis import QueryAnalysis
+    from structured_query import StructuredQuery
+    from vibe_cache import VibeCache
 
 
 # ------------- Config & loading -------------
@@ -12,6 +32,8 @@ from dotenv import load_dotenv
 
 def load_config() -> dict:
     """Load configuration from .env and return a simple dict."""
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     api_key = os.getenv("GROQ_API_KEY")
@@ -22,40 +44,109 @@ def load_config() -> dict:
     # default locations file (can be overridden via .env)
     locations_path = os.getenv("LOCATIONS_PATH", "locatii_cu_categorii.json")
 
+    # vibe cache pe disc (VIBE_CACHE_PATH gol = dezactivat)
+    vibe_cache_path = os.getenv("VIBE_CACHE_PATH", "vibe_cache.sqlite3")
+    vibe_cache_ttl = float(os.getenv("VIBE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    vibe_cache_max_entries = int(os.getenv("VIBE_CACHE_MAX_ENTRIES", "100000"))
+
+    # cât de des (secunde) verifică serverele long-running LOCATIONS_PATH (0 = fără reload)
+    places_reload_interval = float(os.getenv("PLACES_RELOAD_INTERVAL", "2"))
+
     return {
         "api_key": api_key,
         "model": model,
         "locations_path": locations_path,
+        "vibe_cache_path": vibe_cache_path,
+        "vibe_cache_ttl": vibe_cache_ttl if vibe_cache_ttl > 0 else None,
+        "vibe_cache_max_entries": vibe_cache_max_entries,
+        "places_reload_interval": places_reload_interval,
+        **load_vector_config(),
     }
 
 
-def load_places(path: str) -> List[Dict[str, Any]]:
+def load_vector_config() -> dict:
+    """
+    Setările pentru index-ul vectorial (nu cer GROQ_API_KEY):
+
+    - PLACE_VECTORS_PATH: matricea .npy construită la ingest (gol = calculată în memorie)
+    - EMBEDDINGS_BACKEND: 'hashing' (local, implicit) sau 'provider'
+    - EMBEDDINGS_MODEL / EMBEDDINGS_BASE_URL: pentru backend-ul 'provider'
+    - EMBEDDINGS_DIM: dimensiunea vectorilor pentru 'hashing'
+    """
+    return {
+        "place_vectors_path": os.getenv("PLACE_VECTORS_PATH", ""),
+        "embeddings_backend": os.getenv("EMBEDDINGS_BACKEND", "hashing"),
+        "embeddings_model": os.getenv("EMBEDDINGS_MODEL", ""),
+        "embeddings_base_url": os.getenv("EMBEDDINGS_BASE_URL", "") or None,
+        "embeddings_dim": int(os.getenv("EMBEDDINGS_DIM", "256")),
+    }
+
+
+def load_places(path: str, snapshot_path: Optional[str] = None) -> "PlaceStore":
     """
     Load places from JSON file.
 
     Accepts either:
     - dict with key 'locations' (format locatii_cu_categorii.json)
     - list of places (old simple format)
+    - JSONL: one place per line
+    Fișierul e citit în flux (places_stream.py), fiecare locație normalizată.
+
+    Dacă `path` e un director de shard-uri pe orașe (places_shards.py), se
+    citește doar manifestul: întoarcem un ShardedPlaces, iar fiecare oraș e
+    încărcat la prima întrebare despre el (vezi prepare_chat_turn).
+
+    Returnează un PlaceStore (place_store.py): locațiile pe coloane, dar cu
+    aceeași interfață ca lista de dict-uri (len, iterare, places[i]["name"]).
+    `fingerprint` (sha1 peste conținutul fișierului) e versiunea dataset-ului.
+
+    Dacă există un snapshot binar compilat din același JSON (vezi
+    places_snapshot.py; implicit <path>.snap, sau PLACES_SNAPSHOT_PATH), îl
+    deschidem cu mmap în loc să parsăm JSON-ul. Snapshot vechi sau lipsă ->
+    JSON, ca înainte. snapshot_path="" dezactivează snapshot-ul.
     """
     if not os.path.exists(path):
         raise FileNotFoundError(f"Locations file not found: {path}")
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    if os.path.isdir(path):
+        from places_shards import ShardedPlaces
 
-    if isinstance(data, dict) and "locations" in data:
-        places = data["locations"]
-    elif isinstance(data, list):
-        places = data
-    else:
-        raise ValueError("Unexpected JSON structure for locations")
+        return ShardedPlaces(path)
 
-    if not isinstance(places, list):
-        raise ValueError("Expected 'locations' to be a list")
+    snapshot = _open_places_snapshot(path, snapshot_path)
+    if snapshot is not None:
+        return snapshot
 
+    from place_store import PlaceStore
+    from places_stream import PlacesReader
+
+    # fișierul e citit pe bucăți, locație cu locație, direct în coloanele store-ului
+    reader = PlacesReader(path)
+    places = PlaceStore.from_places(reader, city_of=_address_city)
+    places.fingerprint = reader.sha1 or ""
+    if reader.skipped:
+        print(
+            f"[Warning] {reader.skipped} valori din {path} nu sunt locații (obiecte JSON) – ignorate.",
+            file=sys.stderr,
+        )
     return places
 
 
+def _open_places_snapshot(path: str, snapshot_path: Optional[str]):
+    """Snapshot-ul valid pentru `path`, sau None (lipsă sau vechi)."""
+    from places_snapshot import default_snapshot_path, open_snapshot
+
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(path)
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return None
+
+    snapshot = open_snapshot(snapshot_path, path)
+    if snapshot is None:
+        print(f"[Warning] Snapshot-ul {snapshot_path} e vechi față de {path} – citesc JSON-ul.", file=sys.stderr)
+    return snapshot
+
+
 # ------------- Basic helpers -------------
 
 
@@ -67,13 +158,18 @@ def extract_city(address: str) -> str:
     return parts[-1] if parts else ""
 
 
-def format_place_for_prompt(place: Dict[str, Any], idx: int) -> str:
+def _address_city(place: Dict[str, Any]) -> str:
+    return extract_city(place.get("address", ""))
+
+
+def place_prompt_parts(place: Dict[str, Any]) -> PlaceParts:
     """
-    Format a place into a readable string for the prompt.
+    Partea fixă din textul unei locații în prompt: (nume, detalii, restul liniilor).
 
     We include: name, city, address, rating, categories, short_description.
+    Numărul din listă și distanța se adaugă la asamblare (compose_place_prompt).
     """
-    name = place.get("name", f"Place {idx}")
+    name = place.get("name", "")
     address = place.get("address", "")
     rating = place.get("rating", None)
     short_desc = place.get("short_description", "")
@@ -81,7 +177,6 @@ def format_place_for_prompt(place: Dict[str, Any], idx: int) -> str:
 
     city = extract_city(address)
 
-    lines = [f"{idx}. {name}"]
     details = []
     if city:
         details.append(f"city: {city}")
@@ -90,25 +185,161 @@ def format_place_for_prompt(place: Dict[str, Any], idx: int) -> str:
     if rating is not None:
         details.append(f"rating: {rating}")
 
-    if details:
-        lines.append(" | ".join(details))
-
+    tail = ""
     if categories:
-        lines.append("categories: " + ", ".join(categories))
-
+        tail += "\ncategories: " + ", ".join(categories)
     if short_desc:
-        lines.append(f"description: {short_desc}")
+        tail += f"\ndescription: {short_desc}"
 
-    return "\n".join(lines)
+    return str(name or ""), " | ".join(details), tail
 
 
-def build_places_block(places: List[Dict[str, Any]]) -> str:
-    """Build a single text block with all places in the dataset."""
-    lines: List[str] = []
-    for idx, place in enumerate(places, start=1):
-        lines.append(format_place_for_prompt(place, idx))
-        lines.append("")  # empty line between places
-    return "\n".join(lines)
+def format_place_for_prompt(place: Dict[str, Any], idx: int, distance_km: Optional[float] = None) -> str:
+    """
+    Format a place into a readable string for the prompt.
+
+    We include: name, city, address, rating, categories, short_description
+    (+ distance față de user, dacă știm unde e).
+    """
+    return compose_place_prompt(place_prompt_parts(place), idx, distance_km)
+
+
+def build_places_block(places: List[Dict[str, Any]], distances: Optional[List[Optional[float]]] = None) -> str:
+    """Build a single text block with all places in the dataset (distances: km, în aceeași ordine)."""
+    return compose_block(
+        [
+            format_place_for_prompt(place, idx, distances[idx - 1] if distances else None)
+            for idx, place in enumerate(places, start=1)
+        ]
+    )
+
+
+# ------------- Derived indexes (per dataset) -------------
+
+
+# id(places) -> (places, {nume index: valoare}); ținem referința la places ca
+# id-ul să nu poată fi refolosit cât timp intrarea e în memo
+_DERIVED: Dict[int, tuple] = {}
+_DERIVED_LOCK = threading.Lock()
+_DERIVED_MAX_DATASETS = 4
+
+
+def derived(places: List[Dict[str, Any]], name: str, build):
+    """
+    Index / structură derivată din places, construită o singură dată per dataset
+    (per obiect places) și refolosită la request-urile următoare.
+    """
+    with _DERIVED_LOCK:
+        entry = _DERIVED.get(id(places))
+        if entry is not None and entry[0] is places and name in entry[1]:
+            return entry[1][name]
+
+    value = build()
+
+    with _DERIVED_LOCK:
+        entry = _DERIVED.get(id(places))
+        if entry is None or entry[0] is not places:
+            while len(_DERIVED) >= _DERIVED_MAX_DATASETS:
+                _DERIVED.pop(next(iter(_DERIVED)))
+            entry = (places, {})
+            _DERIVED[id(places)] = entry
+        return entry[1].setdefault(name, value)
+
+
+def reserve_derived_datasets(count: int) -> None:
+    """Ține în memo cel puțin `count` dataset-uri (ex: shard-urile încărcate simultan)."""
+    global _DERIVED_MAX_DATASETS
+    with _DERIVED_LOCK:
+        _DERIVED_MAX_DATASETS = max(_DERIVED_MAX_DATASETS, count)
+
+
+def peek_derived(places: List[Dict[str, Any]], name: str):
+    """Structura `name` a lui places dacă a fost deja construită, altfel None (fără s-o construim)."""
+    with _DERIVED_LOCK:
+        entry = _DERIVED.get(id(places))
+        if entry is not None and entry[0] is places:
+            return entry[1].get(name)
+    return None
+
+
+def forget_derived(places: List[Dict[str, Any]]) -> None:
+    """Scoate din memo structurile lui places (ex: o versiune veche a dataset-ului, după reload)."""
+    with _DERIVED_LOCK:
+        entry = _DERIVED.get(id(places))
+        if entry is not None and entry[0] is places:
+            del _DERIVED[id(places)]
+
+
+def get_city_index(places: List[Dict[str, Any]]) -> "CityIndex":
+    """Orașele dataset-ului: cheie normalizată -> poziții + aliasuri (construit o dată)."""
+    from city_index import CityIndex
+
+    return derived(places, "cities", lambda: CityIndex(get_store(places), known_cities=KNOWN_CITIES))
+
+
+def get_store(places: List[Dict[str, Any]]) -> "PlaceStore":
+    """
+    PlaceStore-ul dataset-ului: chiar `places` dacă e deja unul (load_places),
+    altfel construit o dată din lista de dict-uri.
+    """
+    from place_store import PlaceStore
+
+    if isinstance(places, PlaceStore):
+        return places
+    return derived(
+        places,
+        "store",
+        lambda: PlaceStore.from_places(
+            places, city_of=_address_city, fingerprint=getattr(places, "fingerprint", "")
+        ),
+    )
+
+
+def get_geo_index(places: List[Dict[str, Any]]) -> "GeoIndex":
+    """Grid-ul spațial peste coordonatele locațiilor (construit o dată)."""
+    from geo_index import GeoIndex
+
+    return derived(places, "geo", lambda: GeoIndex(get_store(places)))
+
+
+# (lat, long) – locația userului, trimisă opțional de aplicație
+Location = Tuple[float, float]
+
+
+def parse_location(value: Any) -> Optional[Location]:
+    """
+    Locația userului din request: {"lat": .., "lon"/"long"/"lng": ..} sau [lat, lon].
+    None / {} -> None; coordonate invalide -> ValueError.
+    """
+    if value is None or value == {}:
+        return None
+    if isinstance(value, dict):
+        lat = value.get("lat", value.get("latitude"))
+        lon = next((value[k] for k in ("lon", "long", "lng", "longitude") if k in value), None)
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        lat, lon = value
+    else:
+        raise ValueError("location must be {'lat': .., 'lon': ..} or [lat, lon]")
+
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError("location lat / lon must be numbers") from None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError(f"location out of range: ({lat}, {lon})")
+    return lat, lon
+
+
+def distances_km(places: List[Dict[str, Any]], positions: List[int], location: Location) -> List[Optional[float]]:
+    """Distanța (km) de la `location` la fiecare poziție; None pentru locațiile fără coordonate."""
+    import numpy as np
+
+    from geo_index import haversine_km
+
+    store = get_store(places)
+    idx = np.asarray(positions, dtype=np.int64)
+    dist = haversine_km(location[0], location[1], store.lat[idx], store.long[idx])
+    return [None if np.isnan(d) else float(d) for d in dist.tolist()]
 
 
 # ------------- Language + intent detection -------------
@@ -140,100 +371,225 @@ def tokenize_intent(text: str) -> List[str]:
     return re.findall(r"[a-z]+", normalized)
 
 
-def detect_language(text: str) -> str:
+def analyze_message(text: str, places: Optional[List[Dict[str, Any]]] = None) -> "QueryAnalysis":
     """
-    Simple RO vs EN detection based on tokens.
-    Returns 'ro' or 'en'.
-    """
-    tokens = set(tokenize_intent(text))
-
-    ro_hints = {
-        "unde",
-        "ce",
-        "imi",
-        "vreau",
-        "pot",
-        "nu",
-        "loc",
-        "locuri",
-        "locatii",
-        "oras",
-        "mancare",
-        "cafea",
-        "cafenea",
-        "cafenele",
-        "pranz",
-        "cina",
-        "prieteni",
-        "gasca",
-        "ieftin",
-        "scump",
-    }
+    Analiza mesajului (query_analysis.py): text normalizat, tokeni, limbă,
+    intenții, categorii și – dacă știm dataset-ul – orașul și locațiile
+    menționate. Se face o singură dată per mesaj; detectoarele de mai jos sunt
+    doar scurtături peste ea.
+    """
+    from query_analysis import analyze_query
 
-    en_hints = {
-        "what",
-        "where",
-        "which",
-        "places",
-        "place",
-        "location",
-        "locations",
-        "coffee",
-        "brunch",
-        "breakfast",
-        "lunch",
-        "dinner",
-        "cheap",
-        "expensive",
-        "friends",
-        "date",
-        "cozy",
-        "burger",
-        "pizza",
-        "vegan",
-        "pub",
-        "bar",
-        "remote",
-        "work",
-    }
+    return analyze_query(text, get_mention_matcher(places) if places is not None else None)
 
-    ro_hits = len(tokens & ro_hints)
-    en_hits = len(tokens & en_hints)
-
-    if en_hits > ro_hits:
-        return "en"
-    if ro_hits > en_hits:
-        return "ro"
-
-    # fallback: dacă apar clar cuvinte englezești
-    if tokens & en_hints:
-        return "en"
-
-    # altfel default RO (aplicația e locală)
-    return "ro"
-
-
-CITY_TOKENS = {
-    "bucharest",
-    "bucuresti",
-    "cluj",
-    "napoca",
-    "clujnapoca",
-    "timisoara",
-    "iasi",
-    "brasov",
-    "sibiu",
-    "constanta",
-    "oradea",
-    "galati",
-    "craiova",
-    "ploiesti",
-    "targu",
-    "targumures",
-    "mures",
-    "alba",
-    "iulia",
-}
+
+def get_mention_matcher(places: List[Dict[str, Any]]) -> "MentionMatcher":
+    """
+    Automatul de mențiuni al dataset-ului (mention_matcher.py), construit o dată:
+    aliasurile orașelor, expresiile categoriilor și vocabularul întrebărilor
+    structurate (intent_rules.json), numele locațiilor (value = pozițiile
+    locațiilor cu acel nume). Un mesaj e parcurs o singură dată, oricâte
+    tipare ar fi.
+    """
+    from mention_matcher import MentionMatcher
+    from query_analysis import load_intent_rules
+
+    def build() -> "MentionMatcher":
+        store = get_store(places)
+        cities = get_city_index(places)
+        patterns = [(alias, "city", key) for alias, key in cities.aliases.items()]
+        rules = load_intent_rules()
+        patterns += rules.category_patterns() + rules.query_patterns()
+        # o locație numită exact ca un oraș / o categorie ("Pizzeria") nu fură mențiunea
+        taken = {text for text, _kind, _value in patterns}
+        # nume -> pozițiile locațiilor cu numele ăsta (lanțuri, nume între ghilimele comune)
+        named: Dict[str, List[int]] = {}
+        for pos in range(len(store)):
+            for name in place_name_patterns(store.field(pos, "name") or ""):
+                if name not in taken:
+                    named.setdefault(name, []).append(pos)
+        patterns += [(name, "place", tuple(positions)) for name, positions in named.items()]
+        # aliasurile, expresiile din reguli și numele sunt deja normalizate (fold_text)
+        return MentionMatcher(patterns, normalize=False)
+
+    return derived(places, "mentions", build)
+
+
+def place_name_patterns(name: str) -> List[str]:
+    """
+    Cum poate fi pomenită o locație în mesaj: numele complet și partea dintre
+    ghilimele. Nume de un singur cuvânt scurt ("Bar", "Zen") nu intră – s-ar
+    potrivi peste cuvinte obișnuite.
+    """
+    from city_index import fold_text
+    from place_names import name_variants
+
+    out: List[str] = []
+    for candidate in name_variants(name):
+        folded = fold_text(candidate)
+        if folded and (" " in folded or len(folded) >= 5) and folded not in out:
+            out.append(folded)
+    return out
+
+
+# ------------- locații pomenite după nume (fuzzy) -------------
+
+# câte cuvinte consecutive din mesaj încercăm ca nume de locație
+PLACE_NAME_MAX_WORDS = 3
+# câte locații pomenite după nume intră în prompt (lanțuri, nume aproape identice)
+PLACE_REFERENCE_MAX = int(os.getenv("PLACE_REFERENCE_MAX", "3"))
+# scorul minim al fiecărui cuvânt dintr-o fereastră față de numele găsit ("town" în "The Old Inn" ~ 0)
+PLACE_NAME_MIN_WORD_SCORE = 0.25
+
+
+def get_name_index(places: List[Dict[str, Any]]) -> "PlaceNameIndex":
+    """Indexul de trigrame peste numele locațiilor (place_names.py), construit o dată per dataset."""
+    from place_names import PlaceNameIndex
+
+    return derived(places, "names", lambda: PlaceNameIndex([place.get("name") or "" for place in get_store(places)]))
+
+
+def referenced_places(
+    places: List[Dict[str, Any]],
+    analysis: "QueryAnalysis",
+    within: Optional[List[int]] = None,
+) -> List[int]:
+    """
+    Locațiile despre care întreabă mesajul ("ce părere ai de Citadel?"),
+    opțional doar dintre pozițiile `within` (orașul din mesaj).
+
+    Întâi numele exacte (mențiunile "place" ale automatului), apoi căutarea
+    fuzzy (place_names.py) peste cuvintele pe care nu le explică nimic altceva
+    – nu orașe, categorii, vocabularul întrebărilor sau cuvinte obișnuite –
+    câte cel mult PLACE_NAME_MAX_WORDS consecutive.
+    """
+    from place_search import STOPWORDS
+    from query_analysis import load_intent_rules
+
+    allowed = set(within) if within is not None else None
+    exact: List[int] = []
+    for mention in analysis.mentioned("place"):
+        exact += [pos for pos in mention.value if allowed is None or pos in allowed]
+    if exact:
+        return list(dict.fromkeys(exact))[:PLACE_REFERENCE_MAX]
+
+    common = load_intent_rules().common_words
+    tokens = analysis.tokens
+    explained = [False] * len(tokens)
+    for mention in analysis.mentions:
+        if mention.kind != "place":
+            explained[mention.start : mention.end] = [True] * mention.length
+
+    # porțiunile de cuvinte rămase, ca "think about" / "old inn" în "what do you think about the old inn"
+    runs: List[List[str]] = [[]]
+    for i, token in enumerate(tokens):
+        if explained[i] or token in common or token in STOPWORDS:
+            runs.append([])
+        else:
+            runs[-1].append(token)
+
+    import numpy as np
+
+    index = get_name_index(places)
+    within_array = np.asarray(within, dtype=np.int64) if within is not None else None
+    best: List[Tuple[int, float]] = []
+    for run in runs:
+        for size in range(1, min(PLACE_NAME_MAX_WORDS, len(run)) + 1):
+            for start in range(len(run) - size + 1):
+                words = run[start : start + size]
+                # un singur cuvânt scurt ("bar", "ok") se potrivește peste prea multe nume
+                if size == 1 and len(words[0]) < 5:
+                    continue
+                found = index.resolve(" ".join(words), k=PLACE_REFERENCE_MAX, within=within_array)
+                if not found or (best and found[0][1] <= best[0][1]):
+                    continue
+                # "old town" nu e "The Old Inn": fiecare cuvânt trebuie să apară în nume
+                if size > 1:
+                    own = np.array([found[0][0]])
+                    scores = [index.lookup(word, k=1, within=own) for word in words]
+                    if not all(score and score[0][1] >= PLACE_NAME_MIN_WORD_SCORE for score in scores):
+                        continue
+                best = found
+    return [pos for pos, _score in best]
+
+
+def find_place(places: List[Dict[str, Any]], place_id: Optional[int] = None, name: Optional[str] = None) -> Optional[int]:
+    """
+    Poziția (în places) locației cu `place_id` (câmpul "id" din dataset) sau
+    a celei mai apropiate de `name` (căutare fuzzy, ca în chat); None dacă
+    nu există / numele nu e destul de clar.
+
+    Pe un dataset cu shard-uri, id-urile și numele din manifest aleg shard-ul
+    (numele: orașul din el, altfel cel mai apropiat nume din tot dataset-ul);
+    doar shard-ul ăla e încărcat și caută ca un dataset obișnuit.
+    """
+    import numpy as np
+
+    shard_for_query = getattr(places, "shard_for_query", None)
+    if shard_for_query is not None:
+        keys: List[Optional[str]] = []
+        if place_id is not None:
+            keys = [places.shard_of(pos) for pos in places.id_positions(place_id)]
+        elif name:
+            key = places.city_in_text(name)
+            if key is None:
+                found = places.name_index().resolve(name, k=1)
+                key = places.shard_of(found[0][0]) if found else None
+            keys = [key]
+        for key in dict.fromkeys(key for key in keys if key is not None):
+            found = find_place(places.shard(key), place_id=place_id, name=name)
+            if found is not None:
+                return places.offset(key) + found
+        return None
+
+    if place_id is not None:
+        store = get_store(places)
+        for pos in np.flatnonzero(store.ids == place_id).tolist():
+            if store[pos].get("id") == place_id:  # 0 = locație fără id
+                return pos
+        return None
+    if name:
+        from city_index import fold_text
+
+        # numele exact (complet sau partea dintre ghilimele) are prioritate, ca în chat
+        tokens = fold_text(name).split()
+        mentions = get_mention_matcher(places).find_all(tokens)
+        for mention in mentions:
+            if mention.kind == "place" and mention.start == 0 and mention.end == len(tokens):
+                return mention.value[0]
+        # orașul din nume ("shamrock iasi") a ales deja shard-ul; la scor doar diluează
+        city = {i for m in mentions if m.kind == "city" for i in range(m.start, m.end)}
+        rest = [token for i, token in enumerate(tokens) if i not in city]
+        found = get_name_index(places).resolve(" ".join(rest) if rest else name, k=1)
+        return found[0][0] if found else None
+    return None
+
+
+def detect_language(text: str) -> str:
+    """
+    RO vs EN detection: trigrame de caractere (lang_id.py), cu cuvintele-indiciu
+    ca rezervă pentru mesajele foarte scurte. Returns 'ro' or 'en'.
+    """
+    return analyze_message(text).lang
+
+
+# orașe recunoscute în întrebări chiar dacă nu au (încă) locații în dataset;
+# orașele din adrese sunt recunoscute automat (vezi city_index.py)
+KNOWN_CITIES = [
+    "Bucharest",
+    "Cluj-Napoca",
+    "Timișoara",
+    "Iași",
+    "Brașov",
+    "Sibiu",
+    "Constanța",
+    "Oradea",
+    "Galați",
+    "Craiova",
+    "Ploiești",
+    "Târgu Mureș",
+    "Alba Iulia",
+]
 
 
 def is_all_places_question(query: str) -> bool:
@@ -244,32 +600,7 @@ def is_all_places_question(query: str) -> bool:
     - 'What locations do you have?'
     - 'List all places you know'
     """
-    tokens = set(tokenize_intent(query))
-
-    # dacă apare un oraș, nu tratăm ca întrebare globală
-    if tokens & CITY_TOKENS:
-        return False
-
-    # Romanian: questions explicitly about "locații / locuri"
-    if {"locatii", "locuri", "localuri"} & tokens:
-        if {"ce", "care"} & tokens and {"ai", "aveti", "sunt"} & tokens:
-            return True
-        if "aplicatie" in tokens:
-            return True
-        if "baza" in tokens and "date" in tokens:
-            return True
-        if "toate" in tokens:
-            return True
-
-    # English: all places / locations you have
-    if ("places" in tokens or "locations" in tokens) and (
-        "all" in tokens
-        or "list" in tokens
-        or ("have" in tokens and "you" in tokens)
-    ):
-        return True
-
-    return False
+    return analyze_message(query).has("list_all")
 
 
 def is_restaurants_list_question(query: str) -> bool:
@@ -278,15 +609,7 @@ def is_restaurants_list_question(query: str) -> bool:
     - 'Poți să-mi listezi toate restaurantele pe care le știi?'
     - 'List all restaurants you know'
     """
-    tokens = set(tokenize_intent(query))
-
-    if {"restaurant", "restaurante", "restaurantele", "restaurants"} & tokens:
-        if {"toate", "all", "listezi", "list"} & tokens:
-            return True
-        if "stii" in tokens or "stiti" in tokens or "know" in tokens:
-            return True
-
-    return False
+    return analyze_message(query).has("list_restaurants")
 
 
 def is_cafes_list_question(query: str) -> bool:
@@ -295,37 +618,7 @@ def is_cafes_list_question(query: str) -> bool:
     - 'Ce cafenele ai în baza ta de date?'
     - 'What coffee shops do you have?'
     """
-    tokens = set(tokenize_intent(query))
-
-    cafe_tokens = {
-        "cafenea",
-        "cafenele",
-        "cafea",
-        "cafe",
-        "coffee",
-        "coffeeshop",
-        "coffeeshops",
-        "shop",
-        "shops",
-    }
-    has_cafe_word = bool(cafe_tokens & tokens)
-
-    if not has_cafe_word:
-        return False
-
-    # Romanian list-style
-    if {"ce", "care", "toate"} & tokens and {"ai", "aveti"} & tokens:
-        return True
-    if "baza" in tokens and "date" in tokens:
-        return True
-    if "listezi" in tokens or "list" in tokens:
-        return True
-
-    # English: "what coffee shops do you have"
-    if "what" in tokens and ("have" in tokens or "got" in tokens):
-        return True
-
-    return False
+    return analyze_message(query).has("list_cafes")
 
 
 # ------------- Type classification via categories -------------
@@ -348,24 +641,24 @@ CAFE_CATEGORIES = {
 }
 
 
-def get_restaurants(places: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Return places that look like restaurants / mâncare."""
-    result: List[Dict[str, Any]] = []
-    for p in places:
-        cats = set(p.get("categories", []))
-        if cats & RESTAURANT_CATEGORIES:
-            result.append(p)
-    return result
+def _city_positions(places: List[Dict[str, Any]], city: Optional[str]):
+    """Pozițiile locațiilor din `city` (nume sau alias, ex: 'Bucuresti'); None = fără filtru."""
+    if not city:
+        return None
+    cities = get_city_index(places)
+    return cities.positions(cities.resolve(city) or "")
+
 
+def get_restaurants(places: List[Dict[str, Any]], city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Return places that look like restaurants / mâncare (optional, doar dintr-un oraș)."""
+    store = get_store(places)
+    return store.views(store.filter(categories=RESTAURANT_CATEGORIES, within=_city_positions(places, city)))
 
-def get_cafes(places: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Return places that look like cafés / coffee places."""
-    result: List[Dict[str, Any]] = []
-    for p in places:
-        cats = set(p.get("categories", []))
-        if cats & CAFE_CATEGORIES:
-            result.append(p)
-    return result
+
+def get_cafes(places: List[Dict[str, Any]], city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Return places that look like cafés / coffee places (optional, doar dintr-un oraș)."""
+    store = get_store(places)
+    return store.views(store.filter(categories=CAFE_CATEGORIES, within=_city_positions(places, city)))
 
 
 def _format_rating(rating: Any) -> str:
@@ -379,101 +672,601 @@ def _format_rating(rating: Any) -> str:
 # ------------- Direct answers (fără Groq) -------------
 
 
-def handle_list_all_places(places: List[Dict[str, Any]], lang: str) -> str:
-    """Answer 'what locations do you have' using ONLY Python."""
-    total = len(places)
+# răspunsurile-listă sunt paginate: pe o pagină, cel mult LIST_PAGE_CITIES blocuri
+# de câte LIST_PAGE_SIZE locații dintr-un oraș – mărimea răspunsului nu crește cu dataset-ul
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "10"))
+LIST_PAGE_CITIES = int(os.getenv("LIST_PAGE_CITIES", "8"))
 
-    # group by city
-    by_city: Dict[str, List[Dict[str, Any]]] = {}
-    for p in places:
-        city = extract_city(p.get("address", "")) or "Other"
-        by_city.setdefault(city, []).append(p)
 
-    lines: List[str] = []
+def is_more_request(query: str) -> bool:
+    """Detect follow-ups like 'mai multe', 'încă', 'more', 'next'."""
+    return analyze_message(query).has("more")
 
-    if lang == "en":
-        lines.append(f"I know {total} places in the app. Here they are grouped by city:")
-    else:
-        lines.append(f"Am {total} locații în aplicație. Uite-le grupate pe oraș:")
 
-    for city in sorted(by_city.keys()):
-        lines.append(f"\n{city}:")
-        for p in by_city[city]:
+def _city_blocks(places: List[Dict[str, Any]], positions) -> List[Tuple[str, Any]]:
+    """Pozițiile grupate pe oraș (nume afișat, poziții în ordinea din dataset), orașele sortate după nume."""
+    import numpy as np
+
+    cities = get_city_index(places)
+    positions = np.asarray(positions, dtype=np.int64)
+    keys = cities.place_city_key[positions]
+    order = np.argsort(keys, kind="stable")
+    keys, positions = keys[order], positions[order]
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+
+    blocks = []
+    for group_keys, group in zip(np.split(keys, bounds), np.split(positions, bounds)):
+        if group.size:
+            key_id = int(group_keys[0])
+            blocks.append((cities.name(cities.city_keys[key_id]) if key_id >= 0 else "Other", group))
+    blocks.sort(key=lambda block: block[0])
+    return blocks
+
+
+def _top_by_rating(places: List[Dict[str, Any]], positions, k: int) -> List[int]:
+    """Cele mai bine cotate k poziții (heap, fără sortarea tuturor); la egalitate, ordinea din dataset."""
+    ratings = get_store(places).ratings_or(0.0, positions).tolist()
+    top = heapq.nlargest(k, zip(ratings, (-positions).tolist()))
+    return [-neg_pos for _rating, neg_pos in top]
+
+
+def _ranked_list_reply(places: List[Dict[str, Any]], positions, lang: str, header: str, page: int) -> str:
+    """
+    Pagina `page` dintr-o listă: întâi top LIST_PAGE_SIZE din fiecare oraș, apoi
+    următoarele LIST_PAGE_SIZE din fiecare oraș, ș.a.m.d. – câte LIST_PAGE_CITIES
+    blocuri (oraș, rang) pe pagină.
+    """
+    blocks = _city_blocks(places, positions)
+    size, first = LIST_PAGE_SIZE, page * LIST_PAGE_CITIES
+
+    # blocurile (oraș, rang) ale paginii, plus câte locații acoperă paginile de până acum
+    chunks: List[Tuple[str, Any, int]] = []
+    seen = shown = 0
+    rank = 0
+    while len(chunks) < LIST_PAGE_CITIES:
+        row = [(city, group) for city, group in blocks if group.size > rank * size]
+        if not row:
+            break
+        for city, group in row:
+            if seen >= first + LIST_PAGE_CITIES:
+                break
+            if seen >= first:
+                chunks.append((city, group, rank))
+            shown += min(size, group.size - rank * size)
+            seen += 1
+        rank += 1
+
+    if not chunks:
+        return "Asta a fost toată lista." if lang != "en" else "That was the whole list."
+
+    lines: List[str] = [header] if page == 0 else ["Next ones:" if lang == "en" else "Următoarele:"]
+    for city, group, rank in chunks:
+        if rank == 0:
+            lines.append(f"\n{city}:")
+        else:
+            lines.append(f"\n{city} (continued):" if lang == "en" else f"\n{city} (continuare):")
+        top = _top_by_rating(places, group, (rank + 1) * size)[rank * size :]
+        for p in get_store(places).views(top):
             name = p.get("name", "Unknown place")
             rating_str = _format_rating(p.get("rating"))
             lines.append(f"  • {name} (rating {rating_str})")
 
+    remaining = len(positions) - shown
+    if remaining > 0:
+        if lang == "en":
+            lines.append(f"\n({remaining} more on the list – say “more” to see the next ones.)")
+        else:
+            lines.append(f"\n(Mai am {remaining} în listă – scrie „mai multe” ca să le vezi pe următoarele.)")
     return "\n".join(lines)
 
 
-def handle_list_restaurants(places: List[Dict[str, Any]], lang: str) -> str:
-    """Answer 'list all restaurants you know'."""
-    restaurants = get_restaurants(places)
-    if not restaurants:
+def _shard_city(places: List[Dict[str, Any]], dataset: Optional[Sequence] = None) -> Optional[str]:
+    """
+    Orașul lui `places` când e doar shard-ul unui oraș din `dataset`
+    (places_shards.py); None când places e tot dataset-ul.
+    """
+    if dataset is None or dataset is places:
+        return None
+    cities = get_city_index(places)
+    return cities.name(cities.city_keys[0]) if len(cities.city_keys) == 1 else None
+
+
+def handle_list_all_places(
+    places: List[Dict[str, Any]], lang: str, page: int = 0, dataset: Optional[Sequence] = None
+) -> str:
+    """Answer 'what locations do you have' using ONLY Python (cele mai bine cotate, pe oraș)."""
+    total = len(places)
+    shard_city = _shard_city(places, dataset)
+    if shard_city is not None:
+        # doar un oraș e încărcat: totalul și celelalte orașe vin din manifest
+        cities = dataset.cities()
+        shown = ", ".join(f"{city} {count}" for city, count in cities[:LIST_PAGE_CITIES])
+        if len(cities) > LIST_PAGE_CITIES:
+            shown += ", …"
+        if lang == "en":
+            header = (
+                f"I know {len(dataset)} places in the app, in {len(cities)} cities ({shown}). "
+                f"Here are the best rated ones in {shard_city} – ask about a city to see its places:"
+            )
+        else:
+            header = (
+                f"Am {len(dataset)} locații în aplicație, în {len(cities)} orașe ({shown}). "
+                f"Uite-le pe cele mai bine cotate din {shard_city} – întreabă de un oraș ca să-i vezi locațiile:"
+            )
+    elif lang == "en":
+        header = f"I know {total} places in the app. Here are the best rated ones, grouped by city:"
+    else:
+        header = f"Am {total} locații în aplicație. Uite-le pe cele mai bine cotate, grupate pe oraș:"
+    return _ranked_list_reply(places, range(total), lang, header, page)
+
+
+def handle_list_restaurants(
+    places: List[Dict[str, Any]],
+    lang: str,
+    city: Optional[str] = None,
+    page: int = 0,
+    dataset: Optional[Sequence] = None,
+) -> str:
+    """Answer 'list all restaurants you know' (optional, doar dintr-un oraș)."""
+    store = get_store(places)
+    restaurants = store.filter(categories=RESTAURANT_CATEGORIES, within=_city_positions(places, city))
+    shard_city = _shard_city(places, dataset)
+    if not len(restaurants):
+        if city or shard_city:
+            name = get_city_index(places).name(city) if city else shard_city
+            return f"I don't have any restaurants in {name} yet." if lang == "en" else f"Momentan nu am restaurante în {name}."
         if lang == "en":
             return "I don't have any restaurants in my dataset yet."
         else:
             return "Momentan nu am restaurante în baza de date."
 
-    # group by city
-    by_city: Dict[str, List[Dict[str, Any]]] = {}
-    for p in restaurants:
-        city = extract_city(p.get("address", "")) or "Other"
-        by_city.setdefault(city, []).append(p)
-
-    lines: List[str] = []
-    if lang == "en":
-        lines.append("Here are all the restaurants and food places I know, grouped by city:")
+    if shard_city is not None:
+        if lang == "en":
+            header = f"Here are the best rated restaurants and food places I know in {shard_city}:"
+        else:
+            header = f"Uite cele mai bine cotate restaurante și locuri de mâncare din {shard_city}:"
+    elif lang == "en":
+        header = "Here are the best rated restaurants and food places I know, grouped by city:"
     else:
-        lines.append(
-            "Uite toate restaurantele și locurile de mâncare pe care le am în aplicație, grupate pe oraș:"
-        )
-
-    for city in sorted(by_city.keys()):
-        lines.append(f"\n{city}:")
-        for p in by_city[city]:
-            name = p.get("name", "Unknown place")
-            rating_str = _format_rating(p.get("rating"))
-            lines.append(f"  • {name} (rating {rating_str})")
-
-    return "\n".join(lines)
+        header = "Uite cele mai bine cotate restaurante și locuri de mâncare din aplicație, grupate pe oraș:"
+    return _ranked_list_reply(places, restaurants, lang, header, page)
 
 
-def handle_list_cafes(places: List[Dict[str, Any]], lang: str) -> str:
-    """Answer 'what cafes / coffee shops do you have'."""
-    cafes = get_cafes(places)
-    if not cafes:
+def handle_list_cafes(
+    places: List[Dict[str, Any]],
+    lang: str,
+    city: Optional[str] = None,
+    page: int = 0,
+    dataset: Optional[Sequence] = None,
+) -> str:
+    """Answer 'what cafes / coffee shops do you have' (optional, doar dintr-un oraș)."""
+    store = get_store(places)
+    cafes = store.filter(categories=CAFE_CATEGORIES, within=_city_positions(places, city))
+    shard_city = _shard_city(places, dataset)
+    if not len(cafes):
+        if city or shard_city:
+            name = get_city_index(places).name(city) if city else shard_city
+            return f"I don't have any cafés in {name} yet." if lang == "en" else f"Momentan nu am cafenele în {name}."
         if lang == "en":
             return "I don't have any cafés or coffee shops in my dataset yet."
         else:
             return "Momentan nu am cafenele în baza de date."
 
-    by_city: Dict[str, List[Dict[str, Any]]] = {}
-    for p in cafes:
-        city = extract_city(p.get("address", "")) or "Other"
-        by_city.setdefault(city, []).append(p)
-
-    lines: List[str] = []
-    if lang == "en":
-        lines.append("Here are all the cafés and coffee places I know:")
+    if shard_city is not None:
+        if lang == "en":
+            header = f"Here are the best rated cafés and coffee places I know in {shard_city}:"
+        else:
+            header = f"Uite cele mai bine cotate cafenele și locuri de cafea din {shard_city}:"
+    elif lang == "en":
+        header = "Here are the best rated cafés and coffee places I know:"
     else:
-        lines.append("Uite toate cafenelele și locurile de cafea pe care le am în aplicație:")
+        header = "Uite cele mai bine cotate cafenele și locuri de cafea din aplicație:"
+    return _ranked_list_reply(places, cafes, lang, header, page)
 
-    for city in sorted(by_city.keys()):
-        lines.append(f"\n{city}:")
-        for p in by_city[city]:
-            name = p.get("name", "Unknown place")
-            rating_str = _format_rating(p.get("rating"))
-            lines.append(f"  • {name} (rating {rating_str})")
 
+LIST_INTENTS = ("list_all", "list_restaurants", "list_cafes")
+
+
+def _list_intent(analysis: "QueryAnalysis") -> Optional[str]:
+    return next((intent for intent in analysis.intents if intent in LIST_INTENTS), None)
+
+
+def list_cursor(
+    places: List[Dict[str, Any]], history: List[Dict[str, str]], analysis: "QueryAnalysis"
+) -> Optional[Tuple[str, "QueryAnalysis", int]]:
+    """
+    Cursorul listei cerute: (intenția, analiza mesajului care a cerut lista, pagina).
+
+    Nu ținem stare pe server: pentru "mai multe", cursorul e refăcut din
+    history – ultima întrebare-listă a userului, plus câte "mai multe" au
+    urmat după ea.
+    """
+    intent = _list_intent(analysis)
+    if intent is not None:
+        return intent, analysis, 0
+    if not analysis.has("more"):
+        return None
+
+    page = 1
+    for msg in reversed(history):
+        if msg.get("role") != "user":
+            continue
+        previous = analyze_message(msg["content"], places)
+        if previous.has("more"):
+            page += 1
+            continue
+        intent = _list_intent(previous)
+        return (intent, previous, page) if intent is not None else None
+    return None
+
+
+def answer_list_question(
+    places: List[Dict[str, Any]],
+    history: List[Dict[str, str]],
+    analysis: "QueryAnalysis",
+    dataset: Optional[Sequence] = None,
+) -> Optional[str]:
+    """
+    Răspunsul local (fără Groq) pentru întrebările-listă și pentru "mai multe"
+    după ele; None dacă mesajul nu e de acest tip. `history` = mesajele de
+    dinaintea mesajului analizat; `dataset` = tot dataset-ul, când places e
+    doar shard-ul unui oraș.
+    """
+    cursor = list_cursor(places, history, analysis)
+    if cursor is None:
+        return None
+    intent, question, page = cursor
+    lang = analysis.lang
+    if intent == "list_all":
+        return handle_list_all_places(places, lang, page=page, dataset=dataset)
+
+    # orașul din întrebarea inițială (ex: 'list all restaurants in Cluj')
+    if intent == "list_restaurants":
+        return handle_list_restaurants(places, lang, city=question.city_key, page=page, dataset=dataset)
+    return handle_list_cafes(places, lang, city=question.city_key, page=page, dataset=dataset)
+
+
+def _structured_positions(places: List[Dict[str, Any]], query: "StructuredQuery") -> Tuple[List[int], int]:
+    """Locațiile care răspund întrebării (în ordinea cerută, cel mult query.count) + câte se potrivesc în total."""
+    import numpy as np
+
+    store = get_store(places)
+    within = get_city_index(places).positions(query.city_key) if query.city_key else None
+    categories = set(query.categories)
+    # "restaurante" = toate locurile de mâncare, "cafenele" = și brunch-ul, ca la handle_list_*
+    if "Restaurant" in categories:
+        categories |= RESTAURANT_CATEGORIES
+    if "Cafea / Study" in categories:
+        categories |= CAFE_CATEGORIES
+    matches = store.filter(min_rating=query.min_rating, categories=categories or None, within=within)
+    if query.rating_over:
+        # "peste 4.5": strict, fără locațiile cu exact 4.5
+        matches = matches[store.rating[matches] > np.float32(query.min_rating)]
+    if query.order == "best":
+        return _top_by_rating(places, matches, query.count), len(matches)
+
+    # cele mai slab cotate: doar dintre locațiile care au rating
+    rated = matches[~np.isnan(store.rating[matches])]
+    ratings = store.rating[rated].tolist()
+    bottom = heapq.nsmallest(query.count, zip(ratings, rated.tolist()))
+    return [pos for _rating, pos in bottom], len(matches)
+
+
+def handle_structured_query(
+    places: List[Dict[str, Any]], query: "StructuredQuery", lang: str, dataset: Optional[Sequence] = None
+) -> str:
+    """Răspunsul-șablon (RO / EN) pentru o întrebare structurată (structured_query.py)."""
+    top, total = _structured_positions(places, query)
+    en = lang == "en"
+
+    what = f" ({', '.join(query.categories)})" if query.categories else ""
+    # pe un dataset cu shard-uri, fără oraș în întrebare răspundem din orașul shard-ului
+    city = get_city_index(places).name(query.city_key) if query.city_key else _shard_city(places, dataset)
+    if en:
+        where = f" in {city}" if city else " in the app"
+    else:
+        where = f" din {city}" if city else " din aplicație"
+    threshold = ""
+    if query.min_rating is not None:
+        rating = _format_rating(query.min_rating)
+        if query.rating_over:
+            threshold = f" rated over {rating}" if en else f" cu rating peste {rating}"
+        else:
+            threshold = f" rated {rating} or more" if en else f" cu rating de cel puțin {rating}"
+
+    if not top:
+        if en:
+            return f"I couldn't find any places{what}{where}{threshold}."
+        where = f" în {city}" if city else " în aplicație"
+        return f"Nu am găsit locuri{what}{where}{threshold}."
+
+    views = get_store(places).views(top)
+    if len(top) == 1:
+        p = views[0]
+        name, rating = p.get("name", "Unknown place"), _format_rating(p.get("rating"))
+        if en:
+            label = "best" if query.order == "best" else "lowest"
+            lines = [f"The {label} rated place{what}{where}{threshold} is {name}, rated {rating}."]
+        else:
+            label = "bine" if query.order == "best" else "slab"
+            lines = [f"Cel mai {label} cotat loc{what}{where}{threshold} este {name}, cu rating {rating}."]
+        if p.get("address"):
+            lines.append(f"{'Address' if en else 'Adresa'}: {p['address']}")
+    else:
+        if en:
+            label = "Top" if query.order == "best" else "The lowest rated"
+            lines = [f"{label} {len(top)} places{what}{where}{threshold}:"]
+        else:
+            label = "Top" if query.order == "best" else "Cele mai slab cotate"
+            lines = [f"{label} {len(top)} locuri{what}{where}{threshold}:"]
+        for idx, p in enumerate(views, start=1):
+            line = f"{idx}. {p.get('name', 'Unknown place')} (rating {_format_rating(p.get('rating'))})"
+            if p.get("address"):
+                line += f" – {p['address']}"
+            lines.append(line)
+
+    if total > len(top):
+        if en:
+            lines.append(f"\n({total} places match; showing {len(top)}.)")
+        else:
+            lines.append(f"\n(Se potrivesc {total} locuri; îți arăt {len(top)}.)")
     return "\n".join(lines)
 
 
+def answer_structured_query(
+    places: List[Dict[str, Any]], analysis: "QueryAnalysis", dataset: Optional[Sequence] = None
+) -> Optional[str]:
+    """
+    Răspunsul local pentru întrebările de tip "top 3 cafenele din Cluj cu rating
+    peste 4.5"; None dacă mesajul nu e o astfel de întrebare sau parserul nu e
+    destul de sigur (atunci răspunde LLM-ul).
+    """
+    from structured_query import parse_structured_query
+
+    query = parse_structured_query(analysis)
+    if query is None or not query.confident:
+        return None
+    return handle_structured_query(places, query, analysis.lang, dataset=dataset)
+
+
+# ------------- Retrieval: locațiile care intră în prompt -------------
+
+
+# cât din prompt pot ocupa locațiile (tokeni estimați)
+PROMPT_PLACES_TOKEN_BUDGET = int(os.getenv("PROMPT_PLACES_TOKEN_BUDGET", "3000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimare grosieră: ~4 caractere per token."""
+    return len(text) // 4 + 1
+
+
+def get_search_index(places: List[Dict[str, Any]]) -> BM25Index:
+    return derived(
+        places,
+        "bm25",
+        lambda: BM25Index(
+            places,
+            normalize=normalize_for_intent,
+            city_of=_address_city,
+        ),
+    )
+
+
+def get_prompt_fragments(places: List[Dict[str, Any]]) -> PromptFragments:
+    """Textul de prompt al fiecărei locații, randat o singură dată per dataset."""
+    return derived(places, "prompt_fragments", lambda: PromptFragments(place_prompt_parts(p) for p in places))
+
+
+def get_prompt_token_estimates(places: List[Dict[str, Any]]) -> List[int]:
+    fragments = get_prompt_fragments(places)
+    return derived(
+        places,
+        "prompt_tokens",
+        lambda: [estimate_tokens(fragments.text(pos, 1)) for pos in range(len(fragments))],
+    )
+
+
+# grupurile de categorii cu bloc de prompt memorat (scope "group:<nume>")
+CATEGORY_GROUPS: Dict[str, set] = {
+    "restaurants": RESTAURANT_CATEGORIES,
+    "cafes": CAFE_CATEGORIES,
+}
+
+
+def scope_positions(places: List[Dict[str, Any]], scope: str) -> List[int]:
+    """Pozițiile unui scope: "all", "city:<cheie din CityIndex>" sau "group:<nume din CATEGORY_GROUPS>"."""
+    if scope == "all":
+        return list(range(len(places)))
+    kind, _, name = scope.partition(":")
+    if kind == "city":
+        return get_city_index(places).positions(name).tolist()
+    if kind == "group":
+        return get_store(places).filter(categories=CATEGORY_GROUPS[name]).tolist()
+    raise ValueError(f"Unknown prompt scope: {scope}")
+
+
+def build_scope_block(places: List[Dict[str, Any]], scope: str) -> str:
+    """Blocul de prompt cu toate locațiile din `scope`, în ordinea din dataset – asamblat o dată per dataset."""
+    return get_prompt_fragments(places).scope_block(scope, lambda: scope_positions(places, scope))
+
+
+def make_embedder(config: dict):
+    """Embedder-ul configurat (vezi load_vector_config)."""
+    from place_vectors import HashingEmbedder, ProviderEmbedder
+
+    if config.get("embeddings_backend") == "provider":
+        from groq import Groq
+
+        client = Groq(
+            api_key=config.get("api_key") or os.getenv("GROQ_API_KEY"),
+            base_url=config.get("embeddings_base_url"),
+        )
+        return ProviderEmbedder(client, config["embeddings_model"])
+
+    return HashingEmbedder(normalize_for_intent, dim=config.get("embeddings_dim", 256))
+
+
+def get_vector_index(places: List[Dict[str, Any]]):
+    """
+    PlaceVectorIndex pentru dataset, sau None dacă etapa semantică nu e disponibilă
+    (embeddings de la provider fără matrice ingerată – atunci doar BM25).
+
+    Folosește matricea de la PLACE_VECTORS_PATH (mmap) dacă a fost construită
+    pentru același dataset și embedder; altfel, cu embedder-ul local, o calculăm
+    în memorie. Embeddings de la provider nu calculăm în request – doar din ingest.
+    """
+
+    def build():
+        from place_vectors import PlaceVectorIndex
+
+        config = load_vector_config()
+        embedder = make_embedder(config)
+        path = config["place_vectors_path"]
+        fingerprint = getattr(places, "fingerprint", "")
+
+        if path and os.path.exists(path):
+            meta = PlaceVectorIndex.read_meta(path) or {}
+            if (
+                fingerprint
+                and meta.get("fingerprint") == fingerprint
+                and meta.get("embedder") == embedder.name
+                and meta.get("count") == len(places)
+            ):
+                return PlaceVectorIndex.load(path, embedder)
+
+        if config["embeddings_backend"] == "provider":
+            print(
+                "[Warning] PLACE_VECTORS_PATH lipsă sau vechi pentru embeddings de la provider – doar BM25.",
+                file=sys.stderr,
+            )
+            return None
+
+        return PlaceVectorIndex.build(places, embedder, city_of=_address_city)
+
+    return derived(places, "vectors", build)
+
+
+def fuse_rankings(rankings: List[List[int]], k: int = 60) -> List[int]:
+    """Reciprocal rank fusion: combină mai multe clasamente (poziții) într-unul singur."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, pos in enumerate(ranking):
+            scores[pos] = scores.get(pos, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda pos: -scores[pos])
+
+
+def top_rated(places: List[Dict[str, Any]], scope: List[int], k: int) -> List[int]:
+    """Pozițiile celor mai bine cotate k locații din `scope` (fără rating = 0)."""
+    import numpy as np
+
+    positions = np.asarray(scope, dtype=np.int64)
+    if k <= 0 or positions.size == 0:
+        return []
+    ratings = get_store(places).ratings_or(0.0, positions)
+    if k < positions.size:
+        top = np.argpartition(-ratings, k - 1)[:k]
+    else:
+        top = np.arange(positions.size)
+    top = top[np.argsort(-ratings[top], kind="stable")]
+    return positions[top].tolist()
+
+
+def select_places_for_prompt(
+    places: List[Dict[str, Any]],
+    scope: List[int],
+    query: str,
+    token_budget: Optional[int] = None,
+    location: Optional[Location] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Locațiile (din pozițiile `scope`) care intră în prompt.
+
+    Dacă toate încap în buget, le trimitem pe toate, în ordinea din dataset
+    (sau de la cea mai apropiată, dacă știm locația userului).
+    Altfel: întâi cele mai relevante (BM25 pe cuvinte + similaritate vectorială
+    + cele mai apropiate de user, combinate prin RRF), apoi completăm cu cele
+    mai bine cotate, până se umple bugetul – prompt-ul rămâne mărginit oricât
+    de mare ar fi dataset-ul.
+    """
+    return [places[pos] for pos in select_positions_for_prompt(places, scope, query, token_budget, location)]
+
+
+def select_positions_for_prompt(
+    places: List[Dict[str, Any]],
+    scope: List[int],
+    query: str,
+    token_budget: Optional[int] = None,
+    location: Optional[Location] = None,
+) -> List[int]:
+    """Ca select_places_for_prompt, dar întoarce pozițiile (în places)."""
+    budget = PROMPT_PLACES_TOKEN_BUDGET if token_budget is None else token_budget
+    tokens = get_prompt_token_estimates(places)
+
+    if sum(tokens[pos] for pos in scope) <= budget:
+        if location is None:
+            return list(scope)
+        dist = distances_km(places, scope, location)
+        # fără coordonate -> la final, în ordinea din dataset
+        order = sorted(range(len(scope)), key=lambda i: (dist[i] is None, dist[i] or 0.0))
+        return [scope[i] for i in order]
+
+    # câte locații încap, cu aproximație, ca să nu cerem BM25 mai mult decât trebuie
+    avg_tokens = max(1, sum(tokens) // max(1, len(tokens)))
+    max_places = max(1, budget // avg_tokens)
+    candidates = set(scope) if len(scope) < len(places) else None
+    # aceleași poziții ca array (sortat: poziții de oraș / range), pentru index-urile numpy
+    within = None
+    if candidates is not None:
+        import numpy as np
+
+        within = np.asarray(scope, dtype=np.int64)
+
+    selected: List[int] = []
+    chosen = set()
+    used = 0
+
+    def take(pos: int) -> bool:
+        nonlocal used
+        if pos in chosen:
+            return True
+        if used + tokens[pos] > budget:
+            return False
+        chosen.add(pos)
+        selected.append(pos)
+        used += tokens[pos]
+        return True
+
+    rankings = [
+        [pos for pos, _score in get_search_index(places).search(query, k=max_places, candidates=candidates)]
+    ]
+    vectors = get_vector_index(places)
+    if vectors is not None:
+        rankings.append([pos for pos, _score in vectors.search(query, k=max_places, candidates=within)])
+    if location is not None:
+        nearest = get_geo_index(places).nearest(location[0], location[1], k=max_places, within=within)
+        rankings.append([pos for pos, _km in nearest])
+
+    for pos in fuse_rankings(rankings):
+        if not take(pos):
+            break
+
+    if used < budget:
+        for pos in top_rated(places, scope, max_places):
+            if not take(pos):
+                break
+
+    if not selected and scope:
+        selected.append(scope[0])  # măcar o locație, chiar dacă depășește bugetul
+
+    return selected
+
+
 # ------------- Groq wrapper -------------
 
 
 def call_groq(
-    client: Groq,
+    client: "Groq",
     model: str,
     messages: List[Dict[str, str]],
     max_tokens: int = 260,
@@ -493,15 +1286,83 @@ def call_groq(
     return completion.choices[0].message.content.strip()
 
 
-# ------------- Vibe generator (for a single place) -------------
+async def call_groq_async(
+    client: "AsyncGroq",
+    model: str,
+    messages: List[Dict[str, str]],
+    max_tokens: int = 260,
+    temperature: float = 0.25,
+) -> str:
+    """Same as call_groq, but with AsyncGroq – nu blochează event loop-ul."""
+    completion = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+    return completion.choices[0].message.content.strip()
 
 
-def generate_vibe_for_place(
-    client: Groq,
+def call_groq_stream(
+    client: "Groq",
     model: str,
-    place: Dict[str, Any],
-) -> str:
-    """Generate a vibe description in Romanian for a single place."""
+    messages: List[Dict[str, str]],
+    max_tokens: int = 260,
+    temperature: float = 0.25,
+) -> Iterator[str]:
+    """Streaming variant of call_groq: yields text deltas as they arrive (stream=True)."""
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+async def call_groq_stream_async(
+    client: "AsyncGroq",
+    model: str,
+    messages: List[Dict[str, str]],
+    max_tokens: int = 260,
+    temperature: float = 0.25,
+) -> AsyncIterator[str]:
+    """Async streaming variant of call_groq (AsyncGroq, stream=True)."""
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+    )
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+# ------------- Vibe generator (for a single place) -------------
+
+
+# crește versiunea când schimbi prompt-ul / parametrii de generare,
+# ca vibe-urile vechi din cache să nu mai fie folosite
+VIBE_PROMPT_VERSION = "v2"
+
+# temperatură 0.25 pentru stabilitate, dar încă suficient de creativ
+VIBE_MAX_TOKENS = 220
+VIBE_TEMPERATURE = 0.25
+
+
+def build_vibe_messages(place: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Build the system + user messages for a vibe description of a single place."""
     system_msg = {
         "role": "system",
         "content": (
@@ -540,14 +1401,69 @@ def generate_vibe_for_place(
         "content": "\n".join(user_lines),
     }
 
-    # temperatură 0.25 pentru stabilitate, dar încă suficient de creativ
-    return call_groq(client, model, [system_msg, user_msg], max_tokens=220, temperature=0.25)
+    return [system_msg, user_msg]
+
+
+def lookup_cached_vibe(cache: "VibeCache", model: str, place: Dict[str, Any]) -> Optional[str]:
+    """Vibe-ul din cache pentru locație + model + versiunea curentă de prompt (sau None)."""
+    key = vibe_cache_key(model, VIBE_PROMPT_VERSION, build_vibe_messages(place))
+    return cache.get(key)
+
+
+def generate_vibe_for_place(
+    client: "Groq",
+    model: str,
+    place: Dict[str, Any],
+    cache: Optional["VibeCache"] = None,
+) -> str:
+    """
+    Generate a vibe description in Romanian for a single place.
+
+    Cu cache (VibeCache), un vibe deja generat pentru același prompt + model
+    e servit de pe disc, fără apel la Groq.
+    """
+    if cache is not None:
+        cached = lookup_cached_vibe(cache, model, place)
+        if cached is not None:
+            return cached
+
+    messages = build_vibe_messages(place)
+    vibe = call_groq(client, model, messages, max_tokens=VIBE_MAX_TOKENS, temperature=VIBE_TEMPERATURE)
+
+    if cache is not None:
+        key = vibe_cache_key(model, VIBE_PROMPT_VERSION, messages)
+        cache.put(key, vibe, place_name=place.get("name", ""), model=model)
+    return vibe
+
+
+async def generate_vibe_for_place_async(
+    client: "AsyncGroq",
+    model: str,
+    place: Dict[str, Any],
+    cache: Optional["VibeCache"] = None,
+) -> str:
+    """Async variant of generate_vibe_for_place (AsyncGroq)."""
+    # SQLite (busy_timeout 5 s, evacuare la put): nu pe event loop
+    if cache is not None:
+        cached = await asyncio.to_thread(lookup_cached_vibe, cache, model, place)
+        if cached is not None:
+            return cached
+
+    messages = build_vibe_messages(place)
+    vibe = await call_groq_async(
+        client, model, messages, max_tokens=VIBE_MAX_TOKENS, temperature=VIBE_TEMPERATURE
+    )
+
+    if cache is not None:
+        key = vibe_cache_key(model, VIBE_PROMPT_VERSION, messages)
+        await asyncio.to_thread(cache.put, key, vibe, place_name=place.get("name", ""), model=model)
+    return vibe
 
 
 # ------------- Chatbot loop (consolă) -------------
 
 
-def chatbot_loop(client: Groq, model: str, places: List[Dict[str, Any]]) -> None:
+def chatbot_loop(client: "Groq", model: str, places: List[Dict[str, Any]]) -> None:
     """
     Console chat loop using ALL JSON places as knowledge base.
 
@@ -560,7 +1476,7 @@ def chatbot_loop(client: Groq, model: str, places: List[Dict[str, Any]]) -> None
     print("\n=== Chatbot AI (scrie 'exit' ca să ieși) ===\n")
 
     history: List[Dict[str, str]] = []
-    places_block = build_places_block(places)
+    places_block = build_scope_block(places, "all")
 
     while True:
         user_input = input("Tu: ").strip()
@@ -569,24 +1485,14 @@ def chatbot_loop(client: Groq, model: str, places: List[Dict[str, Any]]) -> None
             break
 
         history.append({"role": "user", "content": user_input})
-        lang = detect_language(user_input)
+        analysis = analyze_message(user_input, places)
 
         # 1) Hard-coded intents (no Groq cost, răspuns 100% din JSON)
         try:
-            if is_all_places_question(user_input):
-                answer = handle_list_all_places(places, lang)
-                history.append({"role": "assistant", "content": answer})
-                print(f"\nBot: {answer}\n")
-                continue
-
-            if is_restaurants_list_question(user_input):
-                answer = handle_list_restaurants(places, lang)
-                history.append({"role": "assistant", "content": answer})
-                print(f"\nBot: {answer}\n")
-                continue
-
-            if is_cafes_list_question(user_input):
-                answer = handle_list_cafes(places, lang)
+            answer = answer_list_question(places, history[:-1], analysis)
+            if answer is None:
+                answer = answer_structured_query(places, analysis)
+            if answer is not None:
                 history.append({"role": "assistant", "content": answer})
                 print(f"\nBot: {answer}\n")
                 continue
@@ -665,108 +1571,171 @@ def chatbot_loop(client: Groq, model: str, places: List[Dict[str, Any]]) -> None
 # ------------- Single-turn API for app (cu filtrare pe oraș) -------------
 
 
-def answer_message(
-    client: Groq,
-    model: str,
+def normalize_query_key(text: str) -> str:
+    """Forma canonică a unei întrebări pentru cache: fără diacritice, majuscule, punctuație."""
+    return analyze_message(text).normalized
+
+
+# cache-ul implicit de răspunsuri LLM (REPLY_CACHE_MAX_ENTRIES=0 îl dezactivează)
+REPLY_CACHE = ReplyCache(max_entries=int(os.getenv("REPLY_CACHE_MAX_ENTRIES", "1024")))
+
+
+class TurnStats:
+    """
+    Pe ce drum au mers mesajele (prepare_chat_turn): "list" / "structured"
+    (răspuns local), "cache" (răspuns LLM refolosit), "llm" (apel Groq
+    reușit) sau "llm_error" (timeout / eroare Groq) – numărate după apel,
+    prin llm_call().
+    """
+
+    ROUTES = ("list", "structured", "cache", "llm", "llm_error")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.ROUTES, 0)
+
+    def record(self, route: str) -> None:
+        with self._lock:
+            self._counts[route] += 1
+
+    @contextmanager
+    def llm_call(self) -> Iterator[None]:
+        """Apelul Groq al unui mesaj: "llm" dacă se termină, "llm_error" dacă aruncă."""
+        try:
+            yield
+        except Exception:
+            self.record("llm_error")
+            raise
+        self.record("llm")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        local = counts["list"] + counts["structured"]
+        return {
+            "turns": total,
+            **counts,
+            # partea din trafic răspunsă fără LLM / care nu a ajuns la Groq deloc
+            "local_rate": round(local / total, 4) if total else 0.0,
+            "groq_avoided_rate": round((local + counts["cache"]) / total, 4) if total else 0.0,
+        }
+
+
+TURN_STATS = TurnStats()
+
+
+def prepare_chat_turn(
     places: List[Dict[str, Any]],
     history: List[Dict[str, str]],
     user_input: str,
+    cache: Optional[ReplyCache] = None,
+    location: Optional[Location] = None,
 ) -> Dict[str, Any]:
     """
-    Single-turn variant of the chatbot, pentru integrat în aplicație.
-
-    Primește:
-      - client: Groq(...)
-      - model: numele modelului (ex: 'llama-3.3-70b-versatile')
-      - places: lista completă de locații încărcate din JSON
-      - history: listă de mesaje anterioare [{"role": "user"|"assistant", "content": "..."}]
-      - user_input: ultimul mesaj al utilizatorului (string)
-
-    Returnează:
-      {
-        "reply": <răspunsul botului ca string>,
-        "history": <istoricul actualizat (cu user + assistant)>
-      }
+    Partea din answer_message care nu depinde de Groq (comună pentru sync / async).
+    `location` = (lat, long) ale userului, dacă aplicația le trimite.
+
+    Returnează fie:
+      {"reply": ..., "history": ...}     – răspuns local (fără LLM) sau din cache,
+                                           gata de trimis
+    fie:
+      {"messages": [...], "history": ..., "cache_key": ...}
+                                         – prompt-ul pentru LLM; history conține
+                                           deja mesajul userului, fără răspuns;
+                                           cache_key e None fără cache
 
     V2: bugfix pentru București/Bucharest – nu mai amestecă orașele.
     """
+    # LOCATIONS_PATH cu shard-uri pe orașe: întrebarea lucrează doar pe shard-ul
+    # orașului ei (din mesaj / history / locație), încărcat acum dacă e nevoie
+    dataset = places
+    shard_for_query = getattr(places, "shard_for_query", None)
+    if shard_for_query is not None:
+        places = shard_for_query(user_input, location=location, history=history)
+
     # clonăm history ca să nu-l modificăm accidental în afara funcției
     history = list(history)
     history.append({"role": "user", "content": user_input})
-    lang = detect_language(user_input)
+    # o singură analiză a mesajului: limbă, intenții, oraș
+    analysis = analyze_message(user_input, places)
+    lang = analysis.lang
 
-    # 1) Încercăm întâi handler-ele locale (liste de locuri, restaurante, cafenele)
+    # 1) Încercăm întâi handler-ele locale: liste de locuri, restaurante, cafenele,
+    #    "mai multe", apoi întrebările structurate ("top 3 cafenele din Cluj")
     try:
-        if is_all_places_question(user_input):
-            answer = handle_list_all_places(places, lang)
-            history.append({"role": "assistant", "content": answer})
-            return {"reply": answer, "history": history}
-
-        if is_restaurants_list_question(user_input):
-            answer = handle_list_restaurants(places, lang)
-            history.append({"role": "assistant", "content": answer})
-            return {"reply": answer, "history": history}
-
-        if is_cafes_list_question(user_input):
-            answer = handle_list_cafes(places, lang)
+        route, answer = "list", answer_list_question(places, history[:-1], analysis, dataset=dataset)
+        if answer is None:
+            route, answer = "structured", answer_structured_query(places, analysis, dataset=dataset)
+        if answer is not None:
+            TURN_STATS.record(route)
             history.append({"role": "assistant", "content": answer})
             return {"reply": answer, "history": history}
     except Exception as e:
         # dacă se întâmplă ceva ciudat în logică, nu blocăm chat-ul
-        print(f"[Warning] Eroare în handler-ul local: {e} – continui cu Groq.")
+        # (pe stderr: la `chatBot.py --serve`, stdout e protocolul JSON-lines)
+        print(f"[Warning] Eroare în handler-ul local: {e} – continui cu Groq.", file=sys.stderr)
 
     # 2) Restul întrebărilor merg la Groq cu listă FILTRATĂ pe oraș (dacă apare în întrebare)
 
-    # mapare token -> numele orașului EXACT cum apare în adrese
-    # IMPORTANT: aici folosim 'Bucharest' (nu 'București') ca să se potrivească cu JSON-ul.
-    city_tokens_ro = {
-        # București
-        "bucuresti": "Bucharest",
-        "bucharest": "Bucharest",
-        # alte orașe (aceste valori se potrivesc cu ce ai în JSON)
-        "ploiesti": "Ploiești",
-        "cluj": "Cluj-Napoca",
-        "clujnapoca": "Cluj-Napoca",
-        "iasi": "Iași",
-        "brasov": "Brașov",
-        "sibiu": "Sibiu",
-        "constanta": "Constanța",
-        "timisoara": "Timișoara",
-        "oradea": "Oradea",
-        "galati": "Galați",
-        "craiova": "Craiova",
-        "targumures": "Târgu Mureș",
-        "mures": "Târgu Mureș",
-        "alba": "Alba Iulia",
-        "iulia": "Alba Iulia",
-    }
-
-    norm_query = normalize_for_intent(user_input)
-    city_in_query = None
-    for token, city_name in city_tokens_ro.items():
-        if token in norm_query:
-            city_in_query = city_name
-            break
+    # orașul din întrebare, prin aliasurile generate din dataset
+    # (ex: 'bucuresti' / 'bucharest' -> 'Bucharest', exact cum apare în adrese)
+    cities = get_city_index(places)
+    city_key = analysis.city_key
+    city_in_query = cities.name(city_key) if city_key else None
 
-    if city_in_query:
-        # filtrăm locațiile STRICT după numele de oraș din adrese
-        filtered_places = [
-            p
-            for p in places
-            if extract_city(p.get("address", "")).strip().lower()
-            == city_in_query.lower()
-        ]
+    scope_key = "all"
+    if city_key:
+        # filtrăm locațiile STRICT după orașul din adrese (poziții în places)
+        scope = cities.positions(city_key).tolist()
+        scope_key = f"city:{city_key}"
 
         # dacă nu găsim nimic, folosește toată lista,
         # dar îi spunem LLM-ului explicit că nu avem locații în orașul cerut
-        no_matches_for_city = len(filtered_places) == 0
-        if not filtered_places:
-            filtered_places = places
+        no_matches_for_city = len(scope) == 0
+        if not scope:
+            scope = list(range(len(places)))
+            scope_key = "all"
     else:
-        filtered_places = places
+        scope = list(range(len(places)))
         no_matches_for_city = False
 
-    places_block = build_places_block(filtered_places)
+    # același query normalizat + oraș + limbă + context recent + dataset -> același răspuns
+    cache_key = None
+    if cache is not None and cache.max_entries > 0:
+        cache_key = cache.make_key(
+            query=analysis.normalized,
+            city=city_in_query,
+            lang=lang,
+            # ~100 m: userii din același loc împart răspunsul
+            location=[round(v, 3) for v in location] if location else None,
+            history=[(m["role"], m["content"]) for m in history[-6:-1]],
+            dataset=cache.dataset_fingerprint(dataset),
+        )
+        cached_reply = cache.get(cache_key)
+        if cached_reply is not None:
+            TURN_STATS.record("cache")
+            history.append({"role": "assistant", "content": cached_reply})
+            return {"reply": cached_reply, "history": history}
+
+    # o locație anume ("ce părere ai de Citadel?") -> doar ea în prompt, nu tot orașul
+    referenced = referenced_places(places, analysis, within=scope if city_key and not no_matches_for_city else None)
+    if referenced:
+        scope, scope_key = referenced, None
+
+    # doar locațiile relevante, cât încap în bugetul de tokeni (BM25 + rating)
+    positions = select_positions_for_prompt(places, scope, user_input, location=location)
+    if location is None and len(positions) == len(scope) and scope_key is not None:
+        # tot scope-ul, în ordinea din dataset -> blocul memorat al scope-ului
+        places_block = build_scope_block(places, scope_key)
+    else:
+        distances = distances_km(places, positions, location) if location else None
+        places_block = get_prompt_fragments(places).block(positions, distances)
+    if len(positions) < len(scope):
+        places_block = (
+            f"(showing the {len(positions)} most relevant of {len(scope)} places in scope)\n\n"
+            + places_block
+        )
 
     # construim history scurt pentru LLM
     history_lines: List[str] = []
@@ -792,6 +1761,21 @@ def answer_message(
     else:
         city_hint = ""
 
+    if referenced:
+        names = ", ".join(dict.fromkeys(places[pos].get("name", "") for pos in referenced))
+        city_hint += (
+            f"\nThe user is asking about a specific place: {names}. The list below contains "
+            "only this place (or the few places with a very similar name). Answer about it; "
+            "if several are listed, say which one you mean or ask the user."
+        )
+
+    if location:
+        city_hint += (
+            f"\nThe user's current location is lat {location[0]:.5f}, long {location[1]:.5f}. "
+            "Each place has its distance from the user. For questions like 'near me' / "
+            "'aproape de mine', prefer the closest places and mention the distance."
+        )
+
     system_msg = {
         "role": "system",
         "content": (
@@ -838,23 +1822,177 @@ def answer_message(
         ),
     }
 
-    reply = call_groq(
-        client,
-        model,
-        [system_msg, user_msg],
-        max_tokens=380,
-        temperature=0.25,
-    )
+    return {"messages": [system_msg, user_msg], "history": history, "cache_key": cache_key}
+
+
+def answer_message(
+    client: "Groq",
+    model: str,
+    places: List[Dict[str, Any]],
+    history: List[Dict[str, str]],
+    user_input: str,
+    cache: Optional[ReplyCache] = REPLY_CACHE,
+    location: Optional[Location] = None,
+) -> Dict[str, Any]:
+    """
+    Single-turn variant of the chatbot, pentru integrat în aplicație.
+
+    Primește:
+      - client: Groq(...)
+      - model: numele modelului (ex: 'llama-3.3-70b-versatile')
+      - places: lista completă de locații încărcate din JSON
+      - history: listă de mesaje anterioare [{"role": "user"|"assistant", "content": "..."}]
+      - user_input: ultimul mesaj al utilizatorului (string)
+      - cache: ReplyCache pentru răspunsurile LLM (None = fără cache)
+      - location: (lat, long) ale userului, opțional (vezi parse_location)
+
+    Returnează:
+      {
+        "reply": <răspunsul botului ca string>,
+        "history": <istoricul actualizat (cu user + assistant)>
+      }
+    """
+    turn = prepare_chat_turn(places, history, user_input, cache=cache, location=location)
+    if "reply" in turn:
+        return turn
+
+    history = turn["history"]
+    with TURN_STATS.llm_call():
+        reply = call_groq(
+            client,
+            model,
+            turn["messages"],
+            max_tokens=380,
+            temperature=0.25,
+        )
+
+    if turn["cache_key"] is not None:
+        cache.put(turn["cache_key"], reply)
+
+    history.append({"role": "assistant", "content": reply})
+    return {"reply": reply, "history": history}
+
+
+async def answer_message_async(
+    client: "AsyncGroq",
+    model: str,
+    places: List[Dict[str, Any]],
+    history: List[Dict[str, str]],
+    user_input: str,
+    cache: Optional[ReplyCache] = REPLY_CACHE,
+    location: Optional[Location] = None,
+) -> Dict[str, Any]:
+    """Async variant of answer_message (AsyncGroq), pentru FastAPI."""
+    # poate încărca un shard / construi index-uri: nu pe event loop
+    turn = await asyncio.to_thread(prepare_chat_turn, places, history, user_input, cache=cache, location=location)
+    if "reply" in turn:
+        return turn
+
+    history = turn["history"]
+    with TURN_STATS.llm_call():
+        reply = await call_groq_async(
+            client,
+            model,
+            turn["messages"],
+            max_tokens=380,
+            temperature=0.25,
+        )
+
+    if turn["cache_key"] is not None:
+        cache.put(turn["cache_key"], reply)
 
     history.append({"role": "assistant", "content": reply})
     return {"reply": reply, "history": history}
 
 
+def answer_message_stream(
+    client: "Groq",
+    model: str,
+    places: List[Dict[str, Any]],
+    history: List[Dict[str, str]],
+    user_input: str,
+    cache: Optional[ReplyCache] = REPLY_CACHE,
+    location: Optional[Location] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of answer_message. Yields events:
+
+      {"event": "delta", "delta": "<bucată de text>"}   (de 0..n ori)
+      {"event": "done", "reply": "...", "history": [...]}  (ultimul)
+
+    Răspunsurile locale (liste) vin ca un singur delta urmat de done.
+    """
+    turn = prepare_chat_turn(places, history, user_input, cache=cache, location=location)
+    if "reply" in turn:
+        yield {"event": "delta", "delta": turn["reply"]}
+        yield {"event": "done", **turn}
+        return
+
+    history = turn["history"]
+    parts: List[str] = []
+    with TURN_STATS.llm_call():
+        for delta in call_groq_stream(
+            client,
+            model,
+            turn["messages"],
+            max_tokens=380,
+            temperature=0.25,
+        ):
+            parts.append(delta)
+            yield {"event": "delta", "delta": delta}
+
+    reply = "".join(parts).strip()
+    if turn["cache_key"] is not None:
+        cache.put(turn["cache_key"], reply)
+
+    history.append({"role": "assistant", "content": reply})
+    yield {"event": "done", "reply": reply, "history": history}
+
+
+async def answer_message_stream_async(
+    client: "AsyncGroq",
+    model: str,
+    places: List[Dict[str, Any]],
+    history: List[Dict[str, str]],
+    user_input: str,
+    cache: Optional[ReplyCache] = REPLY_CACHE,
+    location: Optional[Location] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of answer_message_stream (AsyncGroq), pentru FastAPI."""
+    turn = await asyncio.to_thread(prepare_chat_turn, places, history, user_input, cache=cache, location=location)
+    if "reply" in turn:
+        yield {"event": "delta", "delta": turn["reply"]}
+        yield {"event": "done", **turn}
+        return
+
+    history = turn["history"]
+    parts: List[str] = []
+    with TURN_STATS.llm_call():
+        async for delta in call_groq_stream_async(
+            client,
+            model,
+            turn["messages"],
+            max_tokens=380,
+            temperature=0.25,
+        ):
+            parts.append(delta)
+            yield {"event": "delta", "delta": delta}
+
+    reply = "".join(parts).strip()
+    if turn["cache_key"] is not None:
+        cache.put(turn["cache_key"], reply)
+
+    history.append({"role": "assistant", "content": reply})
+    yield {"event": "done", "reply": reply, "history": history}
+
+
 # ------------- Main debug menu -------------
 
 
 def main() -> None:
     """Main debug entrypoint: simple console menu."""
+    from groq import Groq
+
     config = load_config()
     client = Groq(api_key=config["api_key"])
     places = load_places(config["locations_path"])
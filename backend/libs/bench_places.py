@@ -0,0 +1,528 @@
+#!/usr/bin/env python
+"""
+Benchmark-uri pentru încărcarea și indexarea locațiilor, pe dataset-uri
+sintetice (locațiile reale, replicate cu nume / coordonate / rating variate).
+
+  python bench_places.py load                        # 20, 10k, 1M locații
+  python bench_places.py load --sizes 20,10000
+  python bench_places.py memory                      # bytes / locație: dict-uri vs PlaceStore
+  python bench_places.py categories                  # filtre tip / oraș: scan pe dict-uri vs index
+  python bench_places.py geo                         # nearest / within_radius pe GeoIndex vs brute force
+  python bench_places.py stream                      # memorie de vârf: json.load vs citire în flux
+  python bench_places.py shards                      # un fișier național vs shard-uri pe orașe, încărcate la cerere
+  python bench_places.py structured                  # cât dintr-un mix de întrebări e răspuns local, fără Groq
+  python bench_places.py names                       # căutare fuzzy după nume: trigrame vs scan cu difflib
+  python bench_places.py vectors                     # căutare vectorială: pe grupuri (IVF) vs toată matricea
+
+Rezultatele sunt JSON, câte o linie per dimensiune.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List
+
+from Chat_Bot_Groq_final_v2 import (
+    CAFE_CATEGORIES,
+    RESTAURANT_CATEGORIES,
+    TURN_STATS,
+    _address_city,
+    analyze_message,
+    extract_city,
+    forget_derived,
+    get_name_index,
+    load_places,
+    load_vector_config,
+    make_embedder,
+    prepare_chat_turn,
+    referenced_places,
+)
+from geo_index import GeoIndex, haversine_km
+from place_store import PlaceStore
+from places_shards import ShardedPlaces, split_places
+from places_snapshot import compile_snapshot, file_sha1
+
+
+DEFAULT_SIZES = "20,10000,1000000"
+BASE_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "locatii_cu_categorii.json")
+
+
+def synthetic_places(base: List[Dict[str, Any]], n: int, seed: int = 7) -> Iterator[Dict[str, Any]]:
+    """n locații: primele len(base) sunt cele reale, restul variații ale lor."""
+    rng = random.Random(seed)
+    for i in range(n):
+        place = dict(base[i % len(base)])
+        if i >= len(base):
+            place["name"] = f"{place['name']} #{i}"
+            place["coordinates"] = {
+                "lat": round(place["coordinates"]["lat"] + rng.uniform(-0.05, 0.05), 4),
+                "long": round(place["coordinates"]["long"] + rng.uniform(-0.05, 0.05), 4),
+            }
+            place["rating"] = round(rng.uniform(3.0, 5.0), 1)
+        place["id"] = i + 1
+        yield place
+
+
+def write_dataset(path: str, places: Iterator[Dict[str, Any]]) -> None:
+    """Scrie {"locations": [...]} incremental, fără să țină toată lista în memorie."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"locations": [')
+        for i, place in enumerate(places):
+            if i:
+                f.write(",")
+            f.write("\n" + json.dumps(place, ensure_ascii=False))
+        f.write("\n]}")
+
+
+def write_jsonl(path: str, places: Iterator[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for place in places:
+            f.write(json.dumps(place, ensure_ascii=False) + "\n")
+
+
+def timed(fn: Callable[[], Any]):
+    t0 = time.perf_counter()
+    value = fn()
+    return value, round((time.perf_counter() - t0) * 1000, 3)
+
+
+def bench_load(size: int, base: List[Dict[str, Any]], workdir: str) -> Dict[str, Any]:
+    source = os.path.join(workdir, f"places_{size}.json")
+    snapshot = source + ".snap"
+    write_dataset(source, synthetic_places(base, size))
+
+    places, json_ms = timed(lambda: load_places(source, snapshot_path=""))
+    _, compile_ms = timed(lambda: compile_snapshot(places, snapshot, source))
+    del places
+    gc.collect()
+
+    loaded, snapshot_ms = timed(lambda: load_places(source, snapshot_path=snapshot))
+    assert loaded.source == "snapshot", "snapshot was not used"
+    _, access_ms = timed(lambda: loaded[size // 2]["name"])
+    _, hash_ms = timed(lambda: file_sha1(source))
+
+    result = {
+        "places": size,
+        "json_bytes": os.path.getsize(source),
+        "snapshot_bytes": os.path.getsize(snapshot),
+        "json_load_ms": json_ms,
+        "snapshot_compile_ms": compile_ms,
+        "snapshot_load_ms": snapshot_ms,
+        "snapshot_first_access_ms": access_ms,
+        # cât ar costa validarea când mtime-ul diferă (sha1 peste JSON)
+        "source_sha1_ms": hash_ms,
+    }
+    del loaded
+    gc.collect()
+    os.remove(source)
+    os.remove(snapshot)
+    return result
+
+
+def bench_memory(size: int, base: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Memoria alocată (tracemalloc) pentru aceleași locații, ca listă de dict-uri vs PlaceStore."""
+    raw = json.dumps(list(synthetic_places(base, size)), ensure_ascii=False)
+    gc.collect()
+
+    tracemalloc.start()
+    places = json.loads(raw)
+    dicts_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = PlaceStore.from_places(places, city_of=_address_city)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    columns_bytes = sum(col.nbytes for col in store.columns.values())
+
+    _, filter_ms = timed(lambda: store.filter(min_rating=4.5, categories={"Cafea / Study"}, cities={"Cluj-Napoca"}))
+    _, scan_ms = timed(
+        lambda: [
+            p for p in places
+            if (p.get("rating") or 0) >= 4.5
+            and "Cafea / Study" in p.get("categories", [])
+            and _address_city(p) == "Cluj-Napoca"
+        ]
+    )
+
+    return {
+        "places": size,
+        "dicts_bytes_per_place": round(dicts_bytes / size, 1),
+        "store_bytes_per_place": round(store_bytes / size, 1),
+        "columns_bytes_per_place": round(columns_bytes / size, 1),
+        "filter_ms": filter_ms,
+        "dict_scan_ms": scan_ms,
+    }
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Cel mai bun timp (ms) din `repeat` rulări."""
+    return min(timed(fn)[1] for _ in range(repeat))
+
+
+def scan_by_categories(places: List[Dict[str, Any]], group: set, city: str = "") -> List[Dict[str, Any]]:
+    """Filtrul vechi din get_restaurants / get_cafes (+ filtrul vechi pe oraș), pe dict-uri."""
+    result = []
+    for p in places:
+        cats = set(p.get("categories", []))
+        if cats & group:
+            if city and extract_city(p.get("address", "")).strip().lower() != city.lower():
+                continue
+            result.append(p)
+    return result
+
+
+def bench_categories(size: int, base: List[Dict[str, Any]]) -> Dict[str, Any]:
+    places = list(synthetic_places(base, size))
+    store = PlaceStore.from_places(places, city_of=_address_city)
+
+    result: Dict[str, Any] = {"places": size}
+    for label, group in (("restaurants", RESTAURANT_CATEGORIES), ("cafes", CAFE_CATEGORIES)):
+        store._groups.clear()
+        _, first_ms = timed(lambda: store.filter(categories=group))
+        assert len(store.filter(categories=group)) == len(scan_by_categories(places, group))
+        assert len(store.filter(categories=group, cities=["Cluj-Napoca"])) == len(
+            scan_by_categories(places, group, "Cluj-Napoca")
+        )
+        result[label] = {
+            "scan_ms": best_of(lambda: scan_by_categories(places, group)),
+            "index_first_ms": first_ms,
+            "index_ms": best_of(lambda: store.filter(categories=group)),
+            "scan_city_ms": best_of(lambda: scan_by_categories(places, group, "Cluj-Napoca")),
+            "index_city_ms": best_of(lambda: store.filter(categories=group, cities=["Cluj-Napoca"])),
+        }
+    return result
+
+
+def bench_geo(size: int, base: List[Dict[str, Any]], queries: int = 200) -> Dict[str, Any]:
+    import numpy as np
+
+    store = PlaceStore.from_places(synthetic_places(base, size), city_of=_address_city)
+    geo, build_ms = timed(lambda: GeoIndex(store))
+
+    # puncte în jurul locațiilor reale (acolo unde sunt și cele sintetice)
+    rng = random.Random(1)
+    points = [
+        (
+            base[i % len(base)]["coordinates"]["lat"] + rng.uniform(-0.03, 0.03),
+            base[i % len(base)]["coordinates"]["long"] + rng.uniform(-0.03, 0.03),
+        )
+        for i in range(queries)
+    ]
+
+    lat, lon = points[0]
+    brute = np.sort(haversine_km(lat, lon, store.lat, store.long))[:10]
+    assert np.allclose([km for _pos, km in geo.nearest(lat, lon, 10)], brute), "nearest != brute force"
+
+    def per_query(fn: Callable[[float, float], Any]) -> Dict[str, float]:
+        """p50 / p99 (ms) peste punctele de test."""
+        times = sorted(timed(lambda: fn(lat, lon))[1] for lat, lon in points)
+        return {"p50": times[len(times) // 2], "p99": times[int(len(times) * 0.99)]}
+
+    _, group_build_ms = timed(lambda: geo.for_categories(CAFE_CATEGORIES))
+    return {
+        "places": size,
+        "build_ms": build_ms,
+        "cell_deg": geo.cell_deg,
+        "nearest10": per_query(lambda lat, lon: geo.nearest(lat, lon, 10)),
+        "nearest10_rating": per_query(lambda lat, lon: geo.nearest(lat, lon, 10, min_rating=4.8)),
+        "cafes_grid_build_ms": group_build_ms,
+        "nearest10_cafes": per_query(lambda lat, lon: geo.nearest(lat, lon, 10, categories=CAFE_CATEGORIES)),
+        "radius1km_top20": per_query(lambda lat, lon: geo.within_radius(lat, lon, 1.0, limit=20)),
+        "brute_force": per_query(lambda lat, lon: np.argpartition(haversine_km(lat, lon, store.lat, store.long), 9)),
+    }
+
+
+def load_whole(path: str) -> PlaceStore:
+    """Încărcarea dinainte de places_stream: tot fișierul în memorie, apoi json.loads."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return PlaceStore.from_places(json.loads(raw.decode("utf-8"))["locations"], city_of=_address_city)
+
+
+def peak_of(fn: Callable[[], Any]):
+    """(ms, vârful de memorie alocată în MB) pentru fn()."""
+    gc.collect()
+    tracemalloc.start()
+    _, ms = timed(fn)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ms, round(peak / 2**20, 1)
+
+
+def bench_stream(size: int, base: List[Dict[str, Any]], workdir: str) -> Dict[str, Any]:
+    source = os.path.join(workdir, f"places_{size}.json")
+    lines = os.path.join(workdir, f"places_{size}.jsonl")
+    write_dataset(source, synthetic_places(base, size))
+    write_jsonl(lines, synthetic_places(base, size))
+
+    whole_ms, whole_peak = peak_of(lambda: load_whole(source))
+    stream_ms, stream_peak = peak_of(lambda: load_places(source, snapshot_path=""))
+    jsonl_ms, jsonl_peak = peak_of(lambda: load_places(lines, snapshot_path=""))
+    result = {
+        "places": size,
+        "json_mb": round(os.path.getsize(source) / 2**20, 1),
+        "whole_ms": whole_ms,
+        "whole_peak_mb": whole_peak,
+        "stream_ms": stream_ms,
+        "stream_peak_mb": stream_peak,
+        "jsonl_ms": jsonl_ms,
+        "jsonl_peak_mb": jsonl_peak,
+    }
+    os.remove(source)
+    os.remove(lines)
+    return result
+
+
+def national_places(base: List[Dict[str, Any]], n: int, cities: int) -> Iterator[Dict[str, Any]]:
+    """Locații sintetice împărțite uniform în `cities` orașe ("Oraș 0", "Oraș 1", ...)."""
+    for i, place in enumerate(synthetic_places(base, n)):
+        place["address"] = f"Strada {i % 97}, Oraș {i % cities}"
+        yield place
+
+
+def bench_shards(size: int, base: List[Dict[str, Any]], workdir: str, cities: int = 40) -> Dict[str, Any]:
+    source = os.path.join(workdir, f"national_{size}.json")
+    shards_dir = os.path.join(workdir, f"shards_{size}")
+    write_dataset(source, national_places(base, size, cities))
+    _, split_ms = timed(lambda: split_places(source, shards_dir))
+    question = "ce cafenele bune sunt in Oras 7"
+
+    def first_question(path: str):
+        places = load_places(path, snapshot_path="")
+        prepare_chat_turn(places, [], question, cache=None)
+        return places
+
+    whole_ms, whole_peak = peak_of(lambda: forget_derived(first_question(source)))
+    open_ms, open_peak = peak_of(lambda: ShardedPlaces(shards_dir))
+    sharded = ShardedPlaces(shards_dir)
+    shard_ms, shard_peak = peak_of(lambda: prepare_chat_turn(sharded, [], question, cache=None))
+    _, warm_ms = timed(lambda: prepare_chat_turn(sharded, [], question, cache=None))
+    sharded.unload()
+
+    result = {
+        "places": size,
+        "cities": cities,
+        "split_ms": split_ms,
+        # un singur fișier: load + index-urile pentru prima întrebare
+        "whole_first_question_ms": whole_ms,
+        "whole_peak_mb": whole_peak,
+        # shard-uri: pornire (doar manifestul) + prima întrebare pe un oraș
+        "shards_open_ms": open_ms,
+        "shards_open_peak_mb": open_peak,
+        "shard_first_question_ms": shard_ms,
+        "shard_peak_mb": shard_peak,
+        "shard_warm_question_ms": warm_ms,
+    }
+    os.remove(source)
+    shutil.rmtree(shards_dir)
+    return result
+
+
+# un mix de trafic: întrebări structurate (răspuns local) și conversaționale (LLM)
+TRAFFIC_SAMPLE = [
+    "cea mai bună pizza din Cluj",
+    "vegan places in Timișoara rated over 4.5",
+    "top 3 cafenele",
+    "Care sunt cele mai bune 5 restaurante din București?",
+    "primele trei baruri din Brașov cu rating peste 4,6",
+    "top 10 places rated 4.8+",
+    "best sushi in Constanta",
+    "Ce cafenele ai în baza ta de date?",
+    "Unde pot mânca o pizza bună în Cluj diseară?",
+    "care e cel mai bun restaurant din Iași pentru o cină romantică",
+    "top 3 cafenele aproape de mine",
+    "Recomandă-mi un loc liniștit unde să lucrez cu laptopul",
+    "what's a good place for a first date in Sibiu?",
+    "cea mai buna cafenea ieftina din Cluj",
+]
+
+
+def bench_structured(size: int, base: List[Dict[str, Any]]) -> Dict[str, Any]:
+    places = PlaceStore.from_places(synthetic_places(base, size), city_of=_address_city)
+    for question in TRAFFIC_SAMPLE:
+        prepare_chat_turn(places, [], question, cache=None)  # index-urile, o dată
+
+    before = TURN_STATS.stats()
+    local_ms: List[float] = []
+    llm_ms: List[float] = []
+    for question in TRAFFIC_SAMPLE:
+        turn, ms = timed(lambda: prepare_chat_turn(places, [], question, cache=None))
+        (local_ms if "reply" in turn else llm_ms).append(ms)
+    after = TURN_STATS.stats()
+
+    local = sum(after[route] - before[route] for route in ("list", "structured"))
+    return {
+        "places": size,
+        "questions": len(TRAFFIC_SAMPLE),
+        "structured": after["structured"] - before["structured"],
+        "list": after["list"] - before["list"],
+        "local_rate": round(local / len(TRAFFIC_SAMPLE), 3),
+        # răspuns local complet vs doar construirea prompt-ului pentru LLM (fără apelul Groq)
+        "local_answer_ms": round(sorted(local_ms)[len(local_ms) // 2], 3) if local_ms else None,
+        "llm_prompt_ms": round(sorted(llm_ms)[len(llm_ms) // 2], 3) if llm_ms else None,
+    }
+
+
+# nume parțiale / greșite, cum le scriu userii
+NAME_QUERIES = [
+    "Citadel",
+    "old inn",
+    "olde inn",
+    "il drago",
+    "doner king",
+    "shamrok",
+    "grandmas house",
+    "bread coffee",
+    "green garden",
+    "sunset tea house",
+    "bella vita 1232",
+    "gaming restart",
+]
+
+NAME_MESSAGES = [
+    "What do you think about the old inn?",
+    "ce parere ai de Citadel?",
+    "is shamrok pub any good?",
+    "cum e la bread and coffee?",
+    "Recomandă-mi un loc liniștit unde să lucrez cu laptopul",
+    "what's a good place for a first date in Sibiu?",
+]
+
+
+def bench_names(size: int, base: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import difflib
+
+    places = PlaceStore.from_places(synthetic_places(base, size), city_of=_address_city)
+    index, build_ms = timed(lambda: get_name_index(places))
+    names = [place.get("name") or "" for place in places]
+
+    def per_query(fn: Callable[[str], Any], queries: List[str]) -> float:
+        ms = sorted(best_of(lambda: fn(q)) for q in queries)
+        return round(ms[len(ms) // 2], 4)
+
+    # referința: cel mai apropiat nume prin difflib, locație cu locație (doar pe dataset-uri mici)
+    scan_ms = None
+    if size <= 10000:
+        scan_ms = per_query(lambda q: difflib.get_close_matches(q, names, n=5, cutoff=0.3), NAME_QUERIES[:3])
+
+    analyses = [analyze_message(text, places) for text in NAME_MESSAGES]
+    return {
+        "places": size,
+        "build_ms": build_ms,
+        "lookup_ms": per_query(lambda q: index.lookup(q, k=5), NAME_QUERIES),
+        "resolve_ms": per_query(lambda q: index.resolve(q), NAME_QUERIES),
+        "difflib_scan_ms": scan_ms,
+        # toate ferestrele de cuvinte dintr-un mesaj de chat
+        "message_ms": round(
+            sorted(best_of(lambda: referenced_places(places, a)) for a in analyses)[len(analyses) // 2], 4
+        ),
+        "resolved": sum(1 for q in NAME_QUERIES if index.resolve(q)),
+    }
+
+
+VECTOR_QUERIES = [
+    "cafenea linistita pentru studiu",
+    "best pizza with friends",
+    "restaurant romantic cu vin",
+    "vegan brunch",
+    "pub irlandez cu bere",
+]
+
+
+def bench_vectors(size: int, base: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import numpy as np
+
+    import place_vectors
+    from place_vectors import PlaceVectorIndex
+
+    places = PlaceStore.from_places(synthetic_places(base, size), city_of=_address_city)
+    embedder = make_embedder(load_vector_config())
+    index, build_ms = timed(lambda: PlaceVectorIndex.build(places, embedder, city_of=_address_city))
+    # referința: aceeași matrice, fără grupuri (scan complet)
+    min_size, place_vectors.VECTOR_IVF_MIN = place_vectors.VECTOR_IVF_MIN, size + 1
+    try:
+        exact = PlaceVectorIndex.build(places, embedder, city_of=_address_city)
+    finally:
+        place_vectors.VECTOR_IVF_MIN = min_size
+    scope = np.arange(0, size, 2)  # "un oraș" cu jumătate din locații
+
+    def median_ms(fn: Callable[[str], Any]) -> float:
+        ms = sorted(best_of(lambda: fn(q)) for q in VECTOR_QUERIES)
+        return round(ms[len(ms) // 2], 4)
+
+    def mean_score(idx: Any, q: str) -> float:
+        return float(np.mean([score for _pos, score in idx.search(q, k=40)]))
+
+    return {
+        "places": size,
+        "clusters": 0 if index.clusters is None else len(index.clusters.centroids),
+        "build_ms": build_ms,
+        "search_ms": median_ms(lambda q: index.search(q, k=40)),
+        "exact_search_ms": median_ms(lambda q: exact.search(q, k=40)),
+        "scope_search_ms": median_ms(lambda q: index.search(q, k=40, candidates=scope)),
+        "exact_scope_search_ms": median_ms(lambda q: exact.search(q, k=40, candidates=scope)),
+        # similaritatea medie a top-40, față de scanul complet (1.0 = aceleași scoruri)
+        "score_ratio": round(
+            min(mean_score(index, q) / max(mean_score(exact, q), 1e-9) for q in VECTOR_QUERIES), 3
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark-uri pentru dataset-ul de locații")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load_p = sub.add_parser("load", help="JSON vs snapshot binar")
+    load_p.add_argument("--sizes", default=DEFAULT_SIZES)
+    memory_p = sub.add_parser("memory", help="memorie per locație + filtre: dict-uri vs PlaceStore")
+    memory_p.add_argument("--sizes", default="10000,100000")
+    categories_p = sub.add_parser("categories", help="filtre tip / oraș: scan pe dict-uri vs posting lists + bitmask")
+    categories_p.add_argument("--sizes", default="20,10000,100000,1000000")
+    geo_p = sub.add_parser("geo", help="nearest / within_radius: GeoIndex vs brute force")
+    geo_p.add_argument("--sizes", default="20,10000,100000,1000000")
+    stream_p = sub.add_parser("stream", help="memorie de vârf la încărcare: json.load vs citire în flux (JSON / JSONL)")
+    stream_p.add_argument("--sizes", default="10000,100000,1000000")
+    shards_p = sub.add_parser("shards", help="pornire + prima întrebare: fișier național vs shard-uri pe orașe")
+    shards_p.add_argument("--sizes", default="100000,400000")
+    structured_p = sub.add_parser("structured", help="întrebări răspunse local (parser structurat) vs trimise la LLM")
+    structured_p.add_argument("--sizes", default="20,10000,100000")
+    names_p = sub.add_parser("names", help="căutare fuzzy după nume: index de trigrame vs scan cu difflib")
+    names_p.add_argument("--sizes", default="20,10000,100000")
+    vectors_p = sub.add_parser("vectors", help="căutare vectorială: pe grupuri (IVF) vs toată matricea")
+    vectors_p.add_argument("--sizes", default="10000,100000,400000")
+    for p in (load_p, memory_p, categories_p, geo_p, stream_p, shards_p, structured_p, names_p, vectors_p):
+        p.add_argument("--base", default=BASE_DATASET, help="dataset-ul real de replicat")
+    args = parser.parse_args()
+
+    base = [p.to_dict() for p in load_places(args.base, snapshot_path="")]
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    if args.command in {"memory", "categories", "geo", "structured", "names", "vectors"}:
+        bench = {
+            "memory": bench_memory,
+            "categories": bench_categories,
+            "geo": bench_geo,
+            "structured": bench_structured,
+            "names": bench_names,
+            "vectors": bench_vectors,
+        }[args.command]
+        for size in sizes:
+            print(json.dumps(bench(size, base)))
+            sys.stdout.flush()
+        return
+
+    bench = {"stream": bench_stream, "shards": bench_shards}.get(args.command, bench_load)
+    with tempfile.TemporaryDirectory(prefix="bench_places_") as workdir:
+        for size in sizes:
+            print(json.dumps(bench(size, base, workdir)))
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Index pe orașe, generat din dataset.
+
+Fiecare oraș din adrese (internat în PlaceStore) primește o cheie normalizată
+(fără diacritice, lowercase, fără punctuație): "Târgu Mureș" -> "targu mures".
+Orașele scrise diferit în adrese ("București" / "Bucharest", "Cluj-Napoca" /
+"Cluj Napoca") ajung pe aceeași cheie și au o singură listă de poziții.
+
+Aliasurile se generează din numele orașelor:
+- forma normalizată, cu și fără spații ("cluj napoca", "clujnapoca");
+- fiecare cuvânt din nume, dacă e unic între orașe ("cluj", "napoca", "mures");
+- variantele RO / EN din CITY_EXONYMS ("bucharest" <-> "bucuresti").
+
+Un oraș nou în dataset e recunoscut fără nicio schimbare de cod. Căutarea în
+text trece o singură dată prin mesaj, cu automatul din mention_matcher.py
+(doar pe cuvinte întregi: "alba" nu se potrivește în "albastru").
+"""
+import re
+import unicodedata
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from place_store import PlaceStore
+
+if TYPE_CHECKING:
+    from mention_matcher import Mention, MentionMatcher
+
+
+# variante RO / EN pentru același oraș (chei normalizate, în ambele sensuri)
+CITY_EXONYMS: Dict[str, Tuple[str, ...]] = {
+    "bucuresti": ("bucharest",),
+    "bucharest": ("bucuresti",),
+}
+
+# cuvinte din nume de orașe prea scurte ca să fie alias singure ("de", "sf")
+MIN_PART_LEN = 4
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+# ș / ț cu virgulă și ş / ţ cu sedilă, plus toate semnele diacritice (NFKD)
+_FOLD_TRANS = str.maketrans({"ș": "s", "ş": "s", "ț": "t", "ţ": "t", "Ș": "s", "Ş": "s", "Ț": "t", "Ţ": "t"})
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, fără diacritice, cuvinte separate de un singur spațiu."""
+    # textul ASCII (majoritatea numelor) nu are diacritice de scos
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text.translate(_FOLD_TRANS))
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def build_city_aliases(keys: List[str]) -> Dict[str, str]:
+    """Alias normalizat -> cheia orașului, pentru orașele cu cheile `keys` (vezi docstring-ul modulului)."""
+    aliases: Dict[str, str] = {}
+    part_owners: Dict[str, set] = {}
+
+    for key in keys:
+        aliases[key] = key
+        words = key.split()
+        if len(words) > 1:
+            aliases.setdefault("".join(words), key)
+        for word in words:
+            if len(word) >= MIN_PART_LEN:
+                part_owners.setdefault(word, set()).add(key)
+
+    # un cuvânt comun mai multor orașe ("targu") nu identifică orașul
+    for word, owners in part_owners.items():
+        if len(owners) == 1:
+            aliases.setdefault(word, next(iter(owners)))
+
+    for key in keys:
+        for variant in CITY_EXONYMS.get(key, ()):
+            aliases.setdefault(variant, key)
+    return aliases
+
+
+def build_city_matcher(aliases: Dict[str, str]) -> "MentionMatcher":
+    """Automatul (mention_matcher.py) peste aliasurile orașelor; mențiunile au kind="city", value=cheia."""
+    from mention_matcher import MentionMatcher
+
+    return MentionMatcher((alias, "city", key) for alias, key in aliases.items())
+
+
+def first_city(mentions: Iterable["Mention"]) -> Optional[str]:
+    """Primul oraș menționat (cea mai din stânga potrivire; la egalitate, cea mai lungă)."""
+    from mention_matcher import select_mentions
+
+    chosen = select_mentions(mentions, "city")
+    return chosen[0].value if chosen else None
+
+
+class CityIndex:
+    """
+    Orașele unui PlaceStore: cheie normalizată -> poziții, plus tabela de aliasuri.
+
+    `known_cities` – orașe recunoscute în întrebări chiar dacă nu au locații
+    în dataset (ca să putem spune clar "nu am locații în X").
+    """
+
+    def __init__(self, store: PlaceStore, known_cities: Iterable[str] = ()):
+        self.store = store
+
+        # cheie -> id-urile orașelor din store (scrieri diferite ale aceluiași oraș)
+        groups: Dict[str, List[int]] = {}
+        for cid, name in enumerate(store.cities):
+            key = fold_text(name)
+            if not key:
+                continue
+            # "București" și "Bucharest" în adrese -> același oraș
+            key = next((v for v in CITY_EXONYMS.get(key, ()) if v in groups), key)
+            groups.setdefault(key, []).append(cid)
+
+        self.display: Dict[str, str] = {}
+        self._positions: Dict[str, np.ndarray] = {}
+        # cheia orașului pentru fiecare id de oraș din store (-1 = fără)
+        city_keys = list(groups)
+        key_of_city_id = np.full(len(store.cities), -1, dtype=np.int32)
+        for key_id, key in enumerate(city_keys):
+            cids = groups[key]
+            lists = [store.city_positions(cid) for cid in cids]
+            positions = lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+            self._positions[key] = positions
+            # numele afișat: scrierea cu cele mai multe locații
+            self.display[key] = store.cities[max(cids, key=lambda cid: len(store.city_positions(cid)))]
+            key_of_city_id[cids] = key_id
+
+        for name in known_cities:
+            key = fold_text(name)
+            if any(v in self.display for v in CITY_EXONYMS.get(key, ())):
+                continue
+            if key and key not in self.display:
+                self.display[key] = name
+                self._positions[key] = np.zeros(0, dtype=np.int32)
+
+        # orașul (normalizat) al fiecărei locații, calculat o singură dată
+        self.city_keys = city_keys
+        self.place_city_key = np.where(store.city_id >= 0, key_of_city_id[store.city_id], -1)
+
+        self.aliases = build_city_aliases(list(self.display))
+        self.matcher = build_city_matcher(self.aliases)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Cheia orașului pentru un nume / alias ("Bucharest", "cluj"), sau None."""
+        folded = fold_text(name)
+        return self.aliases.get(folded) or self.aliases.get(folded.replace(" ", ""))
+
+    def find_in_text(self, text: str) -> Optional[str]:
+        """Primul oraș menționat în text (cea mai lungă potrivire, la nivel de cuvânt)."""
+        return first_city(self.matcher.find_text(text))
+
+    def find_in_words(self, words: Sequence[str]) -> Optional[str]:
+        """Ca find_in_text, pentru cuvintele unui text deja normalizat (vezi QueryAnalysis)."""
+        return first_city(self.matcher.find_all(words))
+
+    def positions(self, key: str) -> np.ndarray:
+        """Pozițiile (sortate) locațiilor din oraș; gol pentru un oraș fără locații."""
+        return self._positions.get(key, np.zeros(0, dtype=np.int32))
+
+    def name(self, key: str) -> str:
+        return self.display.get(key, key)
@@ -0,0 +1,285 @@
+"""
+Index spațial (grid) peste coordonatele locațiilor din PlaceStore.
+
+Globul e împărțit în celule de GEO_CELL_DEG grade (implicit 0.01°, ~1 km),
+înjumătățite la build până când o celulă ocupată are în medie cel mult
+GEO_CELL_TARGET locații. Pozițiile locațiilor sunt sortate după id-ul celulei
+(rând * lățime + coloană), deci celulele consecutive de pe un rând sunt o
+singură felie din array – o căutare citește câteva felii, nu tot dataset-ul.
+
+- nearest(lat, lon, k): căutare în inele tot mai mari în jurul celulei
+  punctului, până când cele k rezultate sunt sigur cele mai apropiate;
+- within_radius(lat, lon, radius_km): toate locațiile din cerc, sortate după distanță.
+
+Ambele acceptă aceleași filtre ca PlaceStore.filter (min_rating, categories,
+within = poziții permise, ex: un oraș din CityIndex). Pentru un grup de
+categorii se construiește (o dată) un grid doar cu locațiile din grup, ca
+o categorie rară să nu ne oblige să citim tot orașul. Distanțele sunt în km,
+pe sferă. Nu tratăm trecerea peste meridianul 180.
+"""
+import math
+import os
+from typing import Collection, List, Optional, Tuple
+
+import numpy as np
+
+from place_store import PlaceStore, _sorted_contains
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+GEO_CELL_DEG = float(os.getenv("GEO_CELL_DEG", "0.01"))
+# câte locații vrem, în medie, într-o celulă ocupată
+GEO_CELL_TARGET = int(os.getenv("GEO_CELL_TARGET", "32"))
+# celula minimă (~5 m) – sub ea nu mai împărțim, oricât de dense ar fi datele
+_MIN_CELL_DEG = 0.00005
+# sub atâtea puncte, o scanare completă e mai ieftină decât inelele din grid
+_SCAN_MAX = 2048
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distanța (km) de la (lat, lon) la fiecare punct din (lats, lons)."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats.astype(np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(lons.astype(np.float64)) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Punctele ca vectori unitari 3D (n, 3): distanța dreaptă crește odată cu cea pe sferă."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord2: np.ndarray) -> np.ndarray:
+    """Pătratul distanței drepte dintre doi vectori unitari -> distanța pe sferă (km)."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(chord2) / 2, 1.0))
+
+
+def km_to_chord2(km: float) -> float:
+    return (2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+
+class GeoIndex:
+    """Grid de celule lat/long peste locațiile cu coordonate dintr-un PlaceStore."""
+
+    def __init__(
+        self,
+        store: PlaceStore,
+        cell_deg: float = GEO_CELL_DEG,
+        subset: Optional[np.ndarray] = None,
+        cell_target: int = GEO_CELL_TARGET,
+    ):
+        self.store = store
+        self._groups: dict = {}
+
+        lat = store.lat
+        lon = store.long
+        has_coords = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        if subset is not None:
+            has_coords = has_coords[_sorted_contains(np.asarray(subset), has_coords)]
+
+        while True:
+            self._set_cell(cell_deg)
+            cells = self._cell_ids(lat[has_coords], lon[has_coords])
+            if cell_deg / 2 < _MIN_CELL_DEG or cells.size == 0:
+                break
+            if cells.size / np.unique(cells).size <= cell_target:
+                break
+            cell_deg /= 2
+        order = np.argsort(cells, kind="stable")
+
+        # pozițiile (în store) sortate după celulă + id-ul celulei fiecăreia
+        self.positions = has_coords[order].astype(np.int32)
+        self.cells = cells[order]
+        # coordonatele în aceeași ordine, ca vectori unitari: la query comparăm distanțe
+        # drepte (fără trigonometrie) și convertim în km doar rezultatele
+        self.xyz = unit_vectors(lat[self.positions], lon[self.positions])
+        # dreptunghiul (în celule) ocupat de date: rând min / max, coloană min / max
+        rows, cols = np.divmod(self.cells, self.cols)
+        self._bounds = (
+            (int(rows.min()), int(rows.max()), int(cols.min()), int(cols.max())) if self.cells.size else (0, -1, 0, -1)
+        )
+
+    def _set_cell(self, cell_deg: float) -> None:
+        self.cell_deg = cell_deg
+        self.rows = int(math.ceil(180 / cell_deg)) + 1
+        self.cols = int(math.ceil(360 / cell_deg)) + 1
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def for_categories(self, categories: Collection[str]) -> "GeoIndex":
+        """Grid doar cu locațiile din grupul de categorii (construit la prima cerere)."""
+        key = frozenset(categories)
+        index = self._groups.get(key)
+        if index is None:
+            index = GeoIndex(self.store, subset=self.store.group_positions(key))
+            self._groups[key] = index
+        return index
+
+    def _row_col(self, lat, lon):
+        row = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / self.cell_deg).astype(np.int64)
+        col = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / self.cell_deg).astype(np.int64)
+        return np.clip(row, 0, self.rows - 1), np.clip(col, 0, self.cols - 1)
+
+    def _cell_ids(self, lat, lon) -> np.ndarray:
+        row, col = self._row_col(lat, lon)
+        return row * self.cols + col
+
+    def _ranges(self, lat: float, lon: float, dlat_cells: int, dlon_cells: int):
+        """Feliile [start, end) din self.positions pentru celulele la cel mult (dlat, dlon) celule de punct."""
+        row, col = (int(v) for v in self._row_col(lat, lon))
+        # nu are rost să căutăm în afara dreptunghiului ocupat de date
+        row0, row1 = max(self._bounds[0], row - dlat_cells), min(self._bounds[1], row + dlat_cells)
+        col0, col1 = max(self._bounds[2], col - dlon_cells), min(self._bounds[3], col + dlon_cells)
+        if row0 > row1 or col0 > col1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        rows = np.arange(row0, row1 + 1, dtype=np.int64) * self.cols
+        starts = np.searchsorted(self.cells, rows + col0, side="left")
+        ends = np.searchsorted(self.cells, rows + col1, side="right")
+        return starts, ends
+
+    def _box(self, lat: float, lon: float, dlat_cells: int, dlon_cells: int) -> np.ndarray:
+        """Indicii (în self.positions) punctelor din celulele la cel mult (dlat, dlon) celule de punct."""
+        if len(self.positions) <= _SCAN_MAX:
+            return np.arange(len(self.positions))
+        starts, ends = self._ranges(lat, lon, dlat_cells, dlon_cells)
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        # concatenarea feliilor [start, end), vectorizat: start-ul feliei + indexul în felie
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(starts - offsets, lengths) + np.arange(total)
+
+    def _count(self, lat: float, lon: float, ring: int) -> int:
+        """Câte puncte sunt în inelul `ring` – doar din searchsorted, fără distanțe."""
+        starts, ends = self._ranges(lat, lon, ring, self._dlon_cells(lat, ring))
+        return int((ends - starts).sum())
+
+    def _covers_all(self, lat: float, lon: float, ring: int) -> bool:
+        row, col = (int(v) for v in self._row_col(lat, lon))
+        dlon_cells = self._dlon_cells(lat, ring)
+        row0, row1, col0, col1 = self._bounds
+        return row - ring <= row0 and row + ring >= row1 and col - dlon_cells <= col0 and col + dlon_cells >= col1
+
+    def _chord2(self, lat: float, lon: float, idx: np.ndarray) -> np.ndarray:
+        delta = self.xyz[idx] - unit_vectors(lat, lon)
+        return np.einsum("ij,ij->i", delta, delta)
+
+    def _filter(self, idx: np.ndarray, min_rating: Optional[float], within: Optional[np.ndarray]) -> np.ndarray:
+        if idx.size == 0 or (min_rating is None and within is None):
+            return idx
+        positions = self.positions[idx]
+        keep = np.ones(idx.size, dtype=bool)
+        if within is not None:
+            keep &= _sorted_contains(within, positions)
+        if min_rating is not None:
+            keep &= self.store.rating[positions] >= np.float32(min_rating)
+        return idx[keep]
+
+    def _km_per_deg_lon(self, lat: float, dlat_deg: float) -> float:
+        """Cel mai mic număr de km per grad de longitudine în banda [lat - dlat, lat + dlat]."""
+        worst = min(90.0, abs(lat) + dlat_deg)
+        return KM_PER_DEG_LAT * max(math.cos(math.radians(worst)), 1e-6)
+
+    def _dlon_cells(self, lat: float, ring: int) -> int:
+        """Câte coloane acoperă cel puțin distanța (km) a `ring` rânduri, în toată banda."""
+        dlat_deg = ring * self.cell_deg
+        return int(math.ceil(ring * KM_PER_DEG_LAT / self._km_per_deg_lon(lat, dlat_deg)))
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        min_rating: Optional[float] = None,
+        categories: Optional[Collection[str]] = None,
+        within: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Cele mai apropiate k locații care trec de filtre: [(poziție în store, km)], crescător după distanță."""
+        if categories is not None:
+            return self.for_categories(categories).nearest(lat, lon, k, min_rating=min_rating, within=within)
+        if k <= 0 or len(self.positions) == 0:
+            return []
+
+        # fără filtre, numărătorile din searchsorted spun direct de la ce inel avem k puncte
+        ring = self._smallest_ring(lat, lon, k) if min_rating is None and within is None else 1
+        if len(self.positions) <= _SCAN_MAX:
+            ring = max(self.rows, self.cols)
+        while True:
+            # ring celule în jurul celulei punctului -> tot ce e la < ring * cell_deg e sigur inclus
+            idx = self._filter(self._box(lat, lon, ring, self._dlon_cells(lat, ring)), min_rating, within)
+            covered_km = ring * self.cell_deg * KM_PER_DEG_LAT
+            covers_all = self._covers_all(lat, lon, ring)
+
+            if idx.size >= k or covers_all:
+                chord2 = self._chord2(lat, lon, idx)
+                if idx.size > k:
+                    top = np.argpartition(chord2, k - 1)[:k]
+                else:
+                    top = np.arange(idx.size)
+                top = top[np.argsort(chord2[top], kind="stable")]
+                dist = chord_to_km(chord2[top])
+                # al k-lea rezultat e în interiorul zonei acoperite -> nimic din afară nu poate fi mai aproape
+                if covers_all or (top.size == k and dist[-1] <= covered_km):
+                    return [(int(self.positions[idx[i]]), float(d)) for i, d in zip(top, dist)]
+                # sărim direct la inelul care acoperă distanța celui de-al k-lea
+                ring = max(ring + 1, int(math.ceil(dist[-1] / (self.cell_deg * KM_PER_DEG_LAT))))
+            else:
+                ring *= 2
+
+    def _smallest_ring(self, lat: float, lon: float, k: int) -> int:
+        """Cel mai mic inel cu cel puțin k puncte (sau care acoperă toate datele)."""
+        if len(self.positions) <= _SCAN_MAX:
+            return 1
+        ring = 1
+        while self._count(lat, lon, ring) < k and not self._covers_all(lat, lon, ring):
+            ring *= 2
+        # căutare binară în (ring / 2, ring] – dublarea poate sări peste un cluster dens
+        lo, hi = ring // 2 + 1, ring
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._count(lat, lon, mid) >= k:
+                hi = mid
+            else:
+                lo = mid + 1
+        return hi
+
+    def within_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        min_rating: Optional[float] = None,
+        categories: Optional[Collection[str]] = None,
+        within: Optional[np.ndarray] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Locațiile la cel mult radius_km care trec de filtre: [(poziție în store, km)], crescător după distanță."""
+        if categories is not None:
+            return self.for_categories(categories).within_radius(
+                lat, lon, radius_km, min_rating=min_rating, within=within, limit=limit
+            )
+        if radius_km < 0 or len(self.positions) == 0:
+            return []
+
+        dlat_deg = radius_km / KM_PER_DEG_LAT
+        dlat_cells = int(math.ceil(dlat_deg / self.cell_deg))
+        dlon_cells = int(math.ceil(radius_km / self._km_per_deg_lon(lat, dlat_deg) / self.cell_deg))
+        idx = self._filter(self._box(lat, lon, dlat_cells, dlon_cells), min_rating, within)
+
+        chord2 = self._chord2(lat, lon, idx)
+        inside = np.flatnonzero(chord2 <= km_to_chord2(radius_km))
+        if limit is not None and inside.size > limit:
+            inside = inside[np.argpartition(chord2[inside], limit - 1)[:limit]] if limit > 0 else inside[:0]
+        inside = inside[np.argsort(chord2[inside], kind="stable")]
+        dist = chord_to_km(chord2[inside])
+        return [(int(self.positions[idx[i]]), float(d)) for i, d in zip(inside, dist)]
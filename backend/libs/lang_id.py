@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""
+Limba unui mesaj (RO / EN) din trigrame de caractere.
+
+Profilele se învață o singură dată per proces din corpusul de lângă modul
+(lang_corpus/<limbă>.txt, sau LANG_CORPUS_DIR): frecvența fiecărei trigrame
+de caractere în fiecare limbă. Un mesaj primește scorul naive Bayes
+  sum(log P(trigramă | ro) - log P(trigramă | en))
+peste trigramele lui, iar încrederea e sigmoida scorului.
+
+Caracterele sunt reduse la un alfabet de 32 de simboluri (a-z, ă â î ș ț și
+"margine de cuvânt" pentru tot restul), deci o trigramă e un întreg < 32^3
+și profilul e un singur array de ponderi. Un mesaj = câteva operații numpy
+(microsecunde); identify_batch punctează oricâte texte într-un singur apel
+vectorizat.
+
+Frazele RO din corpus sunt învățate și fără diacritice – mulți useri scriu
+"cafenea buna in centru".
+
+  python lang_id.py "Unde mâncăm diseară?" "best coffee in town"
+  python lang_id.py < mesaje.txt        # o linie -> un JSON cu limba și încrederea
+  python lang_id.py --check             # mesajele din lang_corpus/heldout.txt, ca în chat
+
+Verificarea (--check) trece mesajele de control prin analiza din chat
+(query_analysis.py: trigrame + cuvintele-indiciu, fără numele de orașe) și
+iese cu cod 1 dacă unul de cel puțin două cuvinte e detectat greșit. Mesajele
+de un cuvânt ("hi", "cool") sunt ambigue: apar în raport, dar nu pică
+verificarea.
+"""
+import json
+import os
+import sys
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from city_index import fold_text
+
+LANG_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lang_corpus")
+# mesaje de control, neînvățate: "<limbă>\t<mesaj>" pe linie
+LANG_HELDOUT_PATH = os.path.join(LANG_CORPUS_DIR, "heldout.txt")
+LANGS = ("ro", "en")
+
+# sub pragul ăsta textul e prea scurt / ambiguu (ex: "ok", "pizza") – decide apelantul
+LANG_ID_MIN_CONFIDENCE = float(os.getenv("LANG_ID_MIN_CONFIDENCE", "0.75"))
+
+# 0 = margine de cuvânt, 1..26 = a..z, 27..31 = literele românești
+_ALPHABET = 32
+_RO_LETTERS = {"ă": 27, "â": 28, "î": 29, "ș": 30, "ş": 30, "ț": 31, "ţ": 31}
+_TRIGRAMS = _ALPHABET**3
+# netezire (add-alpha) pentru trigramele care nu apar în corpus
+_ALPHA = 0.5
+# scorul naive Bayes e prea sigur pe sine la texte lungi; îl temperăm înainte de sigmoidă
+_SCALE = 0.35
+
+
+def _build_table() -> np.ndarray:
+    """Cod Unicode -> simbol, pentru Latin (până la Latin Extended-B); ultimul element = orice altceva."""
+    size = 0x250
+    table = np.zeros(size + 1, dtype=np.int32)
+    for cp in range(size):
+        ch = chr(cp).lower()[:1]
+        if ch in _RO_LETTERS:
+            table[cp] = _RO_LETTERS[ch]
+            continue
+        base = unicodedata.normalize("NFKD", ch)[:1]  # é -> e, ü -> u
+        if "a" <= base <= "z":
+            table[cp] = ord(base) - ord("a") + 1
+    return table
+
+
+_TABLE = _build_table()
+
+
+def _symbols(text: str) -> np.ndarray:
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return _TABLE[np.minimum(codes, len(_TABLE) - 1)]
+
+
+def _trigrams(symbols: np.ndarray) -> np.ndarray:
+    """Codurile trigramelor unui text deja încadrat de margini; marginile consecutive contează ca una."""
+    keep = np.ones(len(symbols), dtype=bool)
+    keep[1:] = (symbols[1:] != 0) | (symbols[:-1] != 0)
+    s = symbols[keep]
+    return (s[:-2] * _ALPHABET + s[1:-1]) * _ALPHABET + s[2:]
+
+
+class LanguageIdentifier:
+    """Ponderile log P(t | ro) - log P(t | en) pentru toate cele 32^3 trigrame."""
+
+    def __init__(self, weights: np.ndarray):
+        self.weights = weights.astype(np.float32)
+
+    @classmethod
+    def from_corpus(cls, path: str) -> "LanguageIdentifier":
+        log_probs = []
+        for lang in LANGS:
+            with open(os.path.join(path, f"{lang}.txt"), "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+            if lang == "ro":
+                lines += [fold_text(line) for line in lines]
+            counts = np.zeros(_TRIGRAMS, dtype=np.float64)
+            for line in lines:
+                counts += np.bincount(_trigrams(_symbols(f" {line} ")), minlength=_TRIGRAMS)
+            log_probs.append(np.log((counts + _ALPHA) / (counts.sum() + _ALPHA * _TRIGRAMS)))
+        return cls(log_probs[0] - log_probs[1])
+
+    def _result(self, score: float) -> Tuple[str, float]:
+        p_ro = 1.0 / (1.0 + np.exp(-_SCALE * score))
+        return ("ro", float(p_ro)) if p_ro >= 0.5 else ("en", float(1.0 - p_ro))
+
+    def identify(self, text: str, bias: float = 0.0) -> Tuple[str, float]:
+        """
+        (limba, încrederea în [0.5, 1]); un text fără litere dă încredere 0.5.
+        `bias` = log-odds în favoarea RO venite din altă parte (ex: voturile
+        cuvintelor-indiciu din query_analysis.py), adunate la scorul temperat.
+        """
+        score = float(self.weights[_trigrams(_symbols(f" {text} "))].sum())
+        return self._result(score + bias / _SCALE)
+
+    def identify_batch(self, texts: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        identify pentru multe texte într-un singur apel: toate textele sunt
+        codificate într-un singur array, iar scorurile se adună per text cu bincount.
+        """
+        if not texts:
+            return [], np.zeros(0, dtype=np.float32)
+        lengths = np.fromiter((len(text) + 2 for text in texts), dtype=np.int64, count=len(texts))
+        symbols = _symbols("".join(f" {text} " for text in texts))
+        owner = np.repeat(np.arange(len(texts)), lengths)
+
+        # marginile consecutive contează ca una – doar în interiorul aceluiași text
+        keep = np.ones(len(symbols), dtype=bool)
+        keep[1:] = (symbols[1:] != 0) | (symbols[:-1] != 0) | (owner[1:] != owner[:-1])
+        s, owner = symbols[keep], owner[keep]
+        codes = (s[:-2] * _ALPHABET + s[1:-1]) * _ALPHABET + s[2:]
+        # o trigramă care trece peste granița dintre două texte nu contează
+        inside = owner[:-2] == owner[2:]
+        scores = np.bincount(owner[:-2][inside], weights=self.weights[codes[inside]], minlength=len(texts))
+
+        p_ro = 1.0 / (1.0 + np.exp(-_SCALE * scores))
+        is_ro = p_ro >= 0.5
+        langs = ["ro" if ro else "en" for ro in is_ro.tolist()]
+        return langs, np.where(is_ro, p_ro, 1.0 - p_ro).astype(np.float32)
+
+
+_IDENTIFIERS: Dict[str, LanguageIdentifier] = {}
+_LOCK = threading.Lock()
+
+
+def load_language_identifier(path: Optional[str] = None) -> LanguageIdentifier:
+    """Identificatorul învățat din LANG_CORPUS_DIR (implicit lang_corpus/ de lângă modul), o dată per proces."""
+    path = path or os.getenv("LANG_CORPUS_DIR") or LANG_CORPUS_DIR
+    identifier = _IDENTIFIERS.get(path)
+    if identifier is None:
+        with _LOCK:
+            identifier = _IDENTIFIERS.get(path)
+            if identifier is None:
+                identifier = _IDENTIFIERS[path] = LanguageIdentifier.from_corpus(path)
+    return identifier
+
+
+def check_heldout(path: str = LANG_HELDOUT_PATH) -> Tuple[int, List[Dict[str, object]]]:
+    """(câte mesaje, mesajele detectate greșit) – limba dată de analiza din chat, nu de trigrame singure."""
+    from city_index import build_city_aliases, build_city_matcher
+    from Chat_Bot_Groq_final_v2 import KNOWN_CITIES
+    from query_analysis import analyze_query
+
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t", 1) for line in f if line.strip() and not line.startswith("#")]
+    # orașele nu votează limba, ca în chat (acolo vin din dataset)
+    matcher = build_city_matcher(build_city_aliases(KNOWN_CITIES))
+    wrong = []
+    for expected, text in rows:
+        analysis = analyze_query(text, matcher=matcher)
+        if analysis.lang != expected:
+            wrong.append(
+                {
+                    "text": text,
+                    "expected": expected,
+                    "lang": analysis.lang,
+                    "confidence": round(analysis.lang_confidence, 3),
+                }
+            )
+    return len(rows), wrong
+
+
+def main() -> None:
+    if sys.argv[1:2] == ["--check"]:
+        total, wrong = check_heldout(*sys.argv[2:3])
+        for row in wrong:
+            print(json.dumps(row, ensure_ascii=False))
+        failed = [row for row in wrong if len(str(row["text"]).split()) > 1]
+        print(json.dumps({"messages": total, "wrong": len(wrong), "failed": len(failed)}))
+        sys.exit(1 if failed else 0)
+
+    texts = sys.argv[1:] or [line.rstrip("\n") for line in sys.stdin]
+    langs, confidences = load_language_identifier().identify_batch(texts)
+    for text, lang, confidence in zip(texts, langs, confidences.tolist()):
+        print(json.dumps({"text": text, "lang": lang, "confidence": round(confidence, 3)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
-from typing import List, Literal
+import asyncio
+import json
+from typing import List, Literal, Optional
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from groq import Groq
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from groq import AsyncGroq
 
 from Chat_Bot_Groq_final_v2 import (  # sau Chat_Bot_Groq_final dacă așa se numește la tine
     load_config,
-    load_places,
-    answer_message,
-    generate_vibe_for_place,
+    answer_message_async,
+    answer_message_stream_async,
+    find_place,
+    generate_vibe_for_place_async,
 )
+from places_reload import PlacesReloader
+from vibe_cache import open_vibe_cache
 
 # ----------------- Models -----------------
 
@@ -19,9 +25,16 @@ class ChatMessage(BaseModel):
     content: str
 
 
+class Location(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
 class ChatRequest(BaseModel):
     message: str
     history: List[ChatMessage] = []
+    # locația userului (opțional) – pentru "aproape de mine", distanțe în răspuns
+    location: Optional[Location] = None
 
 
 class ChatResponse(BaseModel):
@@ -30,11 +43,15 @@ class ChatResponse(BaseModel):
 
 
 class VibeRequest(BaseModel):
-    place_index: int  # 1-based
+    # unul dintre ele: indexul 1-based, câmpul "id" din dataset sau numele (fuzzy: "old inn", "citadel")
+    place_index: Optional[int] = None
+    place_id: Optional[int] = None
+    name: Optional[str] = None
 
 
 class VibeResponse(BaseModel):
     place_index: int
+    place_id: Optional[int] = None
     place_name: str
     vibe: str
 
@@ -44,9 +61,25 @@ class VibeResponse(BaseModel):
 app = FastAPI(title="Spot&Snack AI API")
 
 config = load_config()
-client = Groq(api_key=config["api_key"])
-places = load_places(config["locations_path"])
+# AsyncGroq: request-urile către LLM nu blochează event loop-ul uvicorn
+client = AsyncGroq(api_key=config["api_key"])
+# dataset-ul curent; LOCATIONS_PATH e urmărit și reîncărcat în fundal (PLACES_RELOAD_INTERVAL).
+# Fiecare request ia `places_reloader.current` o singură dată, la început.
+places_reloader = PlacesReloader(config["locations_path"], interval=config["places_reload_interval"])
 model = config["model"]
+vibe_cache = open_vibe_cache(config)
+
+
+@app.on_event("startup")
+def start_places_reloader():
+    # index-urile (BM25, vectori, nume, ...) se construiesc acum, nu în primul request
+    places_reloader.warm()
+    places_reloader.start()
+
+
+@app.on_event("shutdown")
+def stop_places_reloader():
+    places_reloader.stop()
 
 
 # ----------------- Routes -----------------
@@ -58,13 +91,15 @@ async def chat_endpoint(body: ChatRequest):
         raise HTTPException(status_code=400, detail="message is required")
 
     history_dicts = [{"role": m.role, "content": m.content} for m in body.history]
+    places = places_reloader.current
 
-    result = answer_message(
+    result = await answer_message_async(
         client=client,
         model=model,
         places=places,
         history=history_dicts,
         user_input=body.message,
+        location=(body.location.lat, body.location.lon) if body.location else None,
     )
 
     reply = result.get("reply", "")
@@ -77,20 +112,72 @@ async def chat_endpoint(body: ChatRequest):
     return ChatResponse(reply=reply, history=history_models)
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(body: ChatRequest):
+    """
+    Același request ca /chat, dar răspunsul vine ca NDJSON (un eveniment pe linie):
+
+      {"event": "delta", "delta": "..."}
+      ...
+      {"event": "done", "reply": "...", "history": [...]}
+    """
+    if not body.message.strip():
+        raise HTTPException(status_code=400, detail="message is required")
+
+    history_dicts = [{"role": m.role, "content": m.content} for m in body.history]
+    # același dataset pe tot stream-ul, chiar dacă între timp se face un reload
+    places = places_reloader.current
+
+    async def events():
+        try:
+            async for event in answer_message_stream_async(
+                client=client,
+                model=model,
+                places=places,
+                history=history_dicts,
+                user_input=body.message,
+                location=(body.location.lat, body.location.lon) if body.location else None,
+            ):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # header-ele (200) au plecat deja, deci eroarea merge ca ultim eveniment
+            error = {"event": "error", "error": "internal_error", "details": str(e)}
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/vibe", response_model=VibeResponse)
 async def vibe_endpoint(body: VibeRequest):
-    idx = body.place_index
-    if not (1 <= idx <= len(places)):
-        raise HTTPException(
-            status_code=400,
-            detail=f"place_index out of range (1..{len(places)})",
+    places = places_reloader.current
+    if body.place_index is not None:
+        idx = body.place_index
+        if not (1 <= idx <= len(places)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"place_index out of range (1..{len(places)})",
+            )
+    elif body.place_id is not None or (body.name or "").strip():
+        # pe un dataset cu shard-uri poate încărca un shard: nu pe event loop
+        pos = await asyncio.to_thread(
+            find_place, places, place_id=body.place_id, name=(body.name or "").strip() or None
         )
-
-    place = places[idx - 1]
-    vibe_text = generate_vibe_for_place(client, model, place)
+        if pos is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"place not found: {body.place_id if body.place_id is not None else body.name!r}",
+            )
+        idx = pos + 1
+    else:
+        raise HTTPException(status_code=400, detail="place_index, place_id or name is required")
+
+    place = await asyncio.to_thread(places.__getitem__, idx - 1)
+    place_id = place.get("id")
+    vibe_text = await generate_vibe_for_place_async(client, model, place, cache=vibe_cache)
 
     return VibeResponse(
         place_index=idx,
+        place_id=place_id if isinstance(place_id, int) else None,
         place_name=place.get("name", ""),
         vibe=vibe_text,
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,139 @@
+"""
+Aho-Corasick pe cuvinte: toate mențiunile (orașe, categorii, locații) dintr-un
+mesaj, într-o singură trecere.
+
+Tiparele și textul sunt normalizate cu fold_text și împărțite în cuvinte;
+automatul trece din stare în stare cu câte un cuvânt întreg, nu cu câte o
+literă. Consecințe:
+- potrivirile sunt mereu pe cuvinte întregi ("alba" nu se potrivește în
+  "albastru", "iasi" nu se potrivește în "iasiul");
+- costul unui mesaj e liniar în numărul lui de cuvinte, oricâte tipare ar fi
+  (mii de localități, zeci de mii de nume de locații);
+- tabela de tranziții are o intrare per prefix de cuvinte distinct, nu per
+  literă – rămâne mică și pentru multe nume.
+"""
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from city_index import fold_text
+
+# cheia unei tranziții: (stare << _WORD_BITS) | id-ul cuvântului
+_WORD_BITS = 32
+
+
+class Mention(NamedTuple):
+    start: int  # primul cuvânt (index în tokenii mesajului)
+    end: int  # după ultimul cuvânt
+    kind: str  # "city", "category", "place", ...
+    value: Any  # cheia orașului / numele categoriei / pozițiile locației
+    text: str  # tiparul potrivit (normalizat)
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+
+class MentionMatcher:
+    """
+    Automatul compilat din tipare (text, kind, value), cu value hashable. Textul
+    e normalizat aici cu fold_text; normalize=False dacă e deja normalizat.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, str, Any]], normalize: bool = True):
+        vocab: Dict[str, int] = {}
+        goto: Dict[int, int] = {}
+        self._patterns: List[Tuple[str, str, Any, int]] = []  # (text, kind, value, nr. de cuvinte)
+        outputs: Dict[int, List[int]] = {}
+        seen = set()
+        states = 1
+
+        for text, kind, value in patterns:
+            if normalize:
+                text = fold_text(text)
+            words = text.split()
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                wid = vocab.get(word)
+                if wid is None:
+                    wid = vocab[word] = len(vocab)
+                key = (state << _WORD_BITS) | wid
+                nxt = goto.get(key)
+                if nxt is None:
+                    nxt = goto[key] = states
+                    states += 1
+                state = nxt
+            if (state, kind, value) in seen:
+                continue  # același tipar de două ori
+            seen.add((state, kind, value))
+            outputs.setdefault(state, []).append(len(self._patterns))
+            self._patterns.append((" ".join(words), kind, value, len(words)))
+        self._vocab = vocab
+        self._goto = goto
+
+        # legături de eșec + legături spre cea mai apropiată stare-sufix cu potriviri (BFS)
+        fail = array("i", [0]) * states
+        out_link = array("i", [0]) * states
+        children: Dict[int, List[Tuple[int, int]]] = {}
+        for key, nxt in goto.items():
+            children.setdefault(key >> _WORD_BITS, []).append((key & ((1 << _WORD_BITS) - 1), nxt))
+
+        queue = deque(nxt for _wid, nxt in children.get(0, ()))
+        while queue:
+            state = queue.popleft()
+            for wid, nxt in children.get(state, ()):
+                f = fail[state]
+                while f and ((f << _WORD_BITS) | wid) not in goto:
+                    f = fail[f]
+                target = goto.get((f << _WORD_BITS) | wid, 0)
+                fail[nxt] = target if target != nxt else 0
+                out_link[nxt] = fail[nxt] if fail[nxt] in outputs else out_link[fail[nxt]]
+                queue.append(nxt)
+
+        self._fail = fail
+        self._out_link = out_link
+        self._outputs = {state: tuple(ids) for state, ids in outputs.items()}
+        self.states = states
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def find_all(self, words: Sequence[str]) -> List[Mention]:
+        """Toate mențiunile din cuvintele unui text normalizat (fold_text(...).split()), în ordinea sfârșitului."""
+        goto, fail, vocab = self._goto, self._fail, self._vocab
+        outputs, out_link = self._outputs, self._out_link
+        mentions: List[Mention] = []
+        state = 0
+        for i, word in enumerate(words):
+            wid = vocab.get(word)
+            if wid is None:
+                state = 0  # cuvânt care nu apare în niciun tipar
+                continue
+            while state and ((state << _WORD_BITS) | wid) not in goto:
+                state = fail[state]
+            state = goto.get((state << _WORD_BITS) | wid, 0)
+
+            s = state if state in outputs else out_link[state]
+            while s:
+                for pid in outputs[s]:
+                    text, kind, value, length = self._patterns[pid]
+                    mentions.append(Mention(i + 1 - length, i + 1, kind, value, text))
+                s = out_link[s]
+        return mentions
+
+    def find_text(self, text: str) -> List[Mention]:
+        return self.find_all(fold_text(text).split())
+
+
+def select_mentions(mentions: Iterable[Mention], kind: Optional[str] = None) -> List[Mention]:
+    """Mențiunile (de tipul `kind`) care nu se suprapun: de la stânga la dreapta, cea mai lungă întâi."""
+    chosen: List[Mention] = []
+    end = 0
+    for m in sorted((m for m in mentions if kind is None or m.kind == kind), key=lambda m: (m.start, -m.length)):
+        if m.start >= end:
+            chosen.append(m)
+            end = m.end
+    return chosen
+
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""
+Căutare fuzzy după numele locațiilor (trigrame de caractere).
+
+Userii pomenesc locațiile după o parte din nume sau greșit scris: "Citadel",
+"old inn cluj", "cafeneaua citadela". Numele sunt normalizate cu fold_text
+(lowercase, fără diacritice) și descompuse în trigrame per cuvânt, ca în
+pg_trgm: "  old " -> "  o", " ol", "old", "ld ". O greșeală de tipar strică
+doar 2-3 trigrame, restul se potrivesc în continuare. Partea dintre ghilimele
+a unui nume ("Irish Pub 'The Shamrock'") e indexată și separat, ca variantă.
+
+Indexul e pe coloane numpy (ca PlaceStore): o trigramă e un întreg < 37^3
+(margine, a-z, 0-9), iar pentru fiecare trigramă ținem pozițiile locațiilor
+care o conțin (postings, CSR) și invers. Fiecare trigramă are un idf: cele
+din "restaurant" / "coffee" apar peste tot și contează puțin, cele din
+"citadel" contează mult.
+
+Scorul unei locații (în [0, 1]) e media a două acoperiri, ponderate cu idf:
+cât din interogare se găsește în nume și cât din nume se găsește în
+interogare. "Citadel" -> "The Literary Coffee House 'Citadel'" are prima
+acoperire ~1 și a doua mare, pentru că "the literary coffee house" are
+trigrame comune (idf mic).
+
+O căutare alege candidații din postings-urile celor mai rare trigrame ale
+interogării (np.unique + np.bincount), apoi calculează scorul complet doar
+pentru cei mai buni dintre ei, din trigramele fiecărui nume. Sub o
+milisecundă la 100k locații (bench_places.py names).
+
+  python place_names.py --source locatii.json "old inn" "citadela"
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from city_index import fold_text
+
+# scorul de la care un nume din mesaj / din /vibe e considerat găsit ...
+PLACE_NAME_MIN_SCORE = float(os.getenv("PLACE_NAME_MIN_SCORE", "0.7"))
+# ... sau, de la 60% din el, dacă e de atâtea ori peste următorul nume ("old inn cluj", "shamrok")
+PLACE_NAME_MARGIN = float(os.getenv("PLACE_NAME_MARGIN", "2.0"))
+_MARGIN_FLOOR = 0.6
+# rezultatele cu scorul aproape de cel mai bun (lanțuri, nume aproape identice) vin împreună
+_TIE_RATIO = 0.85
+
+# 0 = margine de cuvânt (și orice altceva), 1..26 = a..z, 27..36 = 0..9
+_ALPHABET = 37
+_TRIGRAMS = _ALPHABET**3
+# câte poziții din postings (ale trigramelor celor mai rare din interogare) aleg
+# candidații; trigramele frecvente contează doar la scorul complet al candidaților
+_POSTINGS_BUDGET = 10_000
+# câți candidați (după trigramele rare) primesc scorul complet, per rezultat cerut
+_CANDIDATES_PER_RESULT = 8
+
+
+# numele între ghilimele dintr-un nume complet: Restaurant 'The Old Inn' -> The Old Inn
+# (ghilimelele trebuie să fie la margine de cuvânt – apostroful din "Joe's" nu contează)
+_QUOTED_NAME = re.compile(r"""(?:^|(?<=\s))['"„“«]([^'"„“”«»]{3,}?)['"”»](?=\s|$)""")
+
+
+def name_variants(name: str) -> List[str]:
+    """Cum poate fi pomenită o locație: numele complet și partea dintre ghilimele."""
+    return [name] + _QUOTED_NAME.findall(name)
+
+
+def _build_table() -> np.ndarray:
+    table = np.zeros(129, dtype=np.int32)
+    for i, ch in enumerate("abcdefghijklmnopqrstuvwxyz0123456789"):
+        table[ord(ch)] = i + 1
+    return table
+
+
+_TABLE = _build_table()
+
+
+def _padded(folded: str) -> str:
+    """"old inn" -> "  old   inn " – fiecare cuvânt cu marginile lui."""
+    return "".join(f"  {word} " for word in folded.split())
+
+
+def _symbols(text: str) -> np.ndarray:
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return _TABLE[np.minimum(codes, len(_TABLE) - 1)]
+
+
+def _trigrams(s: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Codurile trigramelor și care dintre ele contează (nu cele care se termină în două margini)."""
+    codes = (s[:-2] * _ALPHABET + s[1:-1]) * _ALPHABET + s[2:]
+    # "d  " / "   " = sfârșitul unui cuvânt + spațiul dintre cuvinte – nu spun nimic
+    return codes, (s[1:-1] != 0) | (s[2:] != 0)
+
+
+def name_trigrams(text: str) -> np.ndarray:
+    """Codurile (unice, sortate) trigramelor unui nume / unei interogări."""
+    folded = fold_text(text)
+    if not folded:
+        return np.zeros(0, dtype=np.int32)
+    codes, keep = _trigrams(_symbols(_padded(folded)))
+    return np.unique(codes[keep])
+
+
+class PlaceNameIndex:
+    """
+    Index de trigrame peste numele locațiilor (locația i = names[i]). Fiecare
+    nume intră cu variantele lui (name_variants): "shamrok" e aproape de
+    "The Shamrock", chiar dacă e departe de "Irish Pub 'The Shamrock'".
+
+    lookup() întoarce (poziție, scor) pentru cele mai apropiate k locații,
+    opțional doar dintr-un set de poziții (ex: orașul din întrebare).
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.size = len(names)
+        variants = [[fold_text(variant) for variant in name_variants(name or "")] for name in names]
+        # documentul d = o variantă de nume a locației owner[d]
+        self.owner = np.repeat(
+            np.arange(self.size, dtype=np.int32),
+            np.fromiter((len(v) for v in variants), dtype=np.int64, count=self.size),
+        )
+        padded = [_padded(variant) for v in variants for variant in v]
+        self.docs = len(padded)
+
+        # toate variantele într-un singur text; doc[i] = documentul simbolului i
+        lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=self.docs)
+        doc = np.repeat(np.arange(self.docs, dtype=np.int64), lengths)
+        trigrams, keep = _trigrams(_symbols("".join(padded)))
+        keep &= doc[:-2] == doc[2:]
+
+        # perechi (document, trigramă) unice, sortate după document
+        pairs = np.unique(doc[:-2][keep] * _TRIGRAMS + trigrams[keep])
+        pair_doc = (pairs // _TRIGRAMS).astype(np.int32)
+        pair_code = (pairs % _TRIGRAMS).astype(np.int32)
+
+        # trigramă -> documente (CSR)
+        order = np.argsort(pair_code, kind="stable")
+        self.postings = pair_doc[order]
+        df = np.bincount(pair_code, minlength=_TRIGRAMS)
+        self.offsets = np.zeros(_TRIGRAMS + 1, dtype=np.int64)
+        np.cumsum(df, out=self.offsets[1:])
+
+        # document -> trigramele lui (CSR), pentru scorul complet al candidaților
+        self.doc_codes = pair_code
+        self.doc_offsets = np.zeros(self.docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_doc, minlength=self.docs), out=self.doc_offsets[1:])
+
+        # trigramele necunoscute (greșeli de tipar) au idf-ul maxim
+        self.idf = np.log1p(self.docs / (df + 1.0)).astype(np.float32)
+        self.doc_weight = np.bincount(pair_doc, weights=self.idf[pair_code], minlength=self.docs)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(
+        self,
+        query: str,
+        k: int = 5,
+        within: Optional[np.ndarray] = None,
+        min_score: float = 0.0,
+    ) -> List[Tuple[int, float]]:
+        """
+        Cele mai apropiate k nume de `query`, ca (poziție, scor), descrescător.
+        `within` – poziții permise (array sortat); doar scorurile >= min_score.
+        """
+        codes = name_trigrams(query)
+        if not codes.size or not self.size:
+            return []
+        query_weight = float(self.idf[codes].sum())
+        df = self.offsets[codes + 1] - self.offsets[codes]
+        seen = codes[df > 0]
+        seen_df = df[df > 0]
+        if not seen.size:
+            return []
+
+        # candidații: documentele din postings-urile trigramelor rare, până la buget – dar
+        # măcar jumătate din trigrame, ca o greșeală de tipar care există întâmplător
+        # într-un alt nume să nu aleagă singură candidații
+        by_df = np.argsort(seen_df, kind="stable")
+        fits = np.cumsum(seen_df[by_df]) <= _POSTINGS_BUDGET
+        fits[: (seen.size + 1) // 2] = True
+        rare = seen[by_df[fits]]
+        starts, ends = self.offsets[rare], self.offsets[rare + 1]
+        hits = np.concatenate([self.postings[a:b] for a, b in zip(starts.tolist(), ends.tolist())])
+        weights = np.repeat(self.idf[rare], ends - starts)
+        if within is not None:
+            allowed = np.zeros(self.size, dtype=bool)
+            allowed[within] = True
+            keep = allowed[self.owner[hits]]
+            hits, weights = hits[keep], weights[keep]
+        if not hits.size:
+            return []
+        partial = np.bincount(hits, weights=weights, minlength=self.docs)
+        # un document cu sub jumătate din scorul parțial al celui mai bun nu mai
+        # ajunge în față doar din trigramele frecvente
+        candidates = np.flatnonzero(partial >= 0.5 * partial.max())
+        limit = k * _CANDIDATES_PER_RESULT
+        if candidates.size > limit:
+            # la egalitate (lanțuri cu același nume) câștigă locația din fața dataset-ului;
+            # fără scoruri egale, argpartition nu degenerează
+            ranked = candidates * 1e-10 - partial[candidates]
+            candidates = np.sort(candidates[np.argpartition(ranked, limit - 1)[:limit]])
+
+        # scorul complet al candidaților, din trigramele fiecărui document (CSR-ul document -> trigrame)
+        query_idf = np.zeros(_TRIGRAMS, dtype=np.float32)
+        query_idf[seen] = self.idf[seen]
+        first, last = self.doc_offsets[candidates], self.doc_offsets[candidates + 1]
+        lengths = last - first
+        gather = np.repeat(first - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        owner = np.repeat(np.arange(candidates.size), lengths)
+        shared = np.bincount(owner, weights=query_idf[self.doc_codes[gather]], minlength=candidates.size)
+
+        scores = 0.5 * (shared / query_weight + shared / np.maximum(self.doc_weight[candidates], 1e-9))
+        # cea mai bună variantă a fiecărei locații
+        found: Dict[int, float] = {}
+        for i in np.argsort(-scores, kind="stable").tolist():
+            pos = int(self.owner[candidates[i]])
+            if pos not in found and scores[i] >= min_score:
+                found[pos] = round(float(scores[i]), 4)
+                if len(found) == k:
+                    break
+        return list(found.items())
+
+    def resolve(self, query: str, k: int = 5, within: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Locațiile la care se referă `query`, dacă măcar una e destul de sigură
+        (PLACE_NAME_MIN_SCORE / PLACE_NAME_MARGIN): cea mai bună plus cele la
+        egalitate cu ea; altfel lista e goală.
+        """
+        matches = self.lookup(query, k=k + 1, within=within)
+        if not matches:
+            return []
+        best = matches[0][1]
+        runner_up = next((score for _pos, score in matches if score < best * _TIE_RATIO), 0.0)
+        if best < PLACE_NAME_MIN_SCORE and not (
+            best >= PLACE_NAME_MIN_SCORE * _MARGIN_FLOOR and best >= PLACE_NAME_MARGIN * runner_up
+        ):
+            return []
+        return [(pos, score) for pos, score in matches[:k] if score >= best * _TIE_RATIO]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Căutare fuzzy după numele locațiilor")
+    parser.add_argument("--source", required=True, help="JSON-ul cu locații ({'locations': [...]})")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("queries", nargs="*", help="interogări (implicit: câte una pe linie, din stdin)")
+    args = parser.parse_args()
+
+    with open(args.source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    places: List[Dict[str, Any]] = data.get("locations", data) if isinstance(data, dict) else data
+    index = PlaceNameIndex([place.get("name", "") for place in places])
+
+    for query in args.queries or [line.rstrip("\n") for line in sys.stdin]:
+        matches = [
+            {"name": places[pos].get("name", ""), "id": places[pos].get("id"), "score": score}
+            for pos, score in index.lookup(query, k=args.k)
+        ]
+        resolved = [places[pos].get("name", "") for pos, _score in index.resolve(query, k=args.k)]
+        print(json.dumps({"query": query, "resolved": resolved, "matches": matches}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import heapq
+import math
+import re
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+
+# ------------- BM25 retrieval over places -------------
+#
+# Index inversat peste name + short_description + categories + oraș, ca să
+# trimitem la LLM doar locațiile relevante pentru întrebare (top-k), nu tot
+# dataset-ul. Textul e normalizat cu aceeași funcție ca intent-urile
+# (lowercase + fără diacritice).
+
+
+# cuvinte prea comune ca să conteze la ranking (RO + EN)
+STOPWORDS = {
+    "a", "al", "ai", "ale", "am", "an", "and", "are", "as", "at", "au", "be", "ca", "care",
+    "ce", "cu", "da", "de", "din", "do", "e", "este", "for", "from", "i", "imi", "in",
+    "is", "it", "la", "me", "mi", "my", "ne", "nu", "o", "of", "on", "or", "pe", "pentru",
+    "sa", "se", "si", "some", "te", "the", "there", "to", "un", "una", "unde", "unei",
+    "unui", "vreau", "what", "where", "which", "with", "you",
+}
+
+# stemming naiv: păstrăm primele STEM_LEN litere ("cafenele" / "cafenea" -> "cafen")
+STEM_LEN = 5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def search_terms(text: str, normalize: Callable[[str], str]) -> List[str]:
+    """Termenii de căutare dintr-un text: normalizat, fără stopwords, trunchiați la STEM_LEN."""
+    return [
+        token[:STEM_LEN]
+        for token in _TOKEN_RE.findall(normalize(text))
+        if token not in STOPWORDS
+    ]
+
+
+def place_search_text(place: Dict[str, Any], city: str) -> str:
+    return " ".join(
+        [
+            place.get("name", "") or "",
+            place.get("short_description", "") or "",
+            " ".join(place.get("categories", []) or []),
+            city,
+        ]
+    )
+
+
+class BM25Index:
+    """
+    Index BM25 peste o listă de locații (documentul i = places[i]).
+
+    search() întoarce (poziție, scor) pentru cele mai bune k locații,
+    opțional doar dintr-un set de poziții candidate (ex: filtrate pe oraș).
+    """
+
+    def __init__(
+        self,
+        places: List[Dict[str, Any]],
+        normalize: Callable[[str], str],
+        city_of: Callable[[Dict[str, Any]], str],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.normalize = normalize
+        self.city_of = city_of
+        self.k1 = k1
+        self.b = b
+        self.size = len(places)
+
+        # termen -> [(poziție, frecvență)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_len: List[int] = [0] * self.size
+
+        for pos, place in enumerate(places):
+            self._add_document(pos, place)
+        self._finish()
+
+    def _add_document(self, pos: int, place: Dict[str, Any]) -> None:
+        counts: Dict[str, int] = {}
+        for term in search_terms(place_search_text(place, self.city_of(place)), self.normalize):
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, []).append((pos, tf))
+        self.doc_len[pos] = sum(counts.values())
+
+    def _finish(self) -> None:
+        self.avg_len = (sum(self.doc_len) / self.size) if self.size else 0.0
+        self.idf = {
+            term: math.log(1 + (self.size - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def updated(self, places: List[Dict[str, Any]], old_positions: Sequence[int]) -> "BM25Index":
+        """
+        Index pentru o versiune nouă a dataset-ului. old_positions[i] = poziția
+        locației i în dataset-ul vechi, dacă e neschimbată (altfel -1): doar
+        locațiile noi / modificate sunt tokenizate, restul își mută postările.
+        """
+        index = BM25Index([], self.normalize, self.city_of, k1=self.k1, b=self.b)
+        index.size = len(places)
+        index.doc_len = [0] * index.size
+
+        new_of_old = [-1] * self.size
+        for pos, old in enumerate(old_positions):
+            if old >= 0:
+                new_of_old[old] = pos
+                index.doc_len[pos] = self.doc_len[old]
+
+        for term, plist in self.postings.items():
+            kept = [(new_of_old[old], tf) for old, tf in plist if new_of_old[old] >= 0]
+            if kept:
+                index.postings[term] = kept
+
+        for pos, old in enumerate(old_positions):
+            if old < 0:
+                index._add_document(pos, places[pos])
+        index._finish()
+        return index
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        candidates: Optional[Collection[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        k1 = self.k1
+        b = self.b
+        avg_len = self.avg_len or 1.0
+
+        for term in set(search_terms(query, self.normalize)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for pos, tf in plist:
+                if candidates is not None and pos not in candidates:
+                    continue
+                norm = k1 * (1 - b + b * self.doc_len[pos] / avg_len)
+                scores[pos] = scores.get(pos, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
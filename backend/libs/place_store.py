@@ -0,0 +1,550 @@
+"""
+PlaceStore: locațiile ținute pe coloane (array-uri NumPy), nu ca listă de dict-uri.
+
+- rating: float32, lat / long: float64 – coordonatele ies exact ca în JSON (NaN = lipsă);
+- categorii: bitmask uint64 per locație (primele 64 de categorii) + lista completă
+  de id-uri de categorie; numele categoriilor sunt internate o singură dată;
+- oraș: id int32 într-o listă de orașe internate (-1 = fără oraș);
+- textele (name, address, image_url, short_description): blob UTF-8 + offset-uri.
+
+store[i] întoarce un PlaceView (cu __slots__, fără dict propriu) care se
+comportă ca dict-ul din JSON: p["name"], p.get("categories", []), dict(p), ==.
+Filtrele pe rating / categorii / oraș folosesc posting lists (categorie /
+oraș -> poziții sortate) și bitmask-ul de categorii, vectorizat.
+
+Aceleași coloane sunt scrise ca atare în snapshot-ul binar (places_snapshot.py).
+"""
+import hashlib
+import json
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# câmpurile cu coloană proprie; restul cheilor unei locații merg în "extra" (JSON)
+TEXT_FIELDS = ("name", "address", "image_url", "short_description")
+
+# biți în coloana "present": ce câmpuri avea locația în JSON
+_HAS = {"name": 1, "address": 2, "coordinates": 4, "image_url": 8,
+        "short_description": 16, "rating": 32, "id": 64, "categories": 128}
+
+# ordinea cheilor din locatii_cu_categorii.json
+_KEY_ORDER = ("name", "address", "coordinates", "image_url", "short_description",
+              "rating", "id", "categories")
+
+# categorii cu bit în bitmask (uint64); celelalte au doar lista de id-uri
+MASK_BITS = 64
+
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+# id-urile trebuie să încapă în coloana int64; altfel merg în "extra", ca valoare JSON
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _sorted_contains(haystack: np.ndarray, needles: np.ndarray) -> np.ndarray:
+    """Mască: care din `needles` apar în `haystack` (sortat) – căutare binară, O(k log n)."""
+    if haystack.size == 0:
+        return np.zeros(needles.shape, dtype=bool)
+    idx = np.searchsorted(haystack, needles)
+    idx[idx == haystack.size] = 0
+    return haystack[idx] == needles
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _float(value: np.floating) -> float:
+    # cea mai scurtă reprezentare float32 -> 4.8 rămâne 4.8, nu 4.800000190734863
+    return float(str(value))
+
+
+def _offsets(lengths: Iterable[int], count: int) -> np.ndarray:
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(lengths, dtype=np.int64, count=count), out=offsets[1:])
+    return offsets
+
+
+def _postings(groups: np.ndarray, positions: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index grup -> poziții: (offsets, postings), cu grupul g în
+    postings[offsets[g]:offsets[g + 1]]. `positions` vin crescător, deci
+    sortarea stabilă le păstrează sortate în fiecare grup.
+    """
+    order = np.argsort(groups, kind="stable")
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(groups, minlength=count), out=offsets[1:])
+    return offsets, positions[order].astype(np.int32)
+
+
+# ------------- Digest per locație (diff între versiuni ale dataset-ului) -------------
+
+_HASH_MUL = np.uint64(0x100000001B3)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """Amestecă biții (finalizer splitmix64), vectorizat pe uint64."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _segment_hashes(values: np.ndarray, offsets: np.ndarray, chunk: int = 1 << 20) -> np.ndarray:
+    """
+    Hash polinomial (uint64) pentru fiecare segment values[offsets[i]:offsets[i + 1]].
+    Lucrează pe bucăți de ~`chunk` elemente, ca temporarele uint64 să nu ajungă
+    de 8 ori cât tot blob-ul de text.
+    """
+    count = len(offsets) - 1
+    lengths = np.diff(offsets)
+    out = np.zeros(count, dtype=np.uint64)
+    if count == 0 or not lengths.any():
+        return _mix(out ^ lengths.astype(np.uint64))
+    powers = np.cumprod(np.full(int(lengths.max()), _HASH_MUL, dtype=np.uint64)) // _HASH_MUL
+
+    start = 0
+    while start < count:
+        end = max(start + 1, int(np.searchsorted(offsets, offsets[start] + chunk, side="right")) - 1)
+        end = min(end, count)
+        base, seg = offsets[start], lengths[start:end]
+        total = int(offsets[end] - base)
+        if total:
+            # poziția fiecărui element în segmentul lui -> puterea multiplicatorului
+            within = np.arange(total, dtype=np.int64) - np.repeat(offsets[start:end] - base, seg)
+            terms = (values[base : offsets[end]].astype(np.uint64) + np.uint64(1)) * powers[within]
+            nonempty = seg > 0
+            out[start:end][nonempty] = np.add.reduceat(terms, (offsets[start:end] - base)[nonempty])
+        start = end
+    return _mix(out ^ lengths.astype(np.uint64))
+
+
+def _name_hashes(names: List[str]) -> np.ndarray:
+    """Hash stabil (uint64) per string internat – id-urile diferă între store-uri, numele nu."""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little") for name in names],
+        dtype=np.uint64,
+    )
+
+
+def build_columns(
+    places: Iterable[Dict[str, Any]],
+    city_of: Callable[[Dict[str, Any]], str],
+) -> Tuple[Dict[str, np.ndarray], List[str], List[str]]:
+    """
+    (coloane, categorii, orașe) pentru locațiile (dict-uri din JSON) din `places`.
+
+    `places` poate fi orice iterabil (ex: un generator care citește fișierul pe
+    bucăți): fiecare locație e consumată o dată și acumulată direct în buffere
+    compacte (array / bytearray), nu în liste de obiecte Python – memoria
+    rămâne cam cât coloanele finale.
+    """
+    ids = array("q")
+    rating = array("f")
+    lat = array("d")
+    lon = array("d")
+    present = array("B")
+    category_mask = array("Q")
+    city_id = array("i")
+    texts: Dict[str, bytearray] = {field: bytearray() for field in TEXT_FIELDS + ("extra",)}
+    text_lengths: Dict[str, array] = {field: array("q") for field in texts}
+    categories: Dict[str, int] = {}
+    cities: Dict[str, int] = {}
+    # categoriile fiecărei locații, în ordinea din JSON
+    place_cats = array("i")
+    place_cat_counts = array("q")
+    # (categorie, poziție) fără duplicate – pentru posting lists
+    post_cat = array("q")
+    post_pos = array("q")
+
+    def add_text(field: str, data: bytes) -> None:
+        texts[field] += data
+        text_lengths[field].append(len(data))
+
+    nan = float("nan")
+    for pos, place in enumerate(places):
+        flags = 0
+        extra = {k: v for k, v in place.items() if k not in _HAS}
+
+        for field in TEXT_FIELDS:
+            value = place.get(field)
+            if isinstance(value, str):
+                flags |= _HAS[field]
+                add_text(field, value.encode("utf-8"))
+            else:
+                add_text(field, b"")
+                if field in place:
+                    extra[field] = value
+
+        r = _number(place.get("rating"))
+        if r is not None:
+            flags |= _HAS["rating"]
+        elif "rating" in place:
+            extra["rating"] = place["rating"]
+        rating.append(nan if r is None else r)
+
+        pid = place.get("id")
+        if isinstance(pid, int) and not isinstance(pid, bool) and _INT64_MIN <= pid <= _INT64_MAX:
+            flags |= _HAS["id"]
+            ids.append(pid)
+        else:
+            ids.append(0)
+            if "id" in place:
+                extra["id"] = pid
+
+        coords = place.get("coordinates")
+        if (
+            isinstance(coords, dict)
+            and set(coords) == {"lat", "long"}
+            and _number(coords["lat"]) is not None
+            and _number(coords["long"]) is not None
+        ):
+            flags |= _HAS["coordinates"]
+            lat.append(coords["lat"])
+            lon.append(coords["long"])
+        else:
+            lat.append(nan)
+            lon.append(nan)
+            if "coordinates" in place:
+                extra["coordinates"] = coords
+
+        cats = place.get("categories")
+        mask = 0
+        if isinstance(cats, list) and all(isinstance(c, str) for c in cats):
+            flags |= _HAS["categories"]
+            cids = [categories.setdefault(cat, len(categories)) for cat in cats]
+            for cid in cids:
+                if cid < MASK_BITS:
+                    mask |= 1 << cid
+            place_cats.extend(cids)
+            place_cat_counts.append(len(cids))
+            for cid in dict.fromkeys(cids):
+                post_cat.append(cid)
+                post_pos.append(pos)
+        else:
+            place_cat_counts.append(0)
+            if "categories" in place:
+                extra["categories"] = cats
+        category_mask.append(mask)
+
+        city = city_of(place)
+        city_id.append(cities.setdefault(city, len(cities)) if city else -1)
+
+        present.append(flags)
+        add_text("extra", json.dumps(extra, ensure_ascii=False).encode("utf-8") if extra else b"")
+
+    n = len(present)
+    # np.frombuffer: coloanele folosesc direct memoria buffer-elor, fără copie
+    columns: Dict[str, np.ndarray] = {
+        "id": np.frombuffer(ids, dtype=np.int64),
+        "rating": np.frombuffer(rating, dtype=np.float32),
+        "lat": np.frombuffer(lat, dtype=np.float64),
+        "long": np.frombuffer(lon, dtype=np.float64),
+        "present": np.frombuffer(present, dtype=np.uint8),
+        "category_mask": np.frombuffer(category_mask, dtype=np.uint64),
+        "city_id": np.frombuffer(city_id, dtype=np.int32),
+        "place_cat_offsets": _offsets(place_cat_counts, n),
+        "place_cats": np.frombuffer(place_cats, dtype=np.int32),
+    }
+
+    columns["cat_offsets"], columns["cat_postings"] = _postings(
+        np.frombuffer(post_cat, dtype=np.int64), np.frombuffer(post_pos, dtype=np.int64), len(categories)
+    )
+    with_city = np.flatnonzero(columns["city_id"] >= 0)
+    columns["city_offsets"], columns["city_postings"] = _postings(
+        columns["city_id"][with_city], with_city, len(cities)
+    )
+
+    for field, data in texts.items():
+        columns[f"{field}_offsets"] = _offsets(text_lengths[field], n)
+        columns[f"{field}_data"] = np.frombuffer(data, dtype=np.uint8)
+
+    return columns, list(categories), list(cities)
+
+
+class PlaceView(Mapping):
+    """O locație din PlaceStore, read-only, cu aceeași interfață ca dict-ul din JSON."""
+
+    __slots__ = ("_store", "_pos")
+
+    def __init__(self, store: "PlaceStore", pos: int):
+        self._store = store
+        self._pos = pos
+
+    @property
+    def position(self) -> int:
+        """Poziția locației în store (0-based)."""
+        return self._pos
+
+    def __getitem__(self, key: str) -> Any:
+        return self._store.field(self._pos, key)
+
+    def __iter__(self):
+        return iter(self._store.keys(self._pos))
+
+    def __len__(self) -> int:
+        return len(self._store.keys(self._pos))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._store.keys(self._pos)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._store.place_dict(self._pos)
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class PlaceStore(Sequence):
+    """
+    Dataset-ul de locații, pe coloane. Se comportă ca lista de locații de
+    dinainte (len, iterare, store[i], store[a:b]); are `fingerprint` (sha1-ul
+    JSON-ului sursă), ca versiune a dataset-ului.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        categories: List[str],
+        cities: List[str],
+        fingerprint: str = "",
+        source: str = "json",
+    ):
+        self.columns = columns
+        self.categories = categories
+        self.cities = cities
+        self.fingerprint = fingerprint
+        # "json" sau "snapshot" – de unde au fost încărcate coloanele
+        self.source = source
+        self.category_ids = {name: i for i, name in enumerate(categories)}
+        self.city_ids = {name: i for i, name in enumerate(cities)}
+
+        self.ids = columns["id"]
+        self.rating = columns["rating"]
+        self.lat = columns["lat"]
+        self.long = columns["long"]
+        self.category_mask = columns["category_mask"]
+        self.city_id = columns["city_id"]
+        self._present = columns["present"]
+        self._count = len(self._present)
+        # frozenset(categorii) -> poziții, pentru grupurile cerute deja
+        self._groups: Dict[frozenset, np.ndarray] = {}
+
+    @classmethod
+    def from_places(
+        cls,
+        places: Iterable[Dict[str, Any]],
+        city_of: Callable[[Dict[str, Any]], str],
+        fingerprint: str = "",
+    ) -> "PlaceStore":
+        columns, categories, cities = build_columns(places, city_of)
+        return cls(columns, categories, cities, fingerprint=fingerprint)
+
+    # --- Sequence ---
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PlaceView(self, pos) for pos in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("place index out of range")
+        return PlaceView(self, index)
+
+    def __iter__(self):
+        for pos in range(self._count):
+            yield PlaceView(self, pos)
+
+    def views(self, positions: Iterable[int]) -> List[PlaceView]:
+        return [PlaceView(self, int(pos)) for pos in positions]
+
+    # --- câmpuri ---
+
+    def keys(self, pos: int) -> Tuple[str, ...]:
+        flags = int(self._present[pos])
+        keys = tuple(key for key in _KEY_ORDER if flags & _HAS[key])
+        extra = self._extra(pos)
+        if extra:
+            keys += tuple(key for key in extra if key not in keys)
+        return keys
+
+    def _text(self, field: str, pos: int) -> str:
+        offsets = self.columns[f"{field}_offsets"]
+        return self.columns[f"{field}_data"][offsets[pos] : offsets[pos + 1]].tobytes().decode("utf-8")
+
+    def _extra(self, pos: int) -> Optional[Dict[str, Any]]:
+        offsets = self.columns["extra_offsets"]
+        if offsets[pos] == offsets[pos + 1]:
+            return None
+        return json.loads(self._text("extra", pos))
+
+    def field(self, pos: int, key: str) -> Any:
+        """Valoarea câmpului `key` pentru locația `pos` (KeyError dacă lipsește)."""
+        flags = int(self._present[pos])
+        bit = _HAS.get(key)
+
+        if bit is not None and flags & bit:
+            if key in TEXT_FIELDS:
+                return self._text(key, pos)
+            if key == "rating":
+                return _float(self.rating[pos])
+            if key == "id":
+                return int(self.ids[pos])
+            if key == "coordinates":
+                return {"lat": float(self.lat[pos]), "long": float(self.long[pos])}
+            if key == "categories":
+                return self.categories_of(pos)
+
+        extra = self._extra(pos)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def place_dict(self, pos: int) -> Dict[str, Any]:
+        """Locația `pos` ca dict simplu (aceleași chei și valori ca în JSON)."""
+        return {key: self.field(pos, key) for key in self.keys(pos)}
+
+    def categories_of(self, pos: int) -> List[str]:
+        offsets = self.columns["place_cat_offsets"]
+        return [self.categories[c] for c in self.columns["place_cats"][offsets[pos] : offsets[pos + 1]]]
+
+    def city_of(self, pos: int) -> str:
+        cid = int(self.city_id[pos])
+        return self.cities[cid] if cid >= 0 else ""
+
+    # --- index-uri: categorie / oraș -> poziții ---
+    #
+    # Posting lists construite o dată, la load (sau citite din snapshot): pozițiile
+    # locațiilor din fiecare categorie / oraș, sortate crescător. Grupurile de
+    # categorii (ex: RESTAURANT_CATEGORIES) au un bitmask peste category_mask.
+
+    def category_positions(self, category: str) -> np.ndarray:
+        """Pozițiile (sortate) locațiilor dintr-o categorie."""
+        cid = self.category_ids.get(category)
+        if cid is None:
+            return _EMPTY
+        offsets = self.columns["cat_offsets"]
+        return self.columns["cat_postings"][offsets[cid] : offsets[cid + 1]]
+
+    def city_positions(self, city_id: int) -> np.ndarray:
+        """Pozițiile (sortate) locațiilor din orașul cu id-ul dat."""
+        offsets = self.columns["city_offsets"]
+        return self.columns["city_postings"][offsets[city_id] : offsets[city_id + 1]]
+
+    def category_bits(self, categories: Collection[str]) -> int:
+        """Bitmask-ul pentru un grup de categorii (doar cele cu bit)."""
+        mask = 0
+        for name in categories:
+            cid = self.category_ids.get(name)
+            if cid is not None and cid < MASK_BITS:
+                mask |= 1 << cid
+        return mask
+
+    def group_positions(self, categories: Collection[str]) -> np.ndarray:
+        """Pozițiile (sortate) locațiilor din oricare categorie a grupului; calculate o dată per grup."""
+        key = frozenset(categories)
+        cached = self._groups.get(key)
+        if cached is None:
+            lists = [self.category_positions(name) for name in key]
+            lists = [plist for plist in lists if plist.size]
+            if not lists:
+                cached = _EMPTY
+            elif len(lists) == 1:
+                cached = lists[0]
+            else:
+                cached = np.unique(np.concatenate(lists))
+            self._groups[key] = cached
+        return cached
+
+    def in_group(self, positions: np.ndarray, categories: Collection[str]) -> np.ndarray:
+        """Mască booleană: care din `positions` sunt în grup (AND pe bitmask, fără scan pe tot dataset-ul)."""
+        hit = (self.category_mask[positions] & np.uint64(self.category_bits(categories))) != 0
+        # categoriile de după MASK_BITS nu au bit -> căutare în posting list
+        for name in categories:
+            cid = self.category_ids.get(name)
+            if cid is not None and cid >= MASK_BITS:
+                hit |= _sorted_contains(self.category_positions(name), positions)
+        return hit
+
+    def city_ids_for(self, cities: Collection[str]) -> List[int]:
+        """Id-urile orașelor cu aceste nume (comparație fără majuscule / spații)."""
+        wanted = {c.strip().lower() for c in cities}
+        return [cid for cid, name in enumerate(self.cities) if name.strip().lower() in wanted]
+
+    def filter(
+        self,
+        min_rating: Optional[float] = None,
+        categories: Optional[Collection[str]] = None,
+        cities: Optional[Collection[str]] = None,
+        within: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Pozițiile (crescător) locațiilor care trec de filtre: rating >= min_rating,
+        oricare din categorii, oricare din orașe (nume exacte din adrese), doar
+        dintre pozițiile `within` (sortate, ex: din CityIndex) dacă e dat.
+
+        Pornim de la cea mai mică listă de candidați (posting list-ul orașului,
+        altfel al grupului de categorii) și aplicăm restul filtrelor doar pe ea.
+        """
+        positions: Optional[np.ndarray] = within
+
+        if cities is not None:
+            lists = [self.city_positions(cid) for cid in self.city_ids_for(cities)]
+            if not lists:
+                return _EMPTY
+            in_cities = lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+            positions = in_cities if positions is None else positions[_sorted_contains(in_cities, positions)]
+
+        if categories is not None:
+            if positions is None:
+                positions = self.group_positions(categories)
+            else:
+                positions = positions[self.in_group(positions, categories)]
+
+        if positions is None:
+            positions = np.arange(self._count, dtype=np.int32)
+
+        if min_rating is not None:
+            positions = positions[self.rating[positions] >= np.float32(min_rating)]  # NaN -> False
+
+        return positions
+
+    def row_digests(self) -> np.ndarray:
+        """
+        Un hash (uint64) per locație, calculat din toate câmpurile ei: două locații
+        cu același conținut au același digest, și în store-uri diferite. Folosit
+        la reload, ca să găsim ce s-a schimbat fără să comparăm dict-uri.
+        """
+        cols = self.columns
+        with np.errstate(over="ignore"):
+            parts = [
+                self.ids.view(np.uint64),
+                self._present.astype(np.uint64),
+                self.rating.view(np.uint32).astype(np.uint64),
+                self.lat.view(np.uint64),
+                self.long.view(np.uint64),
+                _segment_hashes(_name_hashes(self.categories)[cols["place_cats"]], cols["place_cat_offsets"]),
+                np.where(self.city_id >= 0, np.append(_name_hashes(self.cities), np.uint64(0))[self.city_id], 0)
+                .astype(np.uint64),
+            ]
+            parts += [
+                _segment_hashes(cols[f"{field}_data"], cols[f"{field}_offsets"]) for field in TEXT_FIELDS + ("extra",)
+            ]
+            digest = np.zeros(self._count, dtype=np.uint64)
+            for part in parts:
+                digest = _mix(digest * _HASH_MUL + part)
+        return digest
+
+    def ratings_or(self, default: float = 0.0, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rating-urile ca float32 (doar ale pozițiilor `positions`, dacă sunt date), cu `default` în loc de lipsă."""
+        rating = self.rating if positions is None else self.rating[positions]
+        return np.nan_to_num(rating, nan=default)
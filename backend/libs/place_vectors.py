@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+"""
+Index vectorial pentru locații (similaritate semantică / "vibe").
+
+- embedder implicit: HashingEmbedder – local, fără model, fără rețea
+  (cuvinte + trigrame de caractere, hash-uite într-un vector float32);
+- opțional: ProviderEmbedder – embeddings de la provider (client.embeddings).
+
+Vectorii locațiilor stau într-o matrice float32 salvată ca .npy și deschisă
+cu mmap, deci încărcarea nu citește tot fișierul în RAM. Matricea e stocată
+pe coloane – (dim, n), un rând per dimensiune – ca un query rar (hashing)
+să citească doar rândurile dimensiunilor lui. Căutarea top-k e un produs
+vector-matrice în NumPy.
+
+Peste VECTOR_IVF_MIN locații, căutarea nu mai parcurge toată matricea: la
+construire (ingest / load / reload), locațiile sunt grupate cu k-means sferic
+în ~sqrt(n) grupuri, iar coloanele sunt stocate grup după grup. Un query e
+comparat întâi cu centrele, apoi doar cu locațiile din cele mai apropiate
+grupuri (~VECTOR_IVF_PROBE grupuri, adică 2-3% din matrice, citite ca blocuri
+contigue). E o preselecție aproximativă – rezultatul intră oricum în RRF cu
+BM25.
+
+Ingest (o dată, după ce se schimbă dataset-ul):
+
+  python place_vectors.py build --out places.vec.npy
+"""
+import argparse
+import json
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# sub atâtea locații (sau candidați) scanarea completă e oricum sub o milisecundă
+VECTOR_IVF_MIN = int(os.getenv("VECTOR_IVF_MIN", "20000"))
+# câte grupuri (de mărime medie) sunt parcurse per query
+VECTOR_IVF_PROBE = int(os.getenv("VECTOR_IVF_PROBE", "8"))
+# k-means e antrenat pe un eșantion; restul locațiilor doar sunt atribuite centrelor
+_KMEANS_SAMPLE = 16384
+_KMEANS_ITERATIONS = 8
+_CHUNK = 16384
+
+
+# ------------- Embedders -------------
+
+
+class HashingEmbedder:
+    """
+    Vectorizer local: cuvinte + trigrame de caractere, hash (crc32) în `dim`
+    dimensiuni, cu semn, tf logaritmic, normalizat L2.
+    """
+
+    # query-urile rare (puține dimensiuni nenule) folosesc doar acele rânduri din matrice
+    sparse = True
+
+    def __init__(self, normalize: Callable[[str], str], dim: int = 256):
+        self.normalize = normalize
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+        # același cuvânt apare de mii de ori la ingest -> hash-urile lui se calculează o dată
+        self._word_slots = lru_cache(maxsize=1 << 18)(self._compute_word_slots)
+
+    def _compute_word_slots(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(dimensiuni, semne) pentru cuvânt + trigramele lui de caractere."""
+        padded = f" {word} "
+        features = [word] + [padded[i : i + 3] for i in range(len(padded) - 2)]
+        hashes = [zlib.crc32(f.encode("utf-8")) for f in features]
+        cols = np.array([h % self.dim for h in hashes], dtype=np.int64)
+        signs = np.array([1.0 if (h >> 31) & 1 else -1.0 for h in hashes], dtype=np.float32)
+        return cols, signs
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _TOKEN_RE.findall(self.normalize(text))
+            if not words:
+                continue
+            slots = [self._word_slots(w) for w in words]
+            cols = np.concatenate([c for c, _ in slots])
+            signs = np.concatenate([s for _, s in slots])
+            out[row] = np.bincount(cols, weights=signs, minlength=self.dim)
+
+        # tf logaritmic (cu semn), apoi normalizare L2
+        np.copysign(np.log1p(np.abs(out)), out, out=out)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        out /= norms
+        return out
+
+
+class ProviderEmbedder:
+    """Embeddings de la provider (API compatibil OpenAI: client.embeddings.create)."""
+
+    sparse = False
+
+    def __init__(self, client: Any, model: str, batch_size: int = 128):
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.name = f"provider:{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.model,
+                input=texts[start : start + self.batch_size],
+            )
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        out = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+# ------------- Index -------------
+
+
+def place_embedding_text(place: Dict[str, Any], city: str) -> str:
+    return " ".join(
+        [
+            place.get("name", "") or "",
+            place.get("short_description", "") or "",
+            " ".join(place.get("categories", []) or []),
+            city,
+        ]
+    )
+
+
+class VectorClusters:
+    """
+    Partiția locațiilor în grupuri (k-means sferic). Matricea index-ului e
+    stocată grup după grup: slot-ul j conține locația members[j], iar grupul c
+    ocupă slot-urile offsets[c]:offsets[c + 1].
+    """
+
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray):
+        self.centroids = centroids
+        self.assign = assign
+        self.sizes = np.bincount(assign, minlength=len(centroids))
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)))
+        self.members = np.argsort(assign, kind="stable")
+        # locație -> slot
+        self.slot = np.empty_like(self.members)
+        self.slot[self.members] = np.arange(len(self.members))
+
+    @classmethod
+    def fit(cls, columns: np.ndarray, centroids: Optional[np.ndarray] = None, seed: int = 7) -> "VectorClusters":
+        """Grupurile pentru `columns` (în ordinea locațiilor); cu `centroids` date, doar atribuirea."""
+        n = columns.shape[1]
+        if centroids is None:
+            centroids = cls._train(columns, max(1, int(round(np.sqrt(n)))), np.random.default_rng(seed))
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, _CHUNK):
+            chunk = np.asarray(columns[:, start : start + _CHUNK])
+            assign[start : start + chunk.shape[1]] = (centroids @ chunk).argmax(axis=0)
+        return cls(centroids, assign)
+
+    @staticmethod
+    def _train(columns: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+        n = columns.shape[1]
+        sample_idx = np.sort(rng.choice(n, size=min(n, max(_KMEANS_SAMPLE, count)), replace=False))
+        sample = np.ascontiguousarray(np.asarray(columns[:, sample_idx]).T)
+        centroids = sample[rng.choice(len(sample), size=count, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assign = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            # un grup rămas gol își păstrează centrul
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        return centroids
+
+    def probe(self, q: np.ndarray, k: int, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Grupurile de parcurs pentru `q`, de la cel mai apropiat: cât să acopere
+        cam VECTOR_IVF_PROBE grupuri medii din locațiile eligibile (`positions`,
+        implicit toate), dar măcar k locații.
+        """
+        order = np.argsort(-(self.centroids @ q))
+        if positions is None:
+            counts, eligible = self.sizes[order], len(self.assign)
+        else:
+            counts = np.bincount(self.assign[positions], minlength=len(self.centroids))[order]
+            eligible = positions.size
+        target = max(k, -(-eligible * VECTOR_IVF_PROBE // len(self.centroids)))
+        return order[: int(np.searchsorted(np.cumsum(counts), target)) + 1]
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, assign=self.assign)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorClusters":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assign"])
+
+
+class PlaceVectorIndex:
+    """
+    Matrice (dim, n) de vectori normalizați, una per locație. Fără grupuri,
+    coloana i = places[i]; cu grupuri, coloanele sunt în ordinea grupurilor
+    (vezi VectorClusters).
+    """
+
+    def __init__(self, columns: np.ndarray, embedder: Any, clusters: Optional[VectorClusters] = None):
+        self.columns = columns
+        self.embedder = embedder
+        self.clusters = clusters
+
+    @classmethod
+    def from_columns(
+        cls, columns: np.ndarray, embedder: Any, centroids: Optional[np.ndarray] = None
+    ) -> "PlaceVectorIndex":
+        """Index din coloanele în ordinea locațiilor; peste VECTOR_IVF_MIN le grupează (acum, nu la primul query)."""
+        if columns.shape[1] < VECTOR_IVF_MIN:
+            return cls(columns, embedder)
+        clusters = VectorClusters.fit(columns, centroids)
+        return cls(np.ascontiguousarray(np.take(columns, clusters.members, axis=1)), embedder, clusters)
+
+    @classmethod
+    def build(
+        cls,
+        places: List[Dict[str, Any]],
+        embedder: Any,
+        city_of: Callable[[Dict[str, Any]], str],
+        path: Optional[str] = None,
+        fingerprint: str = "",
+        batch_size: int = 4096,
+    ) -> "PlaceVectorIndex":
+        """
+        Calculează vectorii locațiilor. Cu `path`, îi scrie direct într-un .npy
+        (plus un .json cu metadatele și, peste VECTOR_IVF_MIN, grupurile în
+        .ivf.npz) și întoarce index-ul deschis cu mmap.
+        """
+        texts = [place_embedding_text(p, city_of(p)) for p in places]
+        if not path:
+            dim = getattr(embedder, "dim", 1)
+            columns = embedder.embed(texts).T if texts else np.zeros((dim, 0), dtype=np.float32)
+            return cls.from_columns(np.ascontiguousarray(columns), embedder)
+
+        dim = embedder.embed(texts[:1]).shape[1] if texts else getattr(embedder, "dim", 1)
+        columns = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(dim, len(texts)))
+        for start in range(0, len(texts), batch_size):
+            columns[:, start : start + batch_size] = embedder.embed(texts[start : start + batch_size]).T
+        columns.flush()
+
+        clusters = None
+        if len(texts) >= VECTOR_IVF_MIN:
+            # rescriem matricea în ordinea grupurilor, pe bucăți
+            clusters = VectorClusters.fit(columns)
+            ordered = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=np.float32, shape=columns.shape)
+            for start in range(0, len(texts), _CHUNK):
+                members = clusters.members[start : start + _CHUNK]
+                ordered[:, start : start + members.size] = np.take(columns, members, axis=1)
+            ordered.flush()
+            del ordered
+            clusters.save(path + ".ivf.npz")
+        del columns
+        if clusters is not None:
+            os.replace(path + ".tmp", path)
+        elif os.path.exists(path + ".ivf.npz"):
+            os.remove(path + ".ivf.npz")  # de la un ingest anterior, acum vechi
+
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "embedder": embedder.name,
+                    "fingerprint": fingerprint,
+                    "count": len(texts),
+                    "dim": dim,
+                    "clusters": 0 if clusters is None else len(clusters.centroids),
+                },
+                f,
+            )
+        return cls.load(path, embedder)
+
+    def _place_columns(self, positions: np.ndarray) -> np.ndarray:
+        """Coloanele locațiilor `positions` (în ordinea dată), indiferent de ordinea de stocare."""
+        slots = positions if self.clusters is None else self.clusters.slot[positions]
+        return np.take(self.columns, slots, axis=1)
+
+    def updated(
+        self,
+        places: List[Dict[str, Any]],
+        old_positions: Sequence[int],
+        city_of: Callable[[Dict[str, Any]], str],
+    ) -> "PlaceVectorIndex":
+        """
+        Index pentru o versiune nouă a dataset-ului (în memorie): coloanele
+        locațiilor neschimbate (old_positions[i] >= 0) sunt copiate, doar
+        locațiile noi / modificate trec prin embedder. Centrele grupurilor
+        vechi sunt refolosite; doar atribuirea locațiilor e refăcută.
+        """
+        old_positions = np.asarray(old_positions, dtype=np.int64)
+        # un singur gather pe coloane; coloanele noi (-1 -> 0) sunt suprascrise mai jos
+        if self.columns.shape[1]:
+            columns = self._place_columns(np.maximum(old_positions, 0))
+        else:
+            columns = np.zeros((self.columns.shape[0], len(old_positions)), dtype=np.float32)
+
+        fresh = np.flatnonzero(old_positions < 0)
+        if fresh.size:
+            texts = [place_embedding_text(places[pos], city_of(places[pos])) for pos in fresh.tolist()]
+            columns[:, fresh] = self.embedder.embed(texts).T
+        centroids = self.clusters.centroids if self.clusters is not None else None
+        return PlaceVectorIndex.from_columns(columns, self.embedder, centroids)
+
+    @classmethod
+    def load(cls, path: str, embedder: Any) -> "PlaceVectorIndex":
+        columns = np.load(path, mmap_mode="r")
+        if os.path.exists(path + ".ivf.npz"):
+            return cls(columns, embedder, VectorClusters.load(path + ".ivf.npz"))
+        # matrice fără grupuri (ingest mai vechi / dataset mic)
+        return cls.from_columns(columns, embedder)
+
+    @staticmethod
+    def read_meta(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        candidates: Optional[Collection[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (poziție, similaritate cosinus), opțional doar din pozițiile
+        candidate (un array numpy e folosit direct, fără conversie).
+        """
+        if self.columns.shape[1] == 0 or k <= 0:
+            return []
+
+        q = self.embedder.embed([query])[0]
+        dims = slice(None)
+        if getattr(self.embedder, "sparse", False):
+            dims = np.flatnonzero(q)
+            if dims.size == 0:
+                return []
+        q_dims = q[dims]
+
+        positions = None
+        if candidates is not None:
+            positions = candidates if isinstance(candidates, np.ndarray) else np.fromiter(candidates, dtype=np.int64)
+            if positions.size == 0:
+                return []
+
+        eligible = self.columns.shape[1] if positions is None else positions.size
+        clusters = self.clusters
+        if clusters is not None and eligible >= VECTOR_IVF_MIN:
+            lists = clusters.probe(q, k, positions).tolist()
+            if positions is None:
+                # grupurile sunt blocuri contigue în matrice
+                ranges = [(int(clusters.offsets[c]), int(clusters.offsets[c + 1])) for c in lists]
+                positions = np.concatenate([clusters.members[a:b] for a, b in ranges])
+                block = np.concatenate([self.columns[dims, a:b] for a, b in ranges], axis=1)
+            else:
+                chosen = np.zeros(len(clusters.centroids), dtype=bool)
+                chosen[lists] = True
+                slots = np.sort(clusters.slot[positions[chosen[clusters.assign[positions]]]])
+                positions = clusters.members[slots]
+                block = self.columns[dims][:, slots] if isinstance(dims, slice) else self.columns[np.ix_(dims, slots)]
+            scores = q_dims @ block
+        elif positions is None:
+            # toată matricea, doar rândurile dimensiunilor nenule ale query-ului
+            scores = q_dims @ self.columns[dims]
+            if clusters is not None:
+                positions = clusters.members
+        else:
+            slots = positions if clusters is None else clusters.slot[positions]
+            block = self.columns[dims][:, slots] if isinstance(dims, slice) else self.columns[np.ix_(dims, slots)]
+            scores = q_dims @ block
+
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        if positions is not None:
+            return [(int(positions[i]), float(scores[i])) for i in top]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+# ------------- CLI (ingest) -------------
+
+
+def main() -> None:
+    from Chat_Bot_Groq_final_v2 import extract_city, load_config, load_places, make_embedder
+
+    parser = argparse.ArgumentParser(description="Construiește matricea de vectori pentru locații")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build")
+    build_p.add_argument("--out", default=None, help="fișier .npy (implicit PLACE_VECTORS_PATH)")
+    args = parser.parse_args()
+
+    config = load_config()
+    out = args.out or config.get("place_vectors_path")
+    if not out:
+        raise SystemExit("no output path: pass --out or set PLACE_VECTORS_PATH")
+
+    places = load_places(config["locations_path"])
+    embedder = make_embedder(config)
+    PlaceVectorIndex.build(
+        places,
+        embedder,
+        city_of=lambda p: extract_city(p.get("address", "")),
+        path=out,
+        fingerprint=getattr(places, "fingerprint", ""),
+    )
+    print(json.dumps({"path": os.path.abspath(out), "places": len(places), "embedder": embedder.name}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Reload la cald al dataset-ului de locații, pentru serverele long-running
+(FastAPI din main.py, workerii `chatBot.py --serve`).
+
+PlacesReloader ține dataset-ul curent și verifică periodic LOCATIONS_PATH
+(stat: mtime / dimensiune / inode; apoi sha1-ul conținutului, la load). La o
+schimbare, versiunea nouă e încărcată în fundal:
+
+- diff după `id` (+ digest-ul conținutului fiecărei locații): ce e nou,
+  modificat, șters;
+- index-urile scumpe per locație (BM25, vectori, textul de prompt și tokenii lui)
+  sunt actualizate doar pentru locațiile afectate, restul sunt refolosite;
+- index-urile ieftine (orașe, grid geo) sunt reconstruite din coloane;
+- abia apoi `current` trece pe noul dataset (o singură atribuire – atomic).
+
+Un request ia `reloader.current` o dată, la început, și lucrează până la
+final pe același obiect: index-urile derivate sunt legate de obiect (vezi
+`derived`), deci un request în lucru nu vede jumătate dintr-o versiune.
+Cache-ul de răspunsuri e cheiat pe fingerprint-ul dataset-ului, deci se
+invalidează singur; vibe cache-ul e pe conținutul locației și rămâne valid.
+
+Pentru un director de shard-uri (places_shards.py) se urmărește manifestul:
+versiunea nouă preia shard-urile încărcate care nu s-au schimbat, restul se
+încarcă iar la cerere.
+"""
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Chat_Bot_Groq_final_v2 import (
+    _address_city,
+    derived,
+    estimate_tokens,
+    forget_derived,
+    get_city_index,
+    get_geo_index,
+    get_mention_matcher,
+    get_name_index,
+    get_prompt_fragments,
+    get_prompt_token_estimates,
+    get_search_index,
+    get_store,
+    get_vector_index,
+    load_places,
+    peek_derived,
+    place_prompt_parts,
+)
+from place_store import _HAS, PlaceStore
+
+
+@dataclass
+class PlacesDiff:
+    """Diferența dintre două versiuni ale dataset-ului, după `id`."""
+
+    # pentru fiecare locație nouă: poziția ei în versiunea veche dacă e neschimbată, altfel -1
+    old_positions: np.ndarray
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+
+    @property
+    def reused(self) -> int:
+        return int((self.old_positions >= 0).sum())
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "reused": self.reused,
+        }
+
+
+def _first_by_id(store: PlaceStore) -> Tuple[np.ndarray, np.ndarray]:
+    """(id-uri sortate, poziția primei locații cu acel id) – doar locațiile care au id."""
+    with_id = np.flatnonzero(store.columns["present"] & _HAS["id"])
+    ids, first = np.unique(store.ids[with_id], return_index=True)
+    return ids, with_id[first]
+
+
+def diff_places(old: PlaceStore, new: PlaceStore) -> PlacesDiff:
+    """
+    Potrivește locațiile după `id`. O locație e refolosită doar dacă are același
+    id și același conținut (digest); locațiile fără id sau cu id duplicat sunt
+    tratate ca noi.
+    """
+    old_ids, old_pos = _first_by_id(old)
+    new_ids, new_pos = _first_by_id(new)
+
+    old_positions = np.full(len(new), -1, dtype=np.int64)
+    common, in_old, in_new = np.intersect1d(old_ids, new_ids, assume_unique=True, return_indices=True)
+    if common.size:
+        a, b = old_pos[in_old], new_pos[in_new]
+        same = old.row_digests()[a] == new.row_digests()[b]
+        old_positions[b[same]] = a[same]
+        changed = common[~same].tolist()
+    else:
+        changed = []
+
+    return PlacesDiff(
+        old_positions=old_positions,
+        added=np.setdiff1d(new_ids, old_ids, assume_unique=True).tolist(),
+        removed=np.setdiff1d(old_ids, new_ids, assume_unique=True).tolist(),
+        changed=changed,
+    )
+
+
+def carry_over(old: Any, new: Any, diff: PlacesDiff) -> None:
+    """
+    Pregătește index-urile per locație ale lui `new` pornind de la cele ale
+    lui `old`: doar intrările locațiilor noi / modificate sunt recalculate.
+    Index-urile pe care `old` nu le avea încă rămân lazy.
+    """
+    old_positions = diff.old_positions.tolist()
+
+    fragments = peek_derived(old, "prompt_fragments")
+    if fragments is not None:
+        derived(
+            new,
+            "prompt_fragments",
+            lambda: fragments.updated(old_positions, lambda pos: place_prompt_parts(new[pos])),
+        )
+
+    tokens = peek_derived(old, "prompt_tokens")
+    if tokens is not None:
+        new_fragments = get_prompt_fragments(new)
+        derived(
+            new,
+            "prompt_tokens",
+            lambda: [
+                tokens[o] if o >= 0 else estimate_tokens(new_fragments.text(pos, 1))
+                for pos, o in enumerate(old_positions)
+            ],
+        )
+
+    bm25 = peek_derived(old, "bm25")
+    if bm25 is not None:
+        derived(new, "bm25", lambda: bm25.updated(new, old_positions))
+
+    vectors = peek_derived(old, "vectors")
+    if vectors is not None:
+        derived(new, "vectors", lambda: vectors.updated(new, diff.old_positions, _address_city))
+
+
+def warm_indexes(places: Any) -> None:
+    """Construiește acum index-urile derivate, ca primul request pe noul dataset să nu plătească."""
+    get_store(places)
+    get_city_index(places)
+    get_mention_matcher(places)
+    get_name_index(places)
+    get_search_index(places)
+    get_prompt_fragments(places)
+    get_prompt_token_estimates(places)
+    get_vector_index(places)
+    get_geo_index(places)
+
+
+def _watched_path(path: str) -> str:
+    """Fișierul urmărit: LOCATIONS_PATH, sau manifestul dacă e un director de shard-uri."""
+    if os.path.isdir(path):
+        from places_shards import manifest_path
+
+        return manifest_path(path)
+    return path
+
+
+def _file_stat(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # os.replace schimbă inode-ul chiar dacă mtime / dimensiunea ies la fel
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class PlacesReloader:
+    """
+    Dataset-ul curent al unui server + reload în fundal când fișierul se schimbă.
+
+    `current` e mereu un dataset complet, cu index-urile gata; start() pornește
+    un thread daemon care verifică fișierul la fiecare `interval` secunde.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 2.0,
+        load: Callable[[str], Any] = load_places,
+    ):
+        self.path = path
+        self.interval = interval
+        self._load = load
+        self._watch = _watched_path(path)
+        self._stat = _file_stat(self._watch)
+        self.current = load(path)
+
+        # stat-ul văzut la verificarea anterioară: reîncărcăm doar după ce fișierul
+        # a rămas neschimbat o rundă (un writer non-atomic poate fi încă la mijloc)
+        self._pending: Optional[Tuple[int, int, int]] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # versiunea dinainte de `current`: index-urile ei rămân în memo până la
+        # următorul reload, pentru request-urile care încă lucrează pe ea
+        self._previous: Any = None
+
+        # warm(): index-urile fiecărei versiuni (și ale fiecărui shard) construite la load, nu în request
+        self._warm = False
+
+        self.reloads = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def warm(self) -> None:
+        """
+        Construiește acum index-urile derivate ale dataset-ului curent și, de
+        aici înainte, ale fiecărei versiuni noi și ale fiecărui shard încărcat.
+        Pentru serverele long-running; un proces one-shot rămâne lazy.
+        """
+        self._warm = True
+        self._prepare(self.current)
+
+    @staticmethod
+    def _prepare(places: Any) -> None:
+        if hasattr(places, "adopt"):
+            # shard-uri: fiecare își construiește index-urile la încărcare; acum doar cel implicit
+            places.on_load = warm_indexes
+            if places.default is not None:
+                places.shard(places.default)
+            # numele din manifest, pentru /vibe după nume (find_place)
+            places.name_index()
+        else:
+            warm_indexes(places)
+
+    # --- polling ---
+
+    def check(self) -> bool:
+        """Verifică fișierul o dată; True dacă a fost încărcată o versiune nouă."""
+        stat = _file_stat(self._watch)
+        if stat is None or stat == self._stat:
+            self._pending = None
+            return False
+        if stat != self._pending:
+            self._pending = stat
+            return False
+        return self.reload()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="places-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # păstrăm dataset-ul vechi; reîncercăm la următoarea schimbare a fișierului
+                self.last_error = str(e)
+                # pe stderr: la `chatBot.py --serve`, stdout e protocolul JSON-lines
+                print(f"[Warning] Reload-ul locațiilor din {self.path} a eșuat: {e}", file=sys.stderr)
+
+    # --- reload ---
+
+    def reload(self) -> bool:
+        """
+        Încarcă fișierul acum. Cât timp se construiesc index-urile, request-urile
+        folosesc în continuare versiunea veche; swap-ul e ultimul pas.
+        """
+        with self._reload_lock:
+            stat = _file_stat(self._watch)
+            # marcăm stat-ul ca văzut înainte de load: un fișier invalid nu e reîncercat în buclă
+            self._stat = stat
+            self._pending = None
+
+            t0 = time.perf_counter()
+            old = self.current
+            new = self._load(self.path)
+            if getattr(new, "fingerprint", None) and new.fingerprint == getattr(old, "fingerprint", None):
+                return False  # atins / copiat, același conținut
+
+            if hasattr(new, "adopt"):
+                # shard-uri: fără diff pe locații, shard-urile se încarcă la cerere
+                summary = new.adopt(old)
+                if self._warm:
+                    self._prepare(new)
+            else:
+                diff = diff_places(get_store(old), get_store(new))
+                carry_over(old, new, diff)
+                warm_indexes(new)
+                summary = diff.summary()
+
+            self.current = new
+            if self._previous is not None:
+                self._release(self._previous)
+            self._previous = old
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload = {
+                **summary,
+                "places": len(new),
+                "ms": round((time.perf_counter() - t0) * 1000, 1),
+                "at": time.time(),
+            }
+            return True
+
+    def _release(self, places: Any) -> None:
+        """Eliberează index-urile unei versiuni vechi (shard-urile preluate de `current` rămân)."""
+        if hasattr(places, "unload"):
+            places.unload(keep=self.current)
+        else:
+            forget_derived(places)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "path": self.path,
+            "places": len(self.current),
+            "fingerprint": getattr(self.current, "fingerprint", ""),
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+            "last_error": self.last_error,
+        }
+        if hasattr(self.current, "stats"):
+            stats["shards"] = self.current.stats()
+        return stats
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+"""
+Dataset-ul de locații împărțit pe orașe (shard-uri), încărcate la cerere.
+
+LOCATIONS_PATH poate fi un director:
+
+  <dir>/manifest.json         – lista shard-urilor: oraș, fișier, număr de
+                                locații, dimensiune, centru, sha1, plus id-ul
+                                și numele fiecărei locații (pentru find_place)
+  <dir>/<oras>.json           – locațiile unui oraș ({"locations": [...]})
+  <dir>/<oras>.json.snap      – opțional, snapshot binar (places_snapshot.py)
+
+La pornire se citește doar manifestul. Un shard e încărcat (load_places) la
+prima întrebare despre orașul lui. Peste PLACES_SHARDS_MAX_MB (socotit în
+dimensiunea JSON-ului shard-urilor încărcate), shard-urile folosite cel mai
+demult sunt scoase din memorie, cu tot cu index-urile lor derivate.
+Memoria unui proces depinde deci de orașele cerute, nu de tot dataset-ul.
+
+Shard-ul unei întrebări (shard_for_query):
+  1. orașul din mesaj (aliasuri generate din manifest, ca în city_index.py);
+  2. orașul din mesajele anterioare ale userului ("și cafenele?" după Cluj);
+  3. shard-ul cu centrul cel mai apropiat de locația userului;
+  4. shard-ul implicit din manifest (cel mai mare).
+O întrebare fără oraș vede deci un singur oraș, nu tot dataset-ul național;
+răspunsurile locale (liste, "top 3 cafenele") spun care e orașul, iar
+totalurile pe aplicație vin din numărătorile din manifest. O locație cerută
+după id sau nume (/vibe) e găsită prin id-urile și numele din manifest, fără
+să încărcăm shard-urile: doar al ei e încărcat.
+
+  python places_shards.py split --source locatii.json --out shards/
+  python places_shards.py split --source locatii.json --out shards/ --snapshots
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from city_index import build_city_aliases, build_city_matcher, first_city
+
+MANIFEST_NAME = "manifest.json"
+# crește versiunea la orice schimbare de format a manifestului
+MANIFEST_VERSION = 2
+
+# cât JSON de shard-uri ținem încărcat; RSS-ul real e de câteva ori mai mare (index-uri)
+SHARDS_MAX_MB = float(os.getenv("PLACES_SHARDS_MAX_MB", "256"))
+
+# câte mesaje anterioare ale userului caută orașul, pentru follow-up-uri
+HISTORY_LOOKBACK = 6
+
+
+def manifest_path(path: str) -> str:
+    return os.path.join(path, MANIFEST_NAME)
+
+
+@dataclass
+class ShardInfo:
+    key: str
+    city: str
+    file: str
+    count: int
+    bytes: int
+    sha1: str = ""
+    center: Optional[Tuple[float, float]] = None
+
+
+class ShardedPlaces(Sequence):
+    """
+    Locațiile dintr-un director de shard-uri. Ca secvență (len, places[i])
+    acoperă tot dataset-ul, în ordinea din manifest – places[i] încarcă doar
+    shard-ul locației i. Request-urile de chat lucrează pe un singur shard
+    (un PlaceStore obișnuit), ales de shard_for_query.
+    """
+
+    def __init__(self, path: str, max_mb: float = SHARDS_MAX_MB, load: Optional[Callable[..., Any]] = None):
+        self.path = path
+        self.max_bytes = int(max_mb * 2**20)
+        self._load = load
+
+        with open(manifest_path(path), "rb") as f:
+            raw = f.read()
+        manifest = json.loads(raw.decode("utf-8"))
+        if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported shard manifest: {manifest_path(path)}")
+
+        # manifestul conține sha1-ul fiecărui shard, deci e amprenta întregului dataset
+        self.fingerprint = hashlib.sha1(raw).hexdigest()
+        self.source = "shards"
+        self.shards: Dict[str, ShardInfo] = {}
+        # id-ul (0 = fără id) și numele fiecărei locații, în ordinea secvenței
+        ids: List[int] = []
+        self.names: List[str] = []
+        for entry in manifest.get("shards", []):
+            center = entry.get("center")
+            info = ShardInfo(
+                key=entry["key"],
+                city=entry.get("city", ""),
+                file=entry["file"],
+                count=int(entry.get("count", 0)),
+                bytes=int(entry.get("bytes", 0)),
+                sha1=entry.get("sha1", ""),
+                center=(float(center[0]), float(center[1])) if center else None,
+            )
+            self.shards[info.key] = info
+            ids += entry.get("ids", [])
+            self.names += entry.get("names", [])
+
+        keys = list(self.shards)
+        self._starts: List[int] = []
+        total = 0
+        for key in keys:
+            self._starts.append(total)
+            total += self.shards[key].count
+        self._count = total
+        self._order = keys
+        self.ids = np.array(ids, dtype=np.int64)
+        self._name_index = None
+
+        self.aliases = build_city_aliases([key for key in keys if key])
+        self.city_matcher = build_city_matcher(self.aliases)
+        default = manifest.get("default")
+        if default not in self.shards:
+            default = max(keys, key=lambda k: (bool(k), self.shards[k].count), default=None)
+        self.default = default
+
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+        # apelat cu fiecare shard proaspăt încărcat, înainte să fie vizibil (ex: warm_indexes)
+        self.on_load: Optional[Callable[[Any], None]] = None
+
+    # --- Sequence (tot dataset-ul) ---
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("place index out of range")
+        key = self.shard_of(index)
+        return self.shard(key)[index - self.offset(key)]
+
+    def __iter__(self):
+        for key in self._order:
+            yield from self.shard(key)
+
+    def cities(self) -> List[Tuple[str, int]]:
+        """(oraș, câte locații) din manifest, orașele cu cele mai multe locații întâi."""
+        shards = [info for info in self.shards.values() if info.key]
+        return [(info.city, info.count) for info in sorted(shards, key=lambda info: -info.count)]
+
+    def offset(self, key: str) -> int:
+        """Poziția (în tot dataset-ul) primei locații din shard-ul `key`."""
+        return self._starts[self._order.index(key)]
+
+    def shard_of(self, index: int) -> str:
+        """Cheia shard-ului locației de pe poziția `index` (în tot dataset-ul)."""
+        # shard-uri goale au același start; bisect_right alege ultimul, cel nevid
+        return self._order[bisect.bisect_right(self._starts, index) - 1]
+
+    # --- căutare în tot dataset-ul, din manifest ---
+
+    def id_positions(self, place_id: int) -> List[int]:
+        """Pozițiile (în tot dataset-ul) cu id-ul `place_id`, după manifest."""
+        return np.flatnonzero(self.ids == place_id).tolist()
+
+    def name_index(self):
+        """PlaceNameIndex peste numele din manifest (poziții în tot dataset-ul), construit o dată."""
+        index = self._name_index
+        if index is None:
+            from place_names import PlaceNameIndex
+
+            with self._lock:
+                if self._name_index is None:
+                    self._name_index = PlaceNameIndex(self.names)
+                index = self._name_index
+        return index
+
+    # --- rutare ---
+
+    def city_in_text(self, text: str) -> Optional[str]:
+        """Cheia shard-ului pentru orașul menționat în text, sau None."""
+        return first_city(self.city_matcher.find_text(text))
+
+    def nearest_shard(self, location: Tuple[float, float]) -> Optional[str]:
+        from geo_index import haversine_km
+
+        keys = [key for key in self._order if self.shards[key].center is not None]
+        if not keys:
+            return None
+        centers = np.array([self.shards[key].center for key in keys], dtype=np.float64)
+        km = haversine_km(location[0], location[1], centers[:, 0], centers[:, 1])
+        return keys[int(km.argmin())]
+
+    def route(
+        self,
+        user_input: str,
+        location: Optional[Tuple[float, float]] = None,
+        history: Sequence[Dict[str, str]] = (),
+    ) -> Optional[str]:
+        """Cheia shard-ului pentru o întrebare (ordinea din docstring-ul modulului)."""
+        key = self.city_in_text(user_input)
+        if key is None:
+            previous = [m["content"] for m in history[-HISTORY_LOOKBACK:] if m.get("role") == "user"]
+            for text in reversed(previous):
+                key = self.city_in_text(text)
+                if key is not None:
+                    break
+        if key is None and location is not None:
+            key = self.nearest_shard(location)
+        return key if key is not None else self.default
+
+    def shard_for_query(
+        self,
+        user_input: str,
+        location: Optional[Tuple[float, float]] = None,
+        history: Sequence[Dict[str, str]] = (),
+    ):
+        """PlaceStore-ul pe care lucrează întrebarea (încărcat acum, dacă e nevoie)."""
+        key = self.route(user_input, location, history)
+        if key is None:
+            from place_store import PlaceStore
+
+            return PlaceStore.from_places([], city_of=lambda place: "")  # manifest fără shard-uri
+        return self.shard(key)
+
+    # --- încărcare / evacuare ---
+
+    def shard(self, key: str):
+        """Shard-ul `key` ca PlaceStore; la nevoie îl încarcă și scoate din memorie shard-urile reci."""
+        with self._lock:
+            store = self._loaded.get(key)
+            if store is not None:
+                self._loaded.move_to_end(key)
+                return store
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # un singur load per shard, fără să blocăm request-urile pe alte orașe
+        with key_lock:
+            with self._lock:
+                store = self._loaded.get(key)
+                if store is not None:
+                    self._loaded.move_to_end(key)
+                    return store
+
+            from Chat_Bot_Groq_final_v2 import reserve_derived_datasets
+
+            info = self.shards[key]
+            load = self._load
+            if load is None:
+                from Chat_Bot_Groq_final_v2 import load_places as load
+            source = os.path.join(self.path, info.file)
+            store = load(source, snapshot_path=source + ".snap")
+            if info.sha1 and getattr(store, "fingerprint", "") not in ("", info.sha1):
+                print(f"[Warning] Shard-ul {source} nu corespunde manifestului (sha1).", file=sys.stderr)
+            if self.on_load is not None:
+                # loc în memo și pentru shard-ul ăsta, înainte ca index-urile lui să intre acolo
+                with self._lock:
+                    reserve_derived_datasets(len(self._loaded) + 5)
+                self.on_load(store)
+
+            with self._lock:
+                self._loaded[key] = store
+                self._loaded_bytes += info.bytes
+                self.loads += 1
+                evicted = self._evict(keep=key)
+                # fiecare shard încărcat își ține index-urile în memo-ul `derived`
+                reserve_derived_datasets(len(self._loaded) + 4)
+
+        self._forget(evicted)
+        return store
+
+    def _evict(self, keep: str) -> List[Any]:
+        """Scoate shard-urile cele mai vechi până sub limită (apelat cu _lock luat)."""
+        evicted = []
+        while self._loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+            key = next(iter(self._loaded))
+            if key == keep:
+                self._loaded.move_to_end(key)
+                continue
+            evicted.append(self._loaded.pop(key))
+            self._loaded_bytes -= self.shards[key].bytes
+            self.evictions += 1
+        return evicted
+
+    @staticmethod
+    def _forget(stores: Iterable[Any]) -> None:
+        from Chat_Bot_Groq_final_v2 import forget_derived
+
+        # un request în lucru pe un shard scos își păstrează obiectul; doar memo-ul e eliberat
+        for store in stores:
+            forget_derived(store)
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    # --- reload ---
+
+    def adopt(self, old: Any) -> Dict[str, Any]:
+        """
+        Preia de la versiunea veche shard-urile încărcate care nu s-au schimbat
+        (același fișier, același sha1) – reload-ul nu le mai citește.
+        """
+        kept = 0
+        evicted: List[Any] = []
+        if isinstance(old, ShardedPlaces):
+            with old._lock:
+                loaded = list(old._loaded.items())
+            with self._lock:
+                for key, store in loaded:
+                    info, old_info = self.shards.get(key), old.shards[key]
+                    if info is None or not info.sha1 or (info.file, info.sha1) != (old_info.file, old_info.sha1):
+                        continue
+                    self._loaded[key] = store
+                    self._loaded_bytes += info.bytes
+                    kept += 1
+                evicted = self._evict(keep="")
+        self._forget(evicted)
+        return {"shards": len(self.shards), "kept_loaded": kept}
+
+    def unload(self, keep: Any = None) -> None:
+        """Eliberează shard-urile încărcate, mai puțin cele preluate de `keep` (versiunea nouă)."""
+        shared = set()
+        if isinstance(keep, ShardedPlaces):
+            with keep._lock:
+                shared = {id(store) for store in keep._loaded.values()}
+        with self._lock:
+            stores = [store for store in self._loaded.values() if id(store) not in shared]
+            self._loaded.clear()
+            self._loaded_bytes = 0
+        self._forget(stores)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "shards": len(self.shards),
+                "loaded": list(self._loaded),
+                "loaded_mb": round(self._loaded_bytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+# ------------- Split (ingest) -------------
+
+
+def _shard_file(key: str) -> str:
+    return (re.sub(r"[^a-z0-9]+", "-", key).strip("-") or "_fara_oras") + ".json"
+
+
+def split_places(source: str, out_dir: str, snapshots: bool = False) -> Dict[str, Any]:
+    """
+    Împarte `source` pe orașe (cheile din CityIndex – "București" și
+    "Bucharest" ajung în același shard) și scrie manifestul, ultimul și
+    atomic: un server care urmărește directorul vede un set consistent.
+    """
+    from Chat_Bot_Groq_final_v2 import load_places
+    from city_index import CityIndex
+
+    store = load_places(source, snapshot_path="")
+    cities = CityIndex(store)
+    os.makedirs(out_dir, exist_ok=True)
+
+    groups = [(key, cities.name(key), cities.positions(key)) for key in cities.city_keys]
+    no_city = np.flatnonzero(cities.place_city_key < 0)
+    if no_city.size:
+        groups.append(("", "", no_city))
+
+    entries = []
+    for key, city, positions in groups:
+        name = _shard_file(key)
+        path = os.path.join(out_dir, name)
+        sha1 = hashlib.sha1()
+        with open(path + ".tmp", "wb") as f:
+            for i, pos in enumerate(positions.tolist()):
+                chunk = ('{"locations": [' if i == 0 else ",") + "\n"
+                chunk += json.dumps(store.place_dict(pos), ensure_ascii=False)
+                data = chunk.encode("utf-8")
+                f.write(data)
+                sha1.update(data)
+            data = ("\n]}" if positions.size else '{"locations": []}').encode("utf-8")
+            f.write(data)
+            sha1.update(data)
+        os.replace(path + ".tmp", path)
+
+        lat, lon = store.lat[positions], store.long[positions]
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        center = [round(float(lat[ok].mean()), 5), round(float(lon[ok].mean()), 5)] if ok.any() else None
+        entries.append(
+            {
+                "key": key,
+                "city": city,
+                "file": name,
+                "count": int(positions.size),
+                "bytes": os.path.getsize(path),
+                "sha1": sha1.hexdigest(),
+                "center": center,
+                "ids": store.ids[positions].tolist(),
+                "names": [store[pos].get("name") or "" for pos in positions.tolist()],
+            }
+        )
+
+        if snapshots:
+            from places_snapshot import compile_snapshot
+
+            compile_snapshot(load_places(path, snapshot_path=""), path + ".snap", path)
+        elif os.path.exists(path + ".snap"):
+            os.remove(path + ".snap")  # de la un split anterior, acum vechi
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "count": len(store),
+        "default": max(entries, key=lambda e: (bool(e["key"]), e["count"]))["key"] if entries else None,
+        "shards": entries,
+    }
+    target = manifest_path(out_dir)
+    with open(target + ".tmp", "w", encoding="utf-8") as f:
+        # fără indent: id-urile și numele tuturor locațiilor ar ocupa câte un rând fiecare
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(target + ".tmp", target)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shard-uri pe orașe pentru dataset-ul de locații")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split_p = sub.add_parser("split", help="un fișier de locații -> director de shard-uri + manifest")
+    split_p.add_argument("--source", default=os.getenv("LOCATIONS_PATH", "locatii_cu_categorii.json"))
+    split_p.add_argument("--out", required=True)
+    split_p.add_argument("--snapshots", action="store_true", help="compilează și snapshot-uri binare")
+    args = parser.parse_args()
+
+    manifest = split_places(args.source, args.out, snapshots=args.snapshots)
+    print(json.dumps({"shards": len(manifest["shards"]), "places": manifest["count"], "default": manifest["default"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+"""
+Snapshot binar al dataset-ului de locații.
+
+JSON-ul (locatii_cu_categorii.json) e compilat o dată, la ingest, într-un
+fișier care se deschide cu mmap: la pornire citim doar header-ul, coloanele
+rămân pe disc și se încarcă la cerere (de OS), deci load-ul nu depinde de
+numărul de locații.
+
+Conținut: coloanele unui PlaceStore (place_store.py), scrise ca atare –
+- id, rating, lat, long (numerice), categorii ca bitmask, oraș ca id;
+- textele (name, address, short_description, image_url) ca blob UTF-8 + offset-uri;
+- string-urile repetate (categorii, orașe) internate o singură dată, în header;
+- index-uri gata construite: categorie -> poziții, oraș -> poziții (sortate).
+
+Header-ul conține sha1-ul JSON-ului sursă; un snapshot pentru alt conținut
+e considerat vechi și load_places citește JSON-ul.
+
+  python places_snapshot.py build                   # LOCATIONS_PATH -> LOCATIONS_PATH.snap
+  python places_snapshot.py build --source x.json --out x.snap
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from place_store import PlaceStore
+
+
+SNAPSHOT_MAGIC = b"PLSNAP\x00\x00"
+# crește versiunea la orice schimbare de format – snapshot-urile vechi sunt ignorate
+SNAPSHOT_VERSION = 2
+
+_PREAMBLE = struct.Struct("<8sII")  # magic, versiune, lungimea header-ului JSON
+_ALIGN = 64
+
+
+def default_snapshot_path(source_path: str) -> str:
+    """PLACES_SNAPSHOT_PATH, implicit <LOCATIONS_PATH>.snap (gol = fără snapshot)."""
+    return os.getenv("PLACES_SNAPSHOT_PATH", source_path + ".snap")
+
+
+def file_sha1(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ------------- Compile -------------
+
+
+def _data_start(header_len: int) -> int:
+    return -(-(_PREAMBLE.size + header_len) // _ALIGN) * _ALIGN
+
+
+def compile_snapshot(store: PlaceStore, path: str, source_path: str) -> Dict[str, Any]:
+    """
+    Scrie snapshot-ul pentru `store` (încărcat din `source_path`; store.fingerprint
+    e sha1-ul lui). Returnează header-ul scris.
+    """
+    stat = os.stat(source_path)
+    arrays = store.columns
+    header: Dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "source_sha1": store.fingerprint or file_sha1(source_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "count": len(store),
+        "categories": store.categories,
+        "cities": store.cities,
+        "sections": {},
+    }
+
+    # secțiunile încep după header (aliniat la _ALIGN); offset-urile sunt relative la acel punct
+    relative = 0
+    for name, arr in arrays.items():
+        header["sections"][name] = {"offset": relative, "dtype": arr.dtype.str, "count": int(arr.size)}
+        relative += -(-arr.nbytes // _ALIGN) * _ALIGN
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _data_start(len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\x00" * (data_start - f.tell()))
+        for name, arr in arrays.items():
+            start = data_start + header["sections"][name]["offset"]
+            f.write(b"\x00" * (start - f.tell()))
+            f.write(arr.tobytes())
+    os.replace(tmp_path, path)  # atomic: cititorii văd fie snapshot-ul vechi, fie pe cel nou
+    return header
+
+
+# ------------- Load -------------
+
+
+def read_header(path: str) -> Optional[Dict[str, Any]]:
+    """Header-ul snapshot-ului, sau None dacă fișierul lipsește / nu e un snapshot valid."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                return None
+            header = json.loads(f.read(header_len).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return None
+    header["data_start"] = _data_start(header_len)
+    return header
+
+
+def snapshot_is_fresh(header: Dict[str, Any], source_path: str) -> bool:
+    """
+    Snapshot-ul corespunde JSON-ului sursă? Dacă dimensiunea și mtime-ul sunt
+    cele din header, nu mai citim sursa; altfel comparăm sha1-ul conținutului
+    (ex: fișier copiat / atins, dar cu același conținut).
+    """
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return False
+    if stat.st_size != header.get("source_size"):
+        return False
+    if stat.st_mtime_ns == header.get("source_mtime_ns"):
+        return True
+    return file_sha1(source_path) == header.get("source_sha1")
+
+
+def load_snapshot(path: str, header: Dict[str, Any]) -> PlaceStore:
+    """PlaceStore cu coloanele direct din fișier (mmap, read-only, fără copiere)."""
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data_start = header["data_start"]
+    columns = {
+        name: np.frombuffer(
+            data,
+            dtype=np.dtype(section["dtype"]),
+            count=section["count"],
+            offset=data_start + section["offset"],
+        )
+        for name, section in header["sections"].items()
+    }
+    return PlaceStore(
+        columns,
+        header["categories"],
+        header["cities"],
+        fingerprint=header["source_sha1"],
+        source="snapshot",
+    )
+
+
+def open_snapshot(path: str, source_path: str) -> Optional[PlaceStore]:
+    """Snapshot-ul de la `path` dacă există și corespunde lui `source_path`; altfel None."""
+    header = read_header(path)
+    if header is None or not snapshot_is_fresh(header, source_path):
+        return None
+    return load_snapshot(path, header)
+
+
+# ------------- CLI (ingest) -------------
+
+
+def main() -> None:
+    from Chat_Bot_Groq_final_v2 import load_places
+
+    parser = argparse.ArgumentParser(description="Compilează dataset-ul de locații într-un snapshot binar")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build")
+    build_p.add_argument("--source", default=None, help="JSON-ul de locații (implicit LOCATIONS_PATH)")
+    build_p.add_argument("--out", default=None, help="fișierul snapshot (implicit PLACES_SNAPSHOT_PATH)")
+    args = parser.parse_args()
+
+    if args.source is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    source = args.source or os.getenv("LOCATIONS_PATH", "locatii_cu_categorii.json")
+    out = args.out or default_snapshot_path(source)
+    if not out:
+        raise SystemExit("no output path: pass --out or set PLACES_SNAPSHOT_PATH")
+
+    places = load_places(source, snapshot_path="")
+    header = compile_snapshot(places, out, source)
+    print(json.dumps({
+        "path": os.path.abspath(out),
+        "places": header["count"],
+        "categories": len(header["categories"]),
+        "cities": len(header["cities"]),
+        "bytes": os.path.getsize(out),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Citirea în flux (streaming) a fișierului de locații.
+
+json.load pe tot fișierul ține în memorie, simultan, textul brut și toate
+dict-urile; aici fișierul e citit pe bucăți (PLACES_READ_CHUNK), iar fiecare
+locație e decodată, validată și dată mai departe (build_columns) imediat – în
+memorie rămâne doar o bucată de text și locația curentă.
+
+Formate acceptate (detectate din conținut, nu din extensie):
+- {"locations": [ {...}, {...} ]}   – formatul locatii_cu_categorii.json
+  (alte chei de pe primul nivel sunt ignorate);
+- [ {...}, {...} ]                   – formatul vechi, simplu;
+- JSONL / NDJSON: câte o locație pe linie (un fișier cu o singură linie e
+  recunoscut ca JSONL doar după extensie: .jsonl / .ndjson).
+
+Normalizări, per locație (ce nu se poate normaliza rămâne cum e):
+- name / address / image_url / short_description: fără spații la capete;
+- rating, coordinates.lat / long, id: numere scrise ca string -> numere;
+- coordinates: "lng" / "lon" -> "long";
+- categories: un singur string -> listă; fără duplicate / goluri.
+Valorile care nu sunt obiecte JSON sunt sărite (și numărate în `skipped`).
+"""
+import codecs
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, Optional
+
+READ_CHUNK = int(os.getenv("PLACES_READ_CHUNK", str(1 << 20)))
+
+_TEXT_FIELDS = ("name", "address", "image_url", "short_description")
+_WS = re.compile(r"[ \t\n\r]*")
+_INT = re.compile(r"-?\d+")
+_FLOAT = re.compile(r"-?\d+(\.\d+)?([eE][-+]?\d+)?")
+
+# extensii pentru care un singur obiect pe primul nivel e o locație (JSONL cu o linie)
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+
+
+def _to_number(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if _INT.fullmatch(text):
+        return int(text)
+    if _FLOAT.fullmatch(text):
+        return float(text)
+    return value
+
+
+def normalize_place(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Forma canonică a unei locații (vezi docstring-ul modulului). Nu modifică dict-ul primit."""
+    place = dict(place)
+
+    for field in _TEXT_FIELDS:
+        value = place.get(field)
+        if isinstance(value, str):
+            place[field] = value.strip()
+
+    if "rating" in place:
+        place["rating"] = _to_number(place["rating"])
+    if "id" in place:
+        place["id"] = _to_number(place["id"])
+
+    coords = place.get("coordinates")
+    if isinstance(coords, dict):
+        coords = dict(coords)
+        for alias in ("lng", "lon"):
+            if alias in coords and "long" not in coords:
+                coords["long"] = coords.pop(alias)
+        for key in ("lat", "long"):
+            if key in coords:
+                coords[key] = _to_number(coords[key])
+        place["coordinates"] = coords
+
+    cats = place.get("categories")
+    if isinstance(cats, str):
+        cats = [cats]
+    if isinstance(cats, list) and all(isinstance(c, str) for c in cats):
+        place["categories"] = list(dict.fromkeys(c.strip() for c in cats if c.strip()))
+
+    return place
+
+
+class PlacesReader:
+    """
+    Iterator peste locațiile dintr-un fișier, citit pe bucăți.
+
+    După ce a fost parcurs complet: `sha1` = sha1-ul conținutului (același
+    fingerprint ca la citirea dintr-o bucată), `count` = locații citite,
+    `skipped` = valori care nu erau obiecte.
+    """
+
+    def __init__(self, path: str, chunk_size: int = READ_CHUNK, normalize: bool = True):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.normalize = normalize
+        self.sha1: Optional[str] = None
+        self.count = 0
+        self.skipped = 0
+
+        self._decoder = json.JSONDecoder()
+        self._hash = hashlib.sha1()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._file = None
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    # --- buffer ---
+
+    def _fill(self) -> bool:
+        """Mai citește o bucată; False la sfârșitul fișierului."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self.chunk_size)
+        self._hash.update(chunk)
+        self._buf = self._buf[self._pos :] + self._utf8.decode(chunk, final=not chunk)
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        return True
+
+    def _peek(self) -> str:
+        """Primul caracter non-spațiu (fără să-l consume); "" la sfârșitul fișierului."""
+        while True:
+            self._pos = _WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"{self.path}: expected {char!r} at offset ~{self._pos}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Următoarea valoare JSON completă din buffer (citind cât e nevoie)."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # un număr la capătul buffer-ului poate continua în bucata următoare
+            if end == len(self._buf) and not self._eof and not isinstance(value, (dict, list, str)):
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    # --- formate ---
+
+    def _emit(self, value: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(value, dict):
+            self.skipped += 1
+            return None
+        self.count += 1
+        return normalize_place(value) if self.normalize else value
+
+    def _array(self) -> Iterator[Dict[str, Any]]:
+        """Elementele unui array JSON, unul câte unul (poziția e după '[')."""
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            place = self._emit(self._value())
+            if place is not None:
+                yield place
+            sep = self._peek()
+            self._pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"{self.path}: expected ',' or ']' in the locations array")
+
+    def _object(self) -> Iterator[Dict[str, Any]]:
+        """
+        Un obiect pe primul nivel: fie {"locations": [...], ...}, fie prima
+        locație dintr-un fișier JSONL (și atunci continuăm cu restul liniilor).
+        """
+        self._expect("{")
+        head: Dict[str, Any] = {}
+        saw_locations = False
+        if self._peek() == "}":
+            self._pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(":")
+                if key == "locations" and not saw_locations:
+                    if self._peek() != "[":
+                        raise ValueError("Expected 'locations' to be a list")
+                    self._pos += 1
+                    saw_locations = True
+                    yield from self._array()
+                else:
+                    head[key] = self._value()
+                sep = self._peek()
+                self._pos += 1
+                if sep == "}":
+                    break
+                if sep != ",":
+                    raise ValueError(f"{self.path}: expected ',' or '}}' in the top-level object")
+
+        if saw_locations:
+            if self._peek():
+                raise ValueError(f"{self.path}: unexpected data after the top-level object")
+            return
+        if not self._peek() and not self.path.lower().endswith(JSONL_EXTENSIONS):
+            raise ValueError("Unexpected JSON structure for locations")
+
+        # JSONL: obiectul de mai sus era prima locație
+        place = self._emit(head)
+        if place is not None:
+            yield place
+        while self._peek():
+            place = self._emit(self._value())
+            if place is not None:
+                yield place
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, "rb") as f:
+            self._file = f
+            first = self._peek()
+            if first == "[":
+                self._pos += 1
+                yield from self._array()
+                if self._peek():
+                    raise ValueError(f"{self.path}: unexpected data after the locations array")
+            elif first == "{":
+                yield from self._object()
+            else:
+                raise ValueError("Unexpected JSON structure for locations")
+
+            # restul fișierului (spații) intră și el în sha1
+            while self._fill():
+                pass
+            self.sha1 = self._hash.hexdigest()
+            self._file = None
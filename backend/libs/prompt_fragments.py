@@ -0,0 +1,103 @@
+"""
+Textul de prompt al locațiilor, randat o singură dată per dataset.
+
+Fiecare locație e randată o dată, la load, în trei fragmente:
+  - numele;
+  - linia de detalii ("city: .. | address: .. | rating: ..");
+  - restul liniilor (categorii, descriere).
+Numărul din listă și distanța până la user se schimbă de la un request la
+altul, așa că se lipesc abia la asamblare.
+
+Fragmentele stau într-un singur blob UTF-8 + offset-uri (array), nu în
+milioane de str-uri Python. Un bloc de prompt e doar decodare + join.
+
+Blocurile pentru scope-urile frecvente (toate locațiile, un oraș, un grup de
+categorii) sunt și ele memorate, per dataset. Un dataset nou (reload)
+înseamnă alt obiect PromptFragments, deci invalidarea vine de la sine.
+"""
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (nume, detalii, restul liniilor – fiecare precedată de "\n")
+PlaceParts = Tuple[str, str, str]
+
+
+def compose_place_prompt(parts: PlaceParts, idx: int, distance_km: Optional[float] = None) -> str:
+    """Textul unei locații în prompt, din fragmentele ei."""
+    name, details, tail = parts
+    if distance_km is not None:
+        distance = f"distance: {distance_km:.1f} km"
+        details = f"{details} | {distance}" if details else distance
+    head = f"{idx}. {name or f'Place {idx}'}"
+    if details:
+        return f"{head}\n{details}{tail}"
+    return head + tail
+
+
+def compose_block(texts: List[str]) -> str:
+    """Locațiile una după alta, cu o linie goală între ele."""
+    return "\n\n".join(texts) + "\n" if texts else ""
+
+
+class PromptFragments:
+    """
+    Fragmentele tuturor locațiilor unui dataset, în ordinea pozițiilor.
+
+    Pentru locația `pos`, offsets[3*pos : 3*pos + 4] delimitează în blob
+    numele, detaliile și restul.
+    """
+
+    def __init__(self, parts: Iterable[PlaceParts]):
+        blob = bytearray()
+        offsets = array("q", [0])
+        for name, details, tail in parts:
+            for text in (name, details, tail):
+                blob += text.encode("utf-8")
+                offsets.append(len(blob))
+        self._blob = bytes(blob)
+        self._offsets = offsets
+        self._blocks: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return (len(self._offsets) - 1) // 3
+
+    def parts(self, pos: int) -> PlaceParts:
+        blob, o, i = self._blob, self._offsets, 3 * pos
+        return (
+            blob[o[i] : o[i + 1]].decode("utf-8"),
+            blob[o[i + 1] : o[i + 2]].decode("utf-8"),
+            blob[o[i + 2] : o[i + 3]].decode("utf-8"),
+        )
+
+    def text(self, pos: int, idx: int, distance_km: Optional[float] = None) -> str:
+        return compose_place_prompt(self.parts(pos), idx, distance_km)
+
+    def block(self, positions: Sequence[int], distances: Optional[Sequence[Optional[float]]] = None) -> str:
+        """Blocul de prompt pentru locațiile de la `positions`, numerotate de la 1."""
+        return compose_block(
+            [
+                self.text(pos, idx, distances[idx - 1] if distances else None)
+                for idx, pos in enumerate(positions, start=1)
+            ]
+        )
+
+    def scope_block(self, key: str, positions: Callable[[], Sequence[int]]) -> str:
+        """Blocul unui scope ("all", "city:cluj napoca", ...), asamblat la primul request și memorat."""
+        block = self._blocks.get(key)
+        if block is None:
+            block = self.block(positions())
+            with self._lock:
+                block = self._blocks.setdefault(key, block)
+        return block
+
+    def updated(self, old_positions: Sequence[int], render: Callable[[int], PlaceParts]) -> "PromptFragments":
+        """
+        Fragmentele unei versiuni noi a dataset-ului (reload): pentru pozițiile cu
+        old_positions[pos] >= 0 se refolosesc fragmentele de aici, restul se randează.
+        Blocurile de scope nu se copiază – conținutul lor s-a putut schimba.
+        """
+        return PromptFragments(
+            self.parts(old) if old >= 0 else render(pos) for pos, old in enumerate(old_positions)
+        )
@@ -0,0 +1,296 @@
+"""
+Analiza unui mesaj, făcută o singură dată per mesaj.
+
+QueryAnalysis ține tot ce află detectoarele despre un mesaj:
+- textul normalizat (fold_text: lowercase, fără diacritice) și tokenii lui;
+- limba (RO / EN), din trigramele de caractere (lang_id.py) plus voturile
+  cuvintelor-indiciu din reguli ("near", "me" trag spre EN, "unde", "vreau"
+  spre RO), cu încrederea ei; sub LANG_ID_MIN_CONFIDENCE (mesaje de un
+  cuvânt, "ok") decid doar cuvintele-indiciu;
+- intențiile (liste de locații, "mai multe", ...);
+- mențiunile: orașe, categorii ("pizza" -> "Pizza & Italian"), nume de
+  locații – toate găsite de un singur automat (mention_matcher.py), într-o
+  singură trecere prin mesaj;
+- orașul (prima mențiune de oraș) și categoriile (în ordinea din mesaj).
+
+Detectoarele sunt reguli declarative, în intent_rules.json (sau
+INTENT_RULES_PATH). O regulă:
+
+  {"intent": "list_cafes",
+   "require": ["@cafe_words"],            # măcar un token de aici
+   "unless":  ["@city"],                  # niciun token de aici
+   "when":    [[["ce", "care"], ["ai"]],  # măcar o clauză; într-o clauză,
+               [["baza"], ["date"]]]}     #   fiecare grup are măcar un token
+  {"intent": "more", "exact": ["mai multe", "more"]}   # tot mesajul, exact
+
+"@nume" trimite la "token_sets". Regulile sunt indexate după tokenii care le
+pot declanșa (require, sau primul grup din fiecare clauză), deci un mesaj
+evaluează doar regulile care au o șansă. O regulă nouă nu costă nimic la
+mesajele care nu conțin cuvintele ei.
+"""
+import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from city_index import first_city, fold_text
+from lang_id import LANG_ID_MIN_CONFIDENCE, load_language_identifier
+
+if TYPE_CHECKING:
+    from mention_matcher import Mention, MentionMatcher
+
+# log-odds adăugate scorului de trigrame pentru fiecare cuvânt-indiciu (RO +, EN -):
+# la mesajele scurte ("pizza near me") trigramele singure greșesc cu încredere
+LANG_HINT_WEIGHT = float(os.getenv("LANG_HINT_WEIGHT", "1.5"))
+
+INTENT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_rules.json")
+
+
+@dataclass(frozen=True)
+class QueryAnalysis:
+    text: str
+    normalized: str
+    tokens: Tuple[str, ...]
+    token_set: FrozenSet[str]
+    lang: str
+    # încrederea identificatorului de limbă (0.5 – 1); sub prag, limba vine din cuvintele-indiciu
+    lang_confidence: float
+    # în ordinea regulilor din fișier (prima = cea mai prioritară)
+    intents: Tuple[str, ...]
+    categories: Tuple[str, ...]
+    city_key: Optional[str] = None
+    # toate potrivirile automatului (și cele suprapuse), în ordinea sfârșitului
+    mentions: Tuple["Mention", ...] = ()
+
+    @property
+    def intent(self) -> Optional[str]:
+        return self.intents[0] if self.intents else None
+
+    def has(self, intent: str) -> bool:
+        return intent in self.intents
+
+    def mentioned(self, kind: str) -> List["Mention"]:
+        """Mențiunile de tipul `kind` ("city", "category", "place"), fără suprapuneri, de la stânga."""
+        from mention_matcher import select_mentions
+
+        return select_mentions(self.mentions, kind)
+
+
+@dataclass(frozen=True)
+class _Rule:
+    intent: str
+    require: FrozenSet[str]
+    unless: FrozenSet[str]
+    when: Tuple[Tuple[FrozenSet[str], ...], ...]
+
+    def matches(self, tokens: FrozenSet[str]) -> bool:
+        if self.require and not self.require & tokens:
+            return False
+        if self.unless & tokens:
+            return False
+        if not self.when:
+            return True
+        return any(all(group & tokens for group in clause) for clause in self.when)
+
+    def triggers(self) -> FrozenSet[str]:
+        """Tokeni dintre care măcar unul trebuie să apară ca regula să se potrivească (gol = oricare)."""
+        if self.require:
+            return self.require
+        if self.when and all(clause for clause in self.when):
+            return frozenset().union(*(clause[0] for clause in self.when))
+        return frozenset()
+
+
+class IntentRules:
+    """Regulile dintr-un fișier de reguli, compilate și indexate după tokeni."""
+
+    def __init__(self, data: Dict[str, Any]):
+        token_sets = {name: frozenset(words) for name, words in data.get("token_sets", {}).items()}
+
+        def words(items: List[str]) -> FrozenSet[str]:
+            out: Set[str] = set()
+            for item in items:
+                if item.startswith("@"):
+                    out |= token_sets[item[1:]]
+                else:
+                    out.add(item)
+            return frozenset(out)
+
+        self.token_sets = token_sets
+        self.intent_names: List[str] = []
+        self._rules: List[_Rule] = []
+        self._exact: Dict[str, str] = {}
+        for order, spec in enumerate(data.get("intents", [])):
+            intent = spec["intent"]
+            if intent not in self.intent_names:
+                self.intent_names.append(intent)
+            for phrase in spec.get("exact", []):
+                self._exact.setdefault(fold_text(phrase), intent)
+            if "exact" in spec:
+                continue
+            self._rules.append(
+                _Rule(
+                    intent=intent,
+                    require=words(spec.get("require", [])),
+                    unless=words(spec.get("unless", [])),
+                    when=tuple(tuple(words(group) for group in clause) for clause in spec.get("when", [])),
+                )
+            )
+        self._priority = {intent: i for i, intent in enumerate(self.intent_names)}
+
+        # token -> regulile pe care le poate declanșa
+        self._by_token: Dict[str, List[int]] = {}
+        self._always: List[int] = []
+        for i, rule in enumerate(self._rules):
+            triggers = rule.triggers()
+            if not triggers:
+                self._always.append(i)
+            for token in triggers:
+                self._by_token.setdefault(token, []).append(i)
+
+        language = data.get("language", {})
+        self._ro_hints = frozenset(language.get("ro", []))
+        self._en_hints = frozenset(language.get("en", []))
+        self._default_lang = language.get("default", "ro")
+        # cuvinte obișnuite ale întrebărilor – nu pot fi (o parte din) numele unei locații
+        self.common_words = self._ro_hints | self._en_hints
+
+        # categorie -> cuvintele / expresiile care o sugerează
+        self.category_hints: Dict[str, List[str]] = {
+            category: list(hints) for category, hints in data.get("category_hints", {}).items()
+        }
+        self.category_names: List[str] = list(self.category_hints)
+        # cuvinte care sugerează o categorie, dar cer ceva mai îngust ("sushi" -> Seafood)
+        self.category_loose_hints: Dict[str, List[str]] = {
+            category: list(hints)
+            for category, hints in data.get("category_loose_hints", {}).items()
+            if category != "comment"
+        }
+
+        # vocabularul întrebărilor structurate (structured_query.py), ca tipare de mențiuni
+        words = data.get("query_words", {})
+        self._query_patterns: List[Tuple[str, str, Any]] = []
+        for order, phrases in words.get("order", {}).items():
+            direction, _, one = order.partition("_")
+            value = (direction, 1 if one == "one" else None)
+            self._query_patterns += [(phrase, "order", value) for phrase in phrases]
+        self._query_patterns += [(word, "number", n) for word, n in words.get("numbers", {}).items()]
+        # pragul: "at_least" (>=, "cel puțin 4") sau "over" (>, "peste 4.5")
+        for threshold, phrases in words.get("rating", {}).items():
+            self._query_patterns += [(phrase, "rating", threshold) for phrase in phrases]
+        for kind in ("count", "generic", "filler", "blocker"):
+            self._query_patterns += [(phrase, kind, None) for phrase in words.get(kind, [])]
+        self._matcher: Optional["MentionMatcher"] = None
+
+    @classmethod
+    def load(cls, path: str) -> "IntentRules":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def intents(self, normalized: str, tokens: FrozenSet[str]) -> Tuple[str, ...]:
+        found: Set[str] = set()
+        exact = self._exact.get(normalized)
+        if exact is not None:
+            found.add(exact)
+        candidates = set(self._always)
+        for token in tokens:
+            candidates.update(self._by_token.get(token, ()))
+        for i in candidates:
+            rule = self._rules[i]
+            if rule.intent not in found and rule.matches(tokens):
+                found.add(rule.intent)
+        return tuple(sorted(found, key=self._priority.__getitem__))
+
+    def language_votes(self, tokens: FrozenSet[str]) -> int:
+        """Cuvinte-indiciu RO minus cuvinte-indiciu EN din mesaj."""
+        return len(tokens & self._ro_hints) - len(tokens & self._en_hints)
+
+    def language(self, tokens: FrozenSet[str]) -> str:
+        """Limba după cuvintele-indiciu – doar pentru mesajele prea scurte / ambigue pentru lang_id."""
+        ro_hits = len(tokens & self._ro_hints)
+        en_hits = len(tokens & self._en_hints)
+        if en_hits > ro_hits:
+            return "en"
+        if ro_hits > en_hits:
+            return "ro"
+        # fallback: dacă apar clar cuvinte englezești
+        if en_hits:
+            return "en"
+        # altfel default (aplicația e locală)
+        return self._default_lang
+
+    def category_patterns(self) -> List[Tuple[str, str, str]]:
+        """Tiparele categoriilor pentru MentionMatcher: (expresie, "category" / "category_loose", categorie)."""
+        patterns = [(hint, "category", category) for category, hints in self.category_hints.items() for hint in hints]
+        patterns += [
+            (hint, "category_loose", category)
+            for category, hints in self.category_loose_hints.items()
+            for hint in hints
+        ]
+        return patterns
+
+    def query_patterns(self) -> List[Tuple[str, str, Any]]:
+        """Tiparele vocabularului de întrebări ("order", "count", "number", "rating", "generic", "filler", "blocker")."""
+        return list(self._query_patterns)
+
+    def matcher(self) -> "MentionMatcher":
+        """Automatul fără dataset (categorii + vocabularul de întrebări), pentru mesaje fără places; construit o dată."""
+        if self._matcher is None:
+            from mention_matcher import MentionMatcher
+
+            self._matcher = MentionMatcher(self.category_patterns() + self.query_patterns())
+        return self._matcher
+
+
+_RULES: Dict[str, IntentRules] = {}
+
+
+def load_intent_rules(path: Optional[str] = None) -> IntentRules:
+    """Regulile din INTENT_RULES_PATH (implicit intent_rules.json de lângă modul), citite o dată."""
+    path = path or os.getenv("INTENT_RULES_PATH") or INTENT_RULES_PATH
+    rules = _RULES.get(path)
+    if rules is None:
+        rules = _RULES.setdefault(path, IntentRules.load(path))
+    return rules
+
+
+def analyze_query(
+    text: str,
+    matcher: Optional["MentionMatcher"] = None,
+    rules: Optional[IntentRules] = None,
+) -> QueryAnalysis:
+    """
+    Analiza completă a unui mesaj (o singură normalizare + tokenizare).
+
+    `matcher` – automatul dataset-ului (orașe + categorii + locații + vocabularul
+    de întrebări); fără el, se caută doar categoriile și vocabularul.
+    """
+    rules = rules or load_intent_rules()
+    normalized = fold_text(text)
+    tokens = tuple(normalized.split())
+    token_set = frozenset(tokens)
+    mentions = tuple((matcher or rules.matcher()).find_all(tokens))
+
+    # limba, fără numele proprii: "best sushi in Constanța" e engleză, nu română
+    proper = {i for m in mentions if m.kind in ("city", "place") for i in range(m.start, m.end)}
+    lang, lang_confidence = load_language_identifier().identify(
+        " ".join(token for i, token in enumerate(tokens) if i not in proper),
+        bias=LANG_HINT_WEIGHT * rules.language_votes(token_set),
+    )
+    if lang_confidence < LANG_ID_MIN_CONFIDENCE:
+        lang = rules.language(token_set)
+    categories: Dict[str, None] = {}
+    for mention in sorted((m for m in mentions if m.kind in ("category", "category_loose")), key=lambda m: m.start):
+        categories.setdefault(mention.value, None)
+    return QueryAnalysis(
+        text=text,
+        normalized=normalized,
+        tokens=tokens,
+        token_set=token_set,
+        lang=lang,
+        lang_confidence=lang_confidence,
+        intents=rules.intents(normalized, token_set),
+        categories=tuple(categories),
+        city_key=first_city(mentions),
+        mentions=mentions,
+    )
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+# ------------- Reply cache (LRU, în memorie) -------------
+#
+# Multe întrebări sunt practic identice ("cafenele în Cluj" / "Cafenele in cluj?").
+# Cheia combină query-ul normalizat, orașul, limba, ultimele mesaje din history
+# și amprenta dataset-ului – când se schimbă locațiile, intrările vechi dispar.
+
+
+def fingerprint(value: Any) -> str:
+    """Hash scurt și stabil pentru orice valoare JSON-serializabilă."""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def dataset_fingerprint(places: List[Dict[str, Any]]) -> str:
+    """
+    Amprenta dataset-ului: cea calculată de load_places din fișier (atributul
+    .fingerprint), altfel un hash peste conținut.
+    """
+    fp = getattr(places, "fingerprint", None)
+    if fp:
+        return fp
+    return fingerprint(list(places))
+
+
+class ReplyCache:
+    """LRU thread-safe pentru răspunsurile LLM, cu contoare hit / miss."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        # (obiectul places, amprenta lui) – ca să nu re-hash-uim la fiecare request
+        self._dataset: Optional[tuple] = None
+
+    def dataset_fingerprint(self, places: List[Dict[str, Any]]) -> str:
+        """Amprenta dataset-ului; dacă s-a schimbat față de ultima dată, golim cache-ul."""
+        with self._lock:
+            if self._dataset is not None and self._dataset[0] is places:
+                return self._dataset[1]
+
+        fp = dataset_fingerprint(places)
+
+        with self._lock:
+            if self._dataset is not None and self._dataset[1] != fp:
+                self._entries.clear()
+            self._dataset = (places, fp)
+        return fp
+
+    def make_key(self, **parts: Any) -> str:
+        return fingerprint(parts)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            reply = self._entries.get(key)
+            if reply is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return reply
+
+    def put(self, key: str, reply: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = reply
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
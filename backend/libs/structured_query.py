@@ -0,0 +1,152 @@
+"""
+Întrebări structurate, răspunse local (fără LLM).
+
+"cea mai bună pizza din Cluj", "vegan places in Timișoara rated over 4.5",
+"top 3 cafenele" se pot răspunde complet din name / categories / rating și
+orașul din adresă. parse_structured_query scoate din analiza mesajului
+(mențiunile din QueryAnalysis – tot o singură trecere prin mesaj):
+- orașul și categoriile;
+- pragul de rating ("cel puțin 4", "4+ stele" = inclusiv; "peste 4.5",
+  "rated over 4" = strict);
+- ordinea (cele mai bune / cele mai slab cotate);
+- câte rezultate ("top 3", "primele cinci", "cea mai bună" = 1);
+plus o încredere: ce parte din cuvintele mesajului a fost înțeleasă.
+
+Un cuvânt rămas neexplicat ("romantic", "terasă", "pentru copii") e ceva ce
+doar LLM-ul poate judeca din descrieri, iar un cuvânt "blocker" (negații,
+preț, distanță) nu are răspuns în câmpurile structurate. La fel o categorie
+găsită printr-un cuvânt mai îngust decât ea ("sushi" -> Seafood, "bere" ->
+Bar): "cel mai bun sushi" nu e "cel mai bine cotat loc cu pește". Sub
+STRUCTURED_MIN_CONFIDENCE întrebarea merge mai departe la Groq.
+
+Vocabularul e în intent_rules.json, la "query_words".
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from query_analysis import QueryAnalysis
+
+# sub pragul ăsta (cuvinte înțelese / toate cuvintele) răspunde LLM-ul
+STRUCTURED_MIN_CONFIDENCE = float(os.getenv("STRUCTURED_MIN_CONFIDENCE", "0.9"))
+# câte locații arătăm când întrebarea nu spune, și cel mult câte
+STRUCTURED_DEFAULT_COUNT = int(os.getenv("STRUCTURED_DEFAULT_COUNT", "5"))
+STRUCTURED_MAX_COUNT = int(os.getenv("STRUCTURED_MAX_COUNT", "20"))
+
+# mențiunile care explică un cuvânt din mesaj
+_EXPLAINING = frozenset({"city", "category", "order", "count", "rating", "generic", "filler"})
+
+# "4.5" / "4,5" în textul original – fold_text le desparte în "4" "5"
+_DECIMAL = re.compile(r"(\d+)[.,](\d+)")
+
+
+@dataclass(frozen=True)
+class StructuredQuery:
+    city_key: Optional[str]
+    categories: Tuple[str, ...]
+    min_rating: Optional[float]
+    # True: rating > min_rating ("peste 4.5"); False: rating >= min_rating ("cel puțin 4.5")
+    rating_over: bool
+    order: str  # "best" / "worst" (după rating)
+    count: int
+    # cuvinte înțelese / toate cuvintele (0 dacă apare un "blocker")
+    confidence: float
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= STRUCTURED_MIN_CONFIDENCE
+
+
+def _numbers(analysis: "QueryAnalysis") -> List[Tuple[int, int, float, bool]]:
+    """Numerele din mesaj: (primul token, după ultimul, valoare, e zecimal)."""
+    tokens = analysis.tokens
+    decimals = {f"{whole} {frac}" for whole, frac in _DECIMAL.findall(analysis.text)}
+    found: List[Tuple[int, int, float, bool]] = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i].isdigit():
+            if i + 1 < len(tokens) and f"{tokens[i]} {tokens[i + 1]}" in decimals:
+                found.append((i, i + 2, float(f"{tokens[i]}.{tokens[i + 1]}"), True))
+                i += 2
+                continue
+            found.append((i, i + 1, float(tokens[i]), False))
+        i += 1
+    for mention in analysis.mentions:
+        if mention.kind == "number":
+            found.append((mention.start, mention.end, float(mention.value), False))
+    return sorted(found)
+
+
+def parse_structured_query(analysis: "QueryAnalysis") -> Optional[StructuredQuery]:
+    """
+    Întrebarea structurată din mesaj, sau None dacă mesajul nu are forma asta
+    (nu cere o ordine / un număr / un prag, sau nu spune ce caută).
+    """
+    tokens = analysis.tokens
+    if not tokens:
+        return None
+
+    explained = [False] * len(tokens)
+    blocked = False
+    # poziția de lângă un "peste" / "stele" / ... -> (span-ul cuvântului, "at_least" / "over")
+    rating_marks: Dict[int, Tuple[Tuple[int, int], str]] = {}
+    count_marks = set()  # pozițiile de după "top" / "primele"
+    for mention in analysis.mentions:
+        if mention.kind in _EXPLAINING:
+            explained[mention.start : mention.end] = [True] * mention.length
+        if mention.kind in ("blocker", "category_loose"):
+            blocked = True
+        elif mention.kind == "rating":
+            mark = ((mention.start, mention.end), mention.value)
+            # la un capăt comun ("rated over 4"), "over" câștigă
+            for pos in (mention.start, mention.end):
+                if pos not in rating_marks or mention.value == "over":
+                    rating_marks[pos] = mark
+        elif mention.kind == "count":
+            count_marks.add(mention.end)
+
+    orders = analysis.mentioned("order")
+    direction, one = orders[0].value if orders else ("best", None)
+
+    min_rating: Optional[float] = None
+    rating_over = False
+    count: Optional[int] = None
+    used_marks = set()
+    for start, end, value, decimal in _numbers(analysis):
+        # "peste 4.5", "4.5+", "4 stele"; un număr zecimal e mereu un rating
+        if (decimal or start in rating_marks or end in rating_marks) and 0 < value <= 5:
+            marks = [rating_marks[pos] for pos in (start, end) if pos in rating_marks]
+            if min_rating is None:
+                min_rating = value
+                rating_over = any(threshold == "over" for _span, threshold in marks)
+            used_marks.update(span for span, _threshold in marks)
+        elif not decimal and value >= 1 and (start in count_marks or count is None):
+            count = int(value)
+        else:
+            continue
+        explained[start:end] = [True] * (end - start)
+
+    # "peste 4.5" e un prag, nu pește (Seafood)
+    categories: Dict[str, None] = {}
+    for mention in analysis.mentioned("category"):
+        # "4.5 sau peste": cuvântul e în interiorul span-ului pragului
+        if not any(start <= mention.start and mention.end <= end for start, end in used_marks):
+            categories.setdefault(mention.value, None)
+
+    has_subject = bool(categories) or any(m.kind in ("generic", "city") for m in analysis.mentions)
+    if not has_subject or not (orders or count is not None or min_rating is not None):
+        return None
+
+    if count is None:
+        count = one or STRUCTURED_DEFAULT_COUNT
+    return StructuredQuery(
+        city_key=analysis.city_key,
+        categories=tuple(categories),
+        min_rating=min_rating,
+        rating_over=rating_over,
+        order=direction,
+        count=max(1, min(count, STRUCTURED_MAX_COUNT)),
+        confidence=0.0 if blocked else sum(explained) / len(tokens),
+    )
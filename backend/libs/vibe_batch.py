@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Pre-generare offline a vibe-urilor prin Groq Batches API.
+
+Construiește un JSONL cu câte un request /v1/chat/completions per locație,
+îl urcă (files, purpose="batch"), pornește batch-ul, așteaptă rezultatul și
+scrie vibe-urile în același VibeCache pe care îl citește /vibe.
+
+  python vibe_batch.py run                 # doar locațiile fără vibe în store
+  python vibe_batch.py run --all           # regenerează tot
+  python vibe_batch.py build --out b.jsonl # doar fișierul de batch, fără upload
+  python vibe_batch.py collect <batch_id>  # reia un batch pornit anterior
+
+Pentru teste locale: GROQ_BASE_URL (sau --base-url) către un server care
+imită endpoint-urile /openai/v1/files și /openai/v1/batches.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from Chat_Bot_Groq_final_v2 import (
+    VIBE_MAX_TOKENS,
+    VIBE_PROMPT_VERSION,
+    VIBE_TEMPERATURE,
+    build_vibe_messages,
+    load_config,
+    load_places,
+)
+from vibe_cache import VibeCache, open_vibe_cache, vibe_cache_key
+
+if TYPE_CHECKING:
+    from groq import Groq
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ------------- Build -------------
+
+
+def build_batch_requests(
+    places: List[Dict[str, Any]],
+    model: str,
+    cache: Optional[VibeCache] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Request-urile de batch pentru locațiile care nu au deja vibe în cache.
+
+    custom_id = cheia din VibeCache, deci rezultatul se scrie direct în store.
+    Returnează (request-uri, custom_id -> numele locației).
+    """
+    requests: List[Dict[str, Any]] = []
+    names: Dict[str, str] = {}
+
+    for place in places:
+        messages = build_vibe_messages(place)
+        key = vibe_cache_key(model, VIBE_PROMPT_VERSION, messages)
+        if key in names:
+            continue  # aceeași locație de două ori în dataset
+        if cache is not None and cache.get(key) is not None:
+            continue
+
+        names[key] = place.get("name", "")
+        requests.append(
+            {
+                "custom_id": key,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": messages,
+                    "max_tokens": VIBE_MAX_TOKENS,
+                    "temperature": VIBE_TEMPERATURE,
+                },
+            }
+        )
+
+    return requests, names
+
+
+def to_jsonl(requests: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in requests).encode("utf-8")
+
+
+# ------------- Submit / poll -------------
+
+
+def submit_batch(client: "Groq", requests: List[Dict[str, Any]], completion_window: str = "24h") -> str:
+    """Urcă fișierul JSONL și pornește batch-ul. Returnează id-ul batch-ului."""
+    uploaded = client.files.create(
+        file=("vibes_batch.jsonl", to_jsonl(requests)),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        completion_window=completion_window,
+        endpoint=BATCH_ENDPOINT,
+        input_file_id=uploaded.id,
+    )
+    return batch.id
+
+
+def wait_for_batch(client: "Groq", batch_id: str, poll_interval: float = 30.0, timeout: Optional[float] = None):
+    """Poll până când batch-ul ajunge într-o stare finală."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in FINAL_STATUSES:
+            return batch
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"batch {batch_id} still '{batch.status}' after {timeout}s")
+        print(f"[vibe_batch] {batch_id}: {batch.status}", file=sys.stderr)
+        time.sleep(poll_interval)
+
+
+# ------------- Collect -------------
+
+
+def store_batch_output(
+    output_text: str,
+    cache: VibeCache,
+    model: str,
+    names: Optional[Dict[str, str]] = None,
+) -> Tuple[int, int]:
+    """
+    Scrie în cache fiecare linie reușită din fișierul de output al batch-ului.
+    Returnează (scrise, eșuate).
+    """
+    names = names or {}
+    rows: List[Tuple[str, str, str, str]] = []
+    failed = 0
+
+    for line in output_text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        key = item.get("custom_id")
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+
+        if item.get("error") or response.get("status_code") != 200 or not key:
+            failed += 1
+            continue
+
+        try:
+            vibe = body["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            failed += 1
+            continue
+
+        rows.append((key, vibe, names.get(key, ""), model))
+
+    # toate într-o singură tranzacție (și o singură curățenie), nu câte un commit per linie
+    return cache.put_many(rows), failed
+
+
+def collect_batch(client: "Groq", batch, cache: VibeCache, model: str, names: Optional[Dict[str, str]] = None) -> Tuple[int, int]:
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"batch {batch.id} ended with status '{batch.status}'")
+
+    output = client.files.content(batch.output_file_id)
+    return store_batch_output(output.read().decode("utf-8"), cache, model, names)
+
+
+# ------------- CLI -------------
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-generare vibe-uri prin Groq Batches API")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_p = sub.add_parser("build", help="scrie doar fișierul JSONL de batch")
+    build_p.add_argument("--out", required=True)
+    build_p.add_argument("--all", action="store_true", help="include și locațiile care au deja vibe")
+
+    run_p = sub.add_parser("run", help="build + submit + poll + scriere în store")
+    run_p.add_argument("--all", action="store_true", help="include și locațiile care au deja vibe")
+    run_p.add_argument("--poll-interval", type=float, default=30.0)
+    run_p.add_argument("--timeout", type=float, default=None)
+    run_p.add_argument("--completion-window", default="24h")
+
+    collect_p = sub.add_parser("collect", help="așteaptă / colectează un batch existent")
+    collect_p.add_argument("batch_id")
+    collect_p.add_argument("--poll-interval", type=float, default=30.0)
+    collect_p.add_argument("--timeout", type=float, default=None)
+
+    for p in (run_p, collect_p):
+        p.add_argument("--base-url", default=None, help="alt endpoint Groq (ex: stand-in local)")
+
+    args = parser.parse_args()
+
+    config = load_config()
+    model = config["model"]
+    cache = open_vibe_cache(config)
+
+    if args.command in {"build", "run"}:
+        places = load_places(config["locations_path"])
+        requests, names = build_batch_requests(places, model, cache=None if args.all else cache)
+        print(f"[vibe_batch] {len(requests)}/{len(places)} places need a vibe", file=sys.stderr)
+
+        if args.command == "build":
+            with open(args.out, "wb") as f:
+                f.write(to_jsonl(requests))
+            return
+
+        if not requests:
+            return
+    else:
+        names = {}
+
+    if cache is None:
+        raise RuntimeError("VIBE_CACHE_PATH is empty – nowhere to store the generated vibes")
+
+    from groq import Groq
+
+    client = Groq(api_key=config["api_key"], base_url=args.base_url)
+
+    if args.command == "run":
+        batch_id = submit_batch(client, requests, completion_window=args.completion_window)
+        print(f"[vibe_batch] submitted batch {batch_id}", file=sys.stderr)
+    else:
+        batch_id = args.batch_id
+
+    batch = wait_for_batch(client, batch_id, poll_interval=args.poll_interval, timeout=args.timeout)
+    stored, failed = collect_batch(client, batch, cache, model, names)
+    print(json.dumps({"batch_id": batch_id, "stored": stored, "failed": failed}))
+
+
+if __name__ == "__main__":
+    main()
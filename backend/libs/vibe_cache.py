@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ------------- Vibe cache (SQLite, pe disc) -------------
+#
+# Vibe-ul unei locații depinde doar de prompt (câmpurile locației + textul
+# instrucțiunilor) și de model, deci îl putem refolosi între procese.
+# SQLite în WAL mode: mai mulți cititori + un scriitor simultan, fără server.
+
+
+def vibe_cache_key(model: str, prompt_version: str, messages: List[Dict[str, str]]) -> str:
+    """Hash stabil pentru (model, versiune prompt, mesajele trimise la LLM)."""
+    payload = json.dumps(
+        {"model": model, "prompt_version": prompt_version, "messages": messages},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class VibeCache:
+    """
+    Cache persistent pentru vibe-uri.
+
+    - ttl_seconds: după cât timp o intrare e considerată expirată (None = niciodată)
+    - max_entries: peste această limită ștergem cele mai vechi intrări
+
+    Curățenia (expirate + cele peste max_entries) parcurge tot tabelul, deci nu
+    o facem la fiecare put, ci în medie o dată la `evict_every` inserări
+    (implicit 1% din max_entries, cel mult 1000). Tragerea e aleatoare, nu un
+    contor, ca să ajungă și procesele scurte (chatBot.py one-shot) care scriu
+    câte o singură intrare.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = None,
+        max_entries: int = 100_000,
+        evict_every: Optional[int] = None,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every or max(1, min(1000, max_entries // 100))
+        # sqlite3.Connection nu se poate folosi din mai multe thread-uri -> una per thread
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vibes (
+                    key TEXT PRIMARY KEY,
+                    place_name TEXT,
+                    model TEXT,
+                    vibe TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS vibes_created_at ON vibes (created_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT vibe, created_at FROM vibes WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        vibe, created_at = row
+        if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+            return None
+        return vibe
+
+    def put(self, key: str, vibe: str, place_name: str = "", model: str = "") -> None:
+        self.put_many([(key, vibe, place_name, model)])
+
+    def put_many(self, items: Iterable[Tuple[str, str, str, str]]) -> int:
+        """Scrie (key, vibe, place_name, model) într-o singură tranzacție; returnează câte au fost scrise."""
+        now = time.time()
+        rows = [(key, place_name, model, vibe, now) for key, vibe, place_name, model in items]
+        if not rows:
+            return 0
+        evict = random.random() * self.evict_every < len(rows)
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vibes (key, place_name, model, vibe, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            if evict:
+                self._evict(conn)
+        return len(rows)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute(
+                "DELETE FROM vibes WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+        conn.execute(
+            "DELETE FROM vibes WHERE key IN ("
+            "  SELECT key FROM vibes ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM vibes").fetchone()[0]
+
+
+def open_vibe_cache(config: dict) -> Optional[VibeCache]:
+    """VibeCache din config-ul dat de load_config(); None dacă e dezactivat (VIBE_CACHE_PATH gol)."""
+    path = config.get("vibe_cache_path")
+    if not path:
+        return None
+    return VibeCache(
+        path,
+        ttl_seconds=config.get("vibe_cache_ttl"),
+        max_entries=config.get("vibe_cache_max_entries", 100_000),
+    )
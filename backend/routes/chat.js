@@ -12,78 +12,167 @@ const backendRoot = path.join(__dirname,  '..');
 // pe Windows: const pythonBin = path.join(backendRoot, 'venv', 'Scripts', 'python.exe');
 const pythonBin = path.join(backendRoot,'libs', 'venv', 'bin', 'python');
 const chatBotPath = path.join(backendRoot, 'chatBot.py');
+const chatPoolPath = path.join(backendRoot, 'chatPool.py');
+
+// timeout per request către worker (ms)
+const requestTimeoutMs = Number(process.env.CHATBOT_TIMEOUT_MS || 60000);
+
+// ----------------- worker persistent (chatPool.py / chatBot.py --serve) -----------------
+//
+// Procesul Python rămâne pornit (client Groq + PLACES încărcate o dată).
+// Trimitem request-uri JSON pe linii, fiecare cu un "id", și potrivim
+// răspunsurile după același "id" – deci mai multe request-uri pot fi în lucru
+// simultan.
+//
+// Implicit pornim chatPool.py (N workeri chatBot.py --serve, cu health check și
+// reciclare); CHATBOT_POOL_WORKERS=0 folosește direct un singur chatBot.py --serve.
+
+let worker = null;
+let nextRequestId = 1;
+const pending = new Map(); // id -> { onEvent, onDone, timer, worker }
+
+function finishRequest(id, status, body) {
+    const entry = pending.get(id);
+    if (!entry) return;
+    pending.delete(id);
+    clearTimeout(entry.timer);
+    entry.onDone(status, body);
+}
 
-// helper comun
-function runChatBot(payload, res) {
-    let responded = false;
+function handleWorkerLine(line) {
+    if (!line.trim()) return;
+
+    let json;
+    try {
+        json = JSON.parse(line);
+    } catch (err) {
+        console.error('Invalid JSON from chatBot.py:', line);
+        return;
+    }
+
+    const { id, ...body } = json;
+    if (id === null || id === undefined) {
+        console.error('chatBot.py error without request id:', body);
+        return;
+    }
 
-    const py = spawn(pythonBin, [chatBotPath], {
+    // request-urile cu stream: true primesc mai multe linii "delta" înainte de final
+    if (body.event === 'delta') {
+        const entry = pending.get(id);
+        if (entry && entry.onEvent) entry.onEvent(body);
+        return;
+    }
+    finishRequest(id, 200, body);
+}
+
+function workerArgs() {
+    if (process.env.CHATBOT_POOL_WORKERS === '0') {
+        return [chatBotPath, '--serve'];
+    }
+    return [chatPoolPath];
+}
+
+function startWorker() {
+    const py = spawn(pythonBin, workerArgs(), {
         cwd: backendRoot,
     });
 
-    let stdout = '';
-    let stderr = '';
+    let buffer = '';
+
+    // decodare cu stare: un caracter UTF-8 (ă, ș, ț) tăiat între două chunk-uri rămâne întreg
+    py.stdout.setEncoding('utf8');
+    py.stderr.setEncoding('utf8');
 
     py.stdout.on('data', (data) => {
-        stdout += data.toString();
+        buffer += data;
+        let newline;
+        while ((newline = buffer.indexOf('\n')) !== -1) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            handleWorkerLine(line);
+        }
     });
 
     py.stderr.on('data', (data) => {
-        stderr += data.toString();
+        console.error('chatbot stderr:', data);
     });
 
     py.on('error', (err) => {
         console.error('Failed to start chatBot.py:', err);
+        failAllPending(py, 'python_spawn_failed', { details: err.message });
+    });
 
-        if (responded) return;
-        responded = true;
+    py.on('close', (code) => {
+        console.log('chatBot.py worker exit code:', code);
+        failAllPending(py, 'chatbot_failed', { exitCode: code });
+    });
 
-        return res.status(500).json({
-            error: 'python_spawn_failed',
-            details: err.message,
-        });
+    // dacă Node nu mai poate scrie (worker mort), erorile vin și pe 'close'
+    py.stdin.on('error', (err) => {
+        console.error('chatBot.py stdin error:', err.message);
     });
 
-    py.on('close', (code) => {
-        console.log('chatBot.py exit code:', code);
-        if (stderr) {
-            console.error('stderr:', stderr);
-        }
+    return py;
+}
+
+function failAllPending(py, error, extra) {
+    if (worker === py) {
+        worker = null; // următorul request pornește un worker nou
+    }
+    for (const [id, entry] of pending) {
+        if (entry.worker !== py) continue;
+        finishRequest(id, 500, { error, ...extra });
+    }
+}
 
-        if (responded) return;
-        // de aici în jos sigur nu am trimis încă răspuns
+function getWorker() {
+    if (!worker) {
+        worker = startWorker();
+    }
+    return worker;
+}
 
-        if (code !== 0 && !stdout) {
-            responded = true;
-            return res.status(500).json({
-                error: 'chatbot_failed',
-                exitCode: code,
-                stderr,
-            });
-        }
+function sendToWorker(payload, { onEvent, onDone }) {
+    const py = getWorker();
+    const id = String(nextRequestId++);
 
-        try {
-            const json = JSON.parse(stdout);
-            responded = true;
-            return res.json(json);
-        } catch (err) {
-            console.error('Invalid JSON from chatBot.py:', stdout);
-            responded = true;
-            return res.status(500).json({
-                error: 'invalid_json_from_python',
-                raw: stdout,
-            });
-        }
+    const timer = setTimeout(() => {
+        finishRequest(id, 504, { error: 'chatbot_timeout' });
+    }, requestTimeoutMs);
+
+    pending.set(id, { onEvent, onDone, timer, worker: py });
+    py.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+}
+
+// helper comun
+function runChatBot(payload, res) {
+    sendToWorker(payload, {
+        onDone: (status, body) => res.status(status).json(body),
     });
+}
 
-    py.stdin.write(JSON.stringify(payload));
-    py.stdin.end();
+// varianta streaming: NDJSON, câte un eveniment pe linie, pe măsură ce vine textul
+function streamChatBot(payload, res) {
+    res.status(200);
+    res.setHeader('Content-Type', 'application/x-ndjson; charset=utf-8');
+    res.setHeader('Cache-Control', 'no-cache');
+    if (res.flushHeaders) res.flushHeaders();
+
+    sendToWorker({ ...payload, stream: true }, {
+        onEvent: (event) => res.write(JSON.stringify(event) + '\n'),
+        onDone: (status, body) => {
+            // header-ele au plecat deja, deci erorile merg ca ultim eveniment
+            const last = body.event ? body : { event: 'error', ...body };
+            res.write(JSON.stringify(last) + '\n');
+            res.end();
+        },
+    });
 }
 
 // ----------------- /api/chat -> mode: "chat" -----------------
 
 router.post('/chat', (req, res) => {
-    const { message, history = [] } = req.body || {};
+    const { message, history = [], location } = req.body || {};
 
     if (!message || typeof message !== 'string') {
         return res.status(400).json({ error: 'message is required' });
@@ -93,30 +182,59 @@ router.post('/chat', (req, res) => {
         mode: 'chat',
         message,
         history,
+        // opțional: {lat, lon} – validat în chatBot.py
+        ...(location != null && { location }),
     };
 
     runChatBot(payload, res);
 });
 
-// ----------------- /api/vibe -> mode: "vibe" -----------------
+// ----------------- /api/chat/stream -> mode: "chat", stream: true -----------------
+//
+// Răspuns NDJSON:
+//   {"event":"delta","delta":"..."}   (de mai multe ori)
+//   {"event":"done","reply":"...","history":[...]}
 
-router.post('/vibe', (req, res) => {
-    let { placeIndex, place_index } = req.body || {};
-    const idx = placeIndex ?? place_index;
+router.post('/chat/stream', (req, res) => {
+    const { message, history = [], location } = req.body || {};
 
-    if (typeof idx !== 'number') {
-        return res.status(400).json({
-            error: 'place_index_required',
-            details: "Trimite 'placeIndex' sau 'place_index' ca număr (1-based).",
-        });
+    if (!message || typeof message !== 'string') {
+        return res.status(400).json({ error: 'message is required' });
     }
 
     const payload = {
-        mode: 'vibe',
-        place_index: idx,
+        mode: 'chat',
+        message,
+        history,
+        // opțional: {lat, lon} – validat în chatBot.py
+        ...(location != null && { location }),
     };
 
-    runChatBot(payload, res);
+    streamChatBot(payload, res);
+});
+
+// ----------------- /api/vibe -> mode: "vibe" -----------------
+
+router.post('/vibe', (req, res) => {
+    let { placeIndex, place_index, placeId, place_id, name } = req.body || {};
+    const idx = placeIndex ?? place_index;
+    const id = placeId ?? place_id;
+
+    // indexul 1-based, id-ul locației din dataset sau numele (căutare fuzzy)
+    if (typeof idx === 'number') {
+        return runChatBot({ mode: 'vibe', place_index: idx }, res);
+    }
+    if (typeof id === 'number') {
+        return runChatBot({ mode: 'vibe', place_id: id }, res);
+    }
+    if (typeof name === 'string' && name.trim()) {
+        return runChatBot({ mode: 'vibe', name: name.trim() }, res);
+    }
+
+    return res.status(400).json({
+        error: 'place_index_required',
+        details: "Trimite 'placeIndex' / 'place_index' (1-based), 'placeId' / 'place_id' sau 'name'.",
+    });
 });
 
 module.exports = router;
\ No newline at end of file